@@ -0,0 +1,762 @@
+#!/usr/bin/env python
+
+# stdlib imports
+import warnings
+
+# third party imports
+import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree, QhullError
+from scipy.interpolate import LinearNDInterpolator
+
+# local imports
+from .dataset import DataSetException
+from .resample import (get_cell_edges, is_periodic, _EDGE_TOL,
+                       _geodict_key, NAN_POLICIES)
+from .cache import LRUCache
+
+BLOCK_STATS = ['mean', 'sum', 'max', 'min', 'median', 'mode', 'count']
+POINT_STATS = ['mean', 'median', 'max', 'min', 'count', 'nearest']
+POINT_FILLS = [None, 'idw', 'linear']
+
+# approximate number of fine grid cells reduced at one time
+_TILE_CELLS = 2**22
+
+# conservative resampling plans of recently used GeoDict pairs
+_CONSERVATIVE_CACHE = LRUCache(maxsize=16)
+
+
+def _get_axes(finedict, coarsedict):
+    """Describe the position of the fine grid axes relative to the coarse
+    grid axes.
+
+    :param finedict:
+      GeoDict of the fine grid.
+    :param coarsedict:
+      GeoDict of the coarse grid.
+    :returns:
+      Tuple of (yaxis, xaxis), each a tuple of (offset, fstep, nfine,
+      cstep, ncoarse, period) - see get_cell_edges().  Rows are counted
+      down from the top edge of the grids.
+    """
+    fdx, fdy = (finedict.dx, finedict.dy)
+    cdx, cdy = (coarsedict.dx, coarsedict.dy)
+    yoffset = (coarsedict.ymax + cdy / 2.0) - (finedict.ymax + fdy / 2.0)
+    xoffset = (finedict.xmin - fdx / 2.0) - (coarsedict.xmin - cdx / 2.0)
+    yaxis = (yoffset, fdy, finedict.ny, cdy, coarsedict.ny, None)
+    xaxis = (xoffset, fdx, finedict.nx, cdx, coarsedict.nx, 360.0)
+    return (yaxis, xaxis)
+
+
+def _block_factor(axis):
+    """Get the integer number of fine cells per coarse cell along an axis,
+    if the coarse cell edges lie on fine cell edges.
+
+    :param axis:
+      Axis tuple from _get_axes().
+    :returns:
+      Integer block factor, or None if the axes are not aligned.
+    """
+    offset, fstep, nfine, cstep, ncoarse, period = axis
+    factor = cstep / fstep
+    shift = offset / fstep
+    if np.abs(factor - np.round(factor)) > _EDGE_TOL:
+        return None
+    if np.abs(shift - np.round(shift)) > _EDGE_TOL:
+        return None
+    return int(np.round(factor))
+
+
+def _block_index(axis, factor):
+    """Get the fine cell indices inside each coarse cell along an aligned
+    axis.
+
+    :param axis:
+      Axis tuple from _get_axes().
+    :param factor:
+      Integer block factor from _block_factor().
+    :returns:
+      Tuple of (index, valid), arrays of shape (ncoarse, factor) holding
+      the fine cell indices and whether each is inside the fine grid.
+    """
+    offset, fstep, nfine, cstep, ncoarse, period = axis
+    start = np.arange(ncoarse) * factor - int(np.round(offset / fstep))
+    index = start[:, None] + np.arange(factor)[None, :]
+    if period is not None:
+        # bring the coarse cells into the longitude range of the fine grid
+        index = np.mod(index, int(np.round(period / fstep)))
+        if is_periodic(nfine, fstep, period):
+            index = np.mod(index, nfine)
+    valid = (index >= 0) & (index < nfine)
+    return (index, valid)
+
+
+def _overlap_matrix(axis):
+    """Build the matrix of fractional overlaps between the fine and coarse
+    cells of an axis.
+
+    :param axis:
+      Axis tuple from _get_axes().
+    :returns:
+      scipy.sparse CSR matrix of shape (ncoarse, nfine), where each entry
+      is the fraction of the fine cell inside the coarse cell.
+    """
+    offset, fstep, nfine, cstep, ncoarse, period = axis
+    lo, hi = get_cell_edges(offset, fstep, nfine, cstep, period=period)
+    first = np.floor(lo + _EDGE_TOL).astype(np.intp)
+    last = np.ceil(hi - _EDGE_TOL).astype(np.intp) - 1
+    split = last > first
+    weight0 = np.where(split, (first + 1 - lo) / (hi - lo), 1.0)
+    weight1 = np.where(split, (hi - last) / (hi - lo), 0.0)
+    if is_periodic(ncoarse, cstep, period):
+        last = np.mod(last, ncoarse)
+    fine = np.arange(nfine)
+    coarse = np.concatenate((first, last[split]))
+    fine = np.concatenate((fine, fine[split]))
+    weights = np.concatenate((weight0, weight1[split]))
+    keep = (coarse >= 0) & (coarse < ncoarse)
+    return sparse.csr_matrix((weights[keep], (coarse[keep], fine[keep])),
+                             shape=(ncoarse, nfine))
+
+
+def _center_labels(axis):
+    """Find the coarse cell containing the center of each fine cell.
+
+    :param axis:
+      Axis tuple from _get_axes().
+    :returns:
+      Integer array of length nfine with coarse cell indices, or -1 where
+      the fine cell center is outside the coarse grid.
+    """
+    offset, fstep, nfine, cstep, ncoarse, period = axis
+    lo, hi = get_cell_edges(offset, fstep, nfine, cstep, period=period)
+    labels = np.floor((lo + hi) / 2.0).astype(np.intp)
+    if is_periodic(ncoarse, cstep, period):
+        labels = np.mod(labels, ncoarse)
+    labels[(labels < 0) | (labels >= ncoarse)] = -1
+    return labels
+
+
+def _group_order(values, labels):
+    """Get the order that sorts values by group and then by value.
+
+    This is the same as np.lexsort((values, labels)), but sorting the
+    values first and then stably sorting the labels is about twice as
+    fast for large arrays.
+
+    :param values:
+      1D array of values.
+    :param labels:
+      1D integer array of group numbers.
+    :returns:
+      1D integer array of indices.
+    """
+    order = np.argsort(values)
+    return order[np.argsort(labels[order], kind='stable')]
+
+
+def _group_median(values, labels, ngroups):
+    """Compute the median of the non-NaN values in each group.
+
+    :param values:
+      1D array of values.
+    :param labels:
+      1D integer array of group numbers (0 to ngroups-1) for each value.
+    :param ngroups:
+      Number of groups.
+    :returns:
+      1D float64 array of length ngroups (NaN for empty groups).
+    """
+    keep = ~np.isnan(values)
+    values, labels = (values[keep], labels[keep])
+    median = np.full(ngroups, np.nan)
+    order = _group_order(values, labels)
+    values = values[order]
+    counts = np.bincount(labels, minlength=ngroups)
+    starts = np.cumsum(counts) - counts
+    full = counts > 0
+    lower = values[starts[full] + (counts[full] - 1) // 2]
+    upper = values[starts[full] + counts[full] // 2]
+    median[full] = (lower.astype(np.float64) + upper) / 2.0
+    return median
+
+
+def _group_mode(values, labels, ngroups, presorted=False):
+    """Compute the most common non-NaN value in each group.
+
+    Ties are resolved in favor of the smallest value.
+
+    :param values:
+      1D array of values.
+    :param labels:
+      1D integer array of group numbers (0 to ngroups-1) for each value.
+    :param ngroups:
+      Number of groups.
+    :param presorted:
+      True if values are already sorted by label and then by value.
+    :returns:
+      1D array of length ngroups (NaN for empty groups).
+    """
+    keep = ~np.isnan(values)
+    values, labels = (values[keep], labels[keep])
+    mode = np.full(ngroups, np.nan, dtype=values.dtype)
+    if not len(values):
+        return mode
+    if not presorted:
+        order = _group_order(values, labels)
+        values, labels = (values[order], labels[order])
+    # runs of identical values within a group
+    newrun = np.ones(len(values), dtype=bool)
+    newrun[1:] = (values[1:] != values[:-1]) | (labels[1:] != labels[:-1])
+    starts = np.flatnonzero(newrun)
+    lengths = np.diff(np.append(starts, len(values)))
+    runlabels = labels[starts]
+    # longest run per group; the sort is stable so ties keep value order
+    order = np.lexsort((-lengths, runlabels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = runlabels[order][1:] != runlabels[order][:-1]
+    pick = starts[order[first]]
+    mode[labels[pick]] = values[pick]
+    return mode
+
+
+def _reduce_blocks(data, yaxis, xaxis, yfactor, xfactor, stat, dtype):
+    """Reduce a fine grid whose cells tile the coarse cells exactly.
+
+    The fine data is gathered a band of coarse rows at a time into an array
+    of shape (nrows, yfactor, ncols, xfactor) and reduced over the block
+    axes.
+
+    :returns:
+      2D array of shape (ny, nx) of the coarse grid.
+    """
+    rowindex, rowvalid = _block_index(yaxis, yfactor)
+    colindex, colvalid = _block_index(xaxis, xfactor)
+    cols = np.where(colvalid, colindex, 0).ravel()
+    colvalid = colvalid.ravel()
+    ny, nx = (rowindex.shape[0], colindex.shape[0])
+    reduced = np.full((ny, nx), 0.0 if stat == 'count' else np.nan,
+                      dtype=dtype)
+    nrows = max(1, _TILE_CELLS // (yfactor * len(cols)))
+    for i0 in range(0, ny, nrows):
+        i1 = min(ny, i0 + nrows)
+        rowsvalid = rowvalid[i0:i1].ravel()
+        if not rowsvalid.any() or not colvalid.any():
+            continue
+        rows = np.where(rowsvalid, rowindex[i0:i1].ravel(), 0)
+        block = data[np.ix_(rows, cols)].astype(dtype)
+        block[~rowsvalid, :] = np.nan
+        block[:, ~colvalid] = np.nan
+        block = block.reshape((i1 - i0, yfactor, nx, xfactor))
+        reduced[i0:i1] = _reduce_block(block, stat)
+    return reduced
+
+
+def _reduce_block(block, stat):
+    """Reduce an array of blocks of shape (nrows, yfactor, ncols, xfactor)
+    to shape (nrows, ncols).
+    """
+    if stat == 'max':
+        return np.fmax.reduce(block, axis=(1, 3))
+    if stat == 'min':
+        return np.fmin.reduce(block, axis=(1, 3))
+    nrows, yfactor, ncols, xfactor = block.shape
+    if stat in ['median', 'mode']:
+        cells = block.transpose((0, 2, 1, 3)).reshape((nrows * ncols,
+                                                       yfactor * xfactor))
+        if stat == 'median':
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                reduced = np.nanmedian(cells, axis=1)
+        else:
+            # sorting each block (NaN last) puts the values in group order
+            cells = np.sort(cells, axis=1)
+            labels = np.repeat(np.arange(nrows * ncols), yfactor * xfactor)
+            reduced = _group_mode(cells.ravel(), labels, nrows * ncols,
+                                  presorted=True)
+        return reduced.reshape((nrows, ncols))
+    valid = ~np.isnan(block)
+    total = np.where(valid, block, 0).sum(axis=(1, 3), dtype=np.float64)
+    count = valid.sum(axis=(1, 3)).astype(np.float64)
+    return _finish_sum(total, count, stat)
+
+
+def _finish_sum(total, count, stat):
+    """Turn sums of valid values and counts of valid cells into the
+    requested statistic ('mean', 'sum' or 'count').
+    """
+    if stat == 'count':
+        return count
+    empty = count <= _EDGE_TOL
+    if stat == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total = total / count
+    total[empty] = np.nan
+    return total
+
+
+def _reduce_overlap(data, yaxis, xaxis, stat):
+    """Compute area weighted 'mean', 'sum' or 'count' statistics on grids
+    whose cells do not tile each other, by weighting each fine cell by the
+    fraction of it inside each coarse cell.
+
+    :returns:
+      2D float64 array of shape (ny, nx) of the coarse grid.
+    """
+    ymatrix = _overlap_matrix(yaxis)
+    xmatrix = _overlap_matrix(xaxis)
+    ny, nx = (ymatrix.shape[0], xmatrix.shape[0])
+    reduced = np.full((ny, nx), 0.0 if stat == 'count' else np.nan)
+    ratio = yaxis[3] / yaxis[1]
+    nrows = max(1, int(_TILE_CELLS / (data.shape[1] * ratio)))
+    for i0 in range(0, ny, nrows):
+        i1 = min(ny, i0 + nrows)
+        band = ymatrix[i0:i1]
+        if not band.nnz:
+            continue
+        r0, r1 = (band.indices.min(), band.indices.max() + 1)
+        band = band[:, r0:r1]
+        subdata = data[r0:r1].astype(np.float64)
+        valid = ~np.isnan(subdata)
+        subdata[~valid] = 0
+        total = (xmatrix @ (band @ subdata).T).T
+        count = (xmatrix @ (band @ valid.astype(np.float64)).T).T
+        reduced[i0:i1] = _finish_sum(total, count, stat)
+    return reduced
+
+
+def _reduce_groups(data, yaxis, xaxis, stat, dtype):
+    """Compute 'max', 'min', 'median' or 'mode' statistics on grids whose
+    cells do not tile each other, assigning each fine cell to the coarse
+    cell containing its center.
+
+    :returns:
+      2D array of shape (ny, nx) of the coarse grid.
+    """
+    rowlabels = _center_labels(yaxis)
+    collabels = _center_labels(xaxis)
+    ny, nx = (yaxis[4], xaxis[4])
+    reduced = np.full((ny, nx), np.nan, dtype=dtype)
+    # put the columns of each coarse cell next to each other
+    cols = np.flatnonzero(collabels >= 0)
+    cols = cols[np.argsort(collabels[cols], kind='stable')]
+    collabels = collabels[cols]
+    if not len(cols):
+        return reduced
+    colstarts = np.flatnonzero(np.diff(collabels, prepend=-1))
+    ratio = yaxis[3] / yaxis[1]
+    nrows = max(1, int(_TILE_CELLS / (len(cols) * ratio)))
+    for i0 in range(0, ny, nrows):
+        i1 = min(ny, i0 + nrows)
+        rows = np.flatnonzero((rowlabels >= i0) & (rowlabels < i1))
+        if not len(rows):
+            continue
+        labels = rowlabels[rows]
+        subdata = data[np.ix_(rows, cols)].astype(dtype)
+        if stat in ['max', 'min']:
+            func = np.fmax if stat == 'max' else np.fmin
+            rowstarts = np.flatnonzero(np.diff(labels, prepend=-1))
+            subdata = func.reduceat(subdata, colstarts, axis=1)
+            subdata = func.reduceat(subdata, rowstarts, axis=0)
+            reduced[np.ix_(labels[rowstarts], collabels[colstarts])] = subdata
+            continue
+        ngroups = (i1 - i0) * nx
+        cells = ((labels - i0)[:, None] * nx + collabels[None, :]).ravel()
+        if stat == 'median':
+            values = _group_median(subdata.ravel(), cells, ngroups)
+        else:
+            values = _group_mode(subdata.ravel(), cells, ngroups)
+        reduced[i0:i1] = values.reshape((i1 - i0, nx))
+    return reduced
+
+
+def block_reduce(data, finedict, coarsedict, stat='mean'):
+    """Reduce a grid onto a coarser grid, computing a statistic of the fine
+    cells inside each coarse cell.
+
+    When the coarse cells are made up of a whole number of fine cells, the
+    fine data is reshaped into blocks and reduced directly.  Otherwise,
+    'mean', 'sum' and 'count' weight each fine cell by the fraction of its
+    area inside the coarse cell, and the other statistics assign each fine
+    cell to the coarse cell that contains its center.
+
+    NaN fine cells are ignored, and coarse cells with no valid fine cells
+    are NaN ('count' is 0).  The work is done in bands of coarse rows, so
+    the memory used beyond the input and output grids is bounded.
+
+    :param data:
+      2D numpy array of fine grid values.
+    :param finedict:
+      GeoDict of the fine grid.
+    :param coarsedict:
+      GeoDict of a grid with coarser (or equal) resolution.
+    :param stat:
+      One of:
+        'mean': Mean of the valid fine cells.
+        'sum': Sum of the valid fine cells.
+        'max': Maximum of the valid fine cells.
+        'min': Minimum of the valid fine cells.
+        'median': Median of the valid fine cells.
+        'mode': Most common valid fine cell value (smallest on ties).
+        'count': Number of valid fine cells.
+    :returns:
+      2D array of shape (coarsedict.ny, coarsedict.nx).  'max', 'min' and
+      'mode' keep floating point data types, other statistics are float64.
+    :raises DataSetException:
+      When stat is not one of BLOCK_STATS, or the coarse grid has finer
+      resolution than the fine grid.
+    """
+    if stat not in BLOCK_STATS:
+        raise DataSetException('Block statistic must be one of %s.' %
+                               BLOCK_STATS)
+    if coarsedict.dx < finedict.dx * (1 - _EDGE_TOL) or \
+       coarsedict.dy < finedict.dy * (1 - _EDGE_TOL):
+        raise DataSetException('Block reduction GeoDict must not have '
+                               'finer resolution than the grid.')
+    if stat in ['max', 'min', 'mode'] and \
+       np.issubdtype(data.dtype, np.floating):
+        dtype = data.dtype
+    else:
+        dtype = np.float64
+    yaxis, xaxis = _get_axes(finedict, coarsedict)
+    yfactor = _block_factor(yaxis)
+    xfactor = _block_factor(xaxis)
+    if yfactor is not None and xfactor is not None:
+        return _reduce_blocks(data, yaxis, xaxis, yfactor, xfactor, stat,
+                              dtype)
+    if stat in ['mean', 'sum', 'count']:
+        return _reduce_overlap(data, yaxis, xaxis, stat)
+    return _reduce_groups(data, yaxis, xaxis, stat, dtype)
+
+
+def _overlap_lengths(srcedges, dstedges, nsrc):
+    """Build the matrix of overlap lengths between the cells of two axes.
+
+    :param srcedges:
+      1D increasing array of source cell edges.
+    :param dstedges:
+      1D increasing array of destination cell edges.
+    :param nsrc:
+      Number of source cells; source cell indices past this wrap around
+      (srcedges may cover several periods of a global axis).
+    :returns:
+      scipy.sparse CSR matrix of shape (ndst, nsrc) with the length of
+      each source cell inside each destination cell.
+    """
+    ndst = len(dstedges) - 1
+    lo = max(srcedges[0], dstedges[0])
+    hi = min(srcedges[-1], dstedges[-1])
+    breaks = np.union1d(srcedges, dstedges)
+    breaks = breaks[(breaks >= lo) & (breaks <= hi)]
+    lengths = np.diff(breaks)
+    # drop the slivers left by edges that are equal but for round off
+    tol = _EDGE_TOL * min(np.min(np.diff(srcedges)),
+                          np.min(np.diff(dstedges)))
+    keep = lengths > tol
+    middle = ((breaks[:-1] + breaks[1:]) / 2.0)[keep]
+    src = np.mod(np.searchsorted(srcedges, middle, side='right') - 1, nsrc)
+    dst = np.searchsorted(dstedges, middle, side='right') - 1
+    return sparse.csr_matrix((lengths[keep], (dst, src)),
+                             shape=(ndst, nsrc))
+
+
+class ConservativePlan(object):
+    def __init__(self, hostdict, sampledict, area_weighted=False):
+        """Construct a reusable plan for conservatively resampling grids
+        described by one GeoDict onto the grid described by another.
+
+        Each host cell value is split between the sample cells it overlaps
+        in proportion to the fraction of the host cell inside each one, so
+        the total of the grid is conserved (for count or population grids).
+        The fractions are separable into a sparse matrix per axis, which is
+        built once and applied a band of sample rows at a time.
+
+        :param hostdict:
+          GeoDict of the grid(s) being resampled.
+        :param sampledict:
+          GeoDict of the grid to resample to (of any resolution).
+        :param area_weighted:
+          If True, the fractions are of the true (cos(latitude) weighted)
+          area of the host cells, instead of their area in degrees.
+        """
+        self._shape = (hostdict.ny, hostdict.nx)
+        self._area_weighted = area_weighted
+
+        # rows, counted down from the top edge of the host grid
+        htop = hostdict.ymax + hostdict.dy / 2.0
+        stop = sampledict.ymax + sampledict.dy / 2.0
+        hlat = htop - np.arange(hostdict.ny + 1) * hostdict.dy
+        slat = stop - np.arange(sampledict.ny + 1) * sampledict.dy
+        if area_weighted:
+            # cell area is proportional to the difference of sin(latitude)
+            hrows = -np.sin(np.radians(np.clip(hlat, -90.0, 90.0)))
+            srows = -np.sin(np.radians(np.clip(slat, -90.0, 90.0)))
+        else:
+            hrows, srows = (-hlat, -slat)
+        ymatrix = _overlap_lengths(hrows, srows, hostdict.ny)
+        ymatrix = ymatrix @ sparse.diags(1.0 / np.diff(hrows))
+
+        # columns, with the sample grid brought into the longitude range
+        # of the host grid
+        hleft = hostdict.xmin - hostdict.dx / 2.0
+        sleft = sampledict.xmin - sampledict.dx / 2.0
+        sleft = hleft + np.mod(sleft - hleft + 180.0, 360.0) - 180.0
+        nx = hostdict.nx
+        if is_periodic(nx, hostdict.dx, 360.0):
+            hcols = hleft - 360.0 + np.arange(3 * nx + 1) * hostdict.dx
+        else:
+            hcols = hleft + np.arange(nx + 1) * hostdict.dx
+        scols = sleft + np.arange(sampledict.nx + 1) * sampledict.dx
+        xmatrix = _overlap_lengths(hcols, scols, nx) / hostdict.dx
+
+        self._ymatrix = sparse.csr_matrix(ymatrix)
+        self._xmatrix = sparse.csr_matrix(xmatrix)
+        # sample cells that no host cell overlaps are NaN
+        self._rowcovered = np.diff(self._ymatrix.indptr) > 0
+        self._colcovered = np.diff(self._xmatrix.indptr) > 0
+
+    @property
+    def shape(self):
+        """Shape of the grids this plan applies to.
+
+        :returns:
+          Tuple of (ny, nx).
+        """
+        return self._shape
+
+    def apply(self, data, nan_policy='propagate'):
+        """Conservatively resample a grid using this plan.
+
+        :param data:
+          2D numpy array with the shape of this plan.
+        :param nan_policy:
+          How NaN host cells are treated, one of:
+            'propagate': Any sample cell overlapping a NaN cell is NaN.
+            'renormalize': NaN cells add nothing to the sample cells,
+                           which are NaN only when every host cell they
+                           overlap is NaN.
+        :returns:
+          2D float64 array of the sample grid, NaN outside of the host
+          grid.
+        :raises DataSetException:
+          When the data shape does not match the plan, or nan_policy is
+          not one of NAN_POLICIES.
+        """
+        if data.shape != self._shape:
+            raise DataSetException('Data shape %s does not match resampling '
+                                   'plan shape %s.' %
+                                   (str(data.shape), str(self._shape)))
+        if nan_policy not in NAN_POLICIES:
+            raise DataSetException('nan_policy must be one of %s.' %
+                                   NAN_POLICIES)
+        ymatrix, xmatrix = (self._ymatrix, self._xmatrix)
+        ny, nx = (ymatrix.shape[0], xmatrix.shape[0])
+        resampled = np.full((ny, nx), np.nan)
+        ratio = max(1.0, data.shape[0] / float(ny))
+        nrows = max(1, int(_TILE_CELLS / (data.shape[1] * ratio)))
+        for i0 in range(0, ny, nrows):
+            i1 = min(ny, i0 + nrows)
+            band = ymatrix[i0:i1]
+            if not band.nnz:
+                continue
+            r0, r1 = (band.indices.min(), band.indices.max() + 1)
+            band = band[:, r0:r1]
+            subdata = data[r0:r1].astype(np.float64)
+            invalid = np.isnan(subdata)
+            if invalid.any():
+                subdata[invalid] = 0
+                total = (xmatrix @ (band @ subdata).T).T
+                weight = invalid if nan_policy == 'propagate' else ~invalid
+                weight = (xmatrix @ (band @ weight.astype(np.float64)).T).T
+                if nan_policy == 'propagate':
+                    total[weight > 0] = np.nan
+                else:
+                    total[weight <= 0] = np.nan
+            else:
+                total = (xmatrix @ (band @ subdata).T).T
+            resampled[i0:i1] = total
+        resampled[~self._rowcovered, :] = np.nan
+        resampled[:, ~self._colcovered] = np.nan
+        return resampled
+
+
+def get_conservative_plan(hostdict, sampledict, area_weighted=False):
+    """Get a (cached) plan for conservatively resampling grids described
+    by one GeoDict onto the grid described by another.
+
+    :param hostdict:
+      GeoDict of the grid(s) being resampled.
+    :param sampledict:
+      GeoDict of the grid to resample to.
+    :param area_weighted:
+      Whether cell areas are weighted by cos(latitude).
+    :returns:
+      ConservativePlan object.
+    """
+    key = (_geodict_key(hostdict), _geodict_key(sampledict), area_weighted)
+    plan = _CONSERVATIVE_CACHE.get(key)
+    if plan is None:
+        plan = ConservativePlan(hostdict, sampledict,
+                                area_weighted=area_weighted)
+        _CONSERVATIVE_CACHE.put(key, plan)
+    return plan
+
+
+def get_point_cells(lat, lon, geodict):
+    """Find the grid cell containing each of a set of points.
+
+    :param lat:
+      1D array of point latitudes.
+    :param lon:
+      1D array of point longitudes (any longitude convention).
+    :param geodict:
+      GeoDict of the grid (may cross the 180 meridian).
+    :returns:
+      Tuple of (row, col, inside), where row and col are integer arrays of
+      cell indices and inside is a boolean array that is False for points
+      outside the grid (whose row/col are meaningless).
+    """
+    left = geodict.xmin - geodict.dx / 2.0
+    top = geodict.ymax + geodict.dy / 2.0
+    row = np.floor((top - lat) / geodict.dy)
+    col = np.floor(np.mod(lon - left, 360.0) / geodict.dx)
+    inside = (row >= 0) & (row < geodict.ny) & (col < geodict.nx)
+    row = np.where(inside, row, 0).astype(np.intp)
+    col = np.where(inside, col, 0).astype(np.intp)
+    return (row, col, inside)
+
+
+def grid_points(lat, lon, values, geodict, stat='mean'):
+    """Bin scattered points into the cells of a grid.
+
+    :param lat:
+      1D array of point latitudes.
+    :param lon:
+      1D array of point longitudes.
+    :param values:
+      1D array of point values (NaN values are ignored).
+    :param geodict:
+      GeoDict of the grid.
+    :param stat:
+      Statistic of the points inside each cell, one of:
+        'mean': Mean value.
+        'median': Median value.
+        'max': Maximum value.
+        'min': Minimum value.
+        'count': Number of points.
+        'nearest': Value of the point closest to the cell center.
+    :returns:
+      2D array of shape (geodict.ny, geodict.nx), NaN for cells without
+      points (0 for 'count').  'max', 'min' and 'nearest' keep floating
+      point data types, other statistics are float64.
+    :raises DataSetException:
+      When stat is not one of POINT_STATS, or the input arrays are not
+      the same length.
+    """
+    if stat not in POINT_STATS:
+        raise DataSetException('Point statistic must be one of %s.' %
+                               POINT_STATS)
+    lat = np.asarray(lat, dtype=np.float64).ravel()
+    lon = np.asarray(lon, dtype=np.float64).ravel()
+    values = np.asarray(values).ravel()
+    if not (len(lat) == len(lon) == len(values)):
+        raise DataSetException('Point latitudes, longitudes and values '
+                               'must be the same length.')
+    if stat in ['max', 'min', 'nearest'] and \
+       np.issubdtype(values.dtype, np.floating):
+        dtype = values.dtype
+    else:
+        dtype = np.float64
+    ncells = geodict.ny * geodict.nx
+    row, col, inside = get_point_cells(lat, lon, geodict)
+    inside &= ~np.isnan(values.astype(np.float64, copy=False))
+    if not inside.all():
+        row, col, values = (row[inside], col[inside], values[inside])
+        lat, lon = (lat[inside], lon[inside])
+    cells = row * geodict.nx + col
+
+    if stat in ['mean', 'count']:
+        count = np.bincount(cells, minlength=ncells).astype(np.float64)
+        if stat == 'count':
+            return count.reshape((geodict.ny, geodict.nx))
+        total = np.bincount(cells, weights=values, minlength=ncells)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gridded = total / count
+    elif stat == 'median':
+        gridded = _group_median(values.astype(np.float64), cells, ncells)
+    elif stat in ['max', 'min']:
+        gridded = np.full(ncells, np.nan, dtype=dtype)
+        func = np.fmax if stat == 'max' else np.fmin
+        func.at(gridded, cells, values.astype(dtype))
+    else:
+        # distance from each point to its cell center, in cell units
+        top = geodict.ymax + geodict.dy / 2.0
+        left = geodict.xmin - geodict.dx / 2.0
+        yfrac = (top - lat) / geodict.dy - row - 0.5
+        xfrac = np.mod(lon - left, 360.0) / geodict.dx - col - 0.5
+        dist = np.sqrt(yfrac**2 + xfrac**2)
+        mindist = np.full(ncells, np.inf)
+        np.minimum.at(mindist, cells, dist)
+        # of equally close points, the last one wins
+        closest = dist == mindist[cells]
+        gridded = np.full(ncells, np.nan, dtype=dtype)
+        gridded[cells[closest]] = values[closest]
+    return gridded.reshape((geodict.ny, geodict.nx))
+
+
+def fill_empty_cells(gridded, geodict, method='idw', neighbors=8,
+                     max_distance=None):
+    """Fill NaN cells of a grid from the cells that have values.
+
+    :param gridded:
+      2D floating point array (modified in place).
+    :param geodict:
+      GeoDict of the grid.
+    :param method:
+      One of:
+        'idw': Inverse distance squared weighting of the nearest cells
+               with values.
+        'linear': Linear interpolation on the Delaunay triangulation of
+                  the cells with values (NaN outside their convex hull).
+    :param neighbors:
+      Number of cells used by 'idw'.
+    :param max_distance:
+      Optional maximum distance (in decimal degrees) from an empty cell
+      to the cells used to fill it; farther cells are left empty.
+    :returns:
+      The filled array.
+    """
+    empty = np.isnan(gridded)
+    if not empty.any() or empty.all():
+        return gridded
+    rows, cols = np.nonzero(~empty)
+    erows, ecols = np.nonzero(empty)
+    # planar coordinates that are continuous across the 180 meridian
+    points = np.column_stack((rows * geodict.dy, cols * geodict.dx))
+    targets = np.column_stack((erows * geodict.dy, ecols * geodict.dx))
+    values = gridded[rows, cols]
+    tree = cKDTree(points)
+    if method == 'linear':
+        if len(points) < 3:
+            return gridded
+        try:
+            filled = LinearNDInterpolator(points, values)(targets)
+        except QhullError:
+            # all of the cells with values are on a line
+            return gridded
+        if max_distance is not None:
+            dist, _ = tree.query(targets, k=1)
+            filled[dist > max_distance] = np.nan
+    else:
+        k = min(neighbors, len(points))
+        upper = np.inf if max_distance is None else max_distance
+        dist, idx = tree.query(targets, k=k, distance_upper_bound=upper)
+        dist = dist.reshape((len(targets), k))
+        idx = idx.reshape((len(targets), k))
+        found = np.isfinite(dist)
+        idx[~found] = 0
+        weights = np.where(found, 1.0 / np.where(found, dist, 1)**2, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            filled = (weights * values[idx]).sum(axis=1) / weights.sum(axis=1)
+    gridded[erows, ecols] = filled
+    return gridded
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+# stdlib imports
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    def __init__(self, maxsize=32, onEvict=None):
+        """Construct a thread-safe least-recently-used cache.
+
+        :param maxsize:
+          Maximum number of entries held by the cache.  When a new entry
+          would exceed this size, the least recently used entry is dropped.
+        :param onEvict:
+          Optional function called with each value that leaves the cache
+          (dropped, replaced by a different value, or cleared), i.e. to
+          close file handles.  It is called after the cache is unlocked.
+        """
+        self._maxsize = maxsize
+        self._onEvict = onEvict
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        """Get the maximum number of entries held by the cache.
+
+        :returns:
+          Maximum number of entries.
+        """
+        return self._maxsize
+
+    def get(self, key, default=None):
+        """Get an entry from the cache, marking it as most recently used.
+
+        :param key:
+          Hashable key of the entry.
+        :param default:
+          Value returned when key is not in the cache.
+        :returns:
+          Cached value or default.
+        """
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        """Add (or replace) an entry in the cache.
+
+        :param key:
+          Hashable key of the entry.
+        :param value:
+          Value to cache.
+        """
+        evicted = []
+        with self._lock:
+            old = self._items.get(key)
+            if key in self._items and old is not value:
+                evicted.append(old)
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                evicted.append(self._items.popitem(last=False)[1])
+        self._evict(evicted)
+
+    def clear(self):
+        """Remove all entries from the cache.
+        """
+        with self._lock:
+            evicted = list(self._items.values())
+            self._items.clear()
+        self._evict(evicted)
+
+    def _evict(self, values):
+        """Hand values that have left the cache to the onEvict function.
+
+        :param values:
+          List of values removed from the cache.
+        """
+        if self._onEvict is not None:
+            for value in values:
+                self._onEvict(value)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
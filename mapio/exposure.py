@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+# third party imports
+import numpy as np
+
+# local imports
+from .dataset import DataSetException
+from .multiple import MultiGrid
+from .zonal import ZoneLabels
+from .resample import (_nearest_index, _linear_taps, _drop_zero_taps,
+                       _taps_to_matrix, _apply_matrices, _get_work_dtype,
+                       _geodict_key)
+from .cache import LRUCache
+
+EXPOSURE_METHODS = ['nearest', 'linear']
+
+# edges of the MMI I-X bins (the last bin includes its upper edge)
+MMI_BINS = np.arange(0.5, 11.0, 1.0)
+
+# approximate number of population cells aligned and binned at one time
+_TILE_CELLS = 2**22
+
+# alignment plans of recently used (hazard, population) grid combinations
+_PLAN_CACHE = LRUCache(maxsize=8)
+
+
+class ExposurePlan(object):
+    def __init__(self, hazarddict, popdict, method='nearest'):
+        """Construct a reusable plan for sampling a hazard grid at the
+        cell centers of a population grid.
+
+        Only the per-axis indices (and weights) are stored, so the plan is
+        small no matter how fine the population grid is, and the hazard
+        values at the population cells are produced a band of rows at a
+        time by iterBands().
+
+        :param hazarddict:
+          GeoDict of the hazard (i.e., ShakeMap MMI) grid.
+        :param popdict:
+          GeoDict of the population grid.
+        :param method:
+          One of 'nearest' or 'linear' (bilinear).
+        :raises DataSetException:
+          When method is not one of EXPOSURE_METHODS.
+        """
+        if method not in EXPOSURE_METHODS:
+            raise DataSetException('Exposure method must be one of %s.' %
+                                   EXPOSURE_METHODS)
+        self._method = method
+        self._shape = (hazarddict.ny, hazarddict.nx)
+        self._popshape = (popdict.ny, popdict.nx)
+
+        # fractional hazard grid coordinates of the population cell centers
+        lats = popdict.ymax - np.arange(popdict.ny) * popdict.dy
+        lons = popdict.xmin + np.arange(popdict.nx) * popdict.dx
+        yi = (hazarddict.ymax - lats) / hazarddict.dy
+        left = hazarddict.xmin - hazarddict.dx / 2.0
+        xi = np.mod(lons - left, 360.0) / hazarddict.dx - 0.5
+
+        # population cells outside of the hazard grid are not exposed.  A
+        # hazard grid crossing the edge of a global population grid covers
+        # two separate runs of population columns.
+        ny, nx = self._shape
+        self._rows = _get_cells((yi >= -0.5) & (yi <= ny - 0.5))
+        self._cols = _get_cells((xi >= -0.5) & (xi <= nx - 0.5))
+        yi, xi = (yi[self._rows], xi[self._cols])
+        self._ncols = len(xi)
+        if method == 'nearest':
+            self._yindex = _nearest_index(yi, ny)
+            self._xindex = _nearest_index(xi, nx)
+        else:
+            # zero weight taps are dropped so that NaN (masked) hazard
+            # cells only spoil the population cells next to them
+            self._ymatrix = _taps_to_matrix(
+                _drop_zero_taps(_linear_taps(yi, ny)), ny)
+            self._xmatrix = _taps_to_matrix(
+                _drop_zero_taps(_linear_taps(xi, nx)), nx)
+
+    @property
+    def method(self):
+        """Interpolation method of this plan.
+
+        :returns:
+          One of EXPOSURE_METHODS.
+        """
+        return self._method
+
+    def iterBands(self, data, tileRows=None):
+        """Sample a hazard grid at the population cells, a band of
+        population rows at a time.
+
+        :param data:
+          2D numpy array of hazard values, with the shape of the hazard
+          grid of this plan.
+        :param tileRows:
+          Number of population rows in each band, by default enough for
+          about four million cells.
+        :returns:
+          Generator of (rows, cols, values) tuples, where rows is the
+          slice of population rows covered by the band, cols is the slice
+          (or, when the hazard grid crosses the edge of the population
+          grid, the 1D index array) of population columns covered, and
+          values is the 2D array of hazard values at those cells.
+        :raises DataSetException:
+          When the data shape does not match the plan.
+        """
+        if data.shape != self._shape:
+            raise DataSetException('Data shape %s does not match exposure '
+                                   'plan shape %s.' %
+                                   (str(data.shape), str(self._shape)))
+        nrows = self._rows.stop - self._rows.start
+        ncols = self._ncols
+        if not nrows or not ncols:
+            return
+        if tileRows is None:
+            tileRows = max(1, _TILE_CELLS // ncols)
+        if self._method == 'linear':
+            data = data.astype(_get_work_dtype(data.dtype), copy=False)
+        for i0 in range(0, nrows, tileRows):
+            i1 = min(nrows, i0 + tileRows)
+            rows = slice(self._rows.start + i0, self._rows.start + i1)
+            if self._method == 'nearest':
+                values = data[np.ix_(self._yindex[i0:i1], self._xindex)]
+            else:
+                values = _apply_matrices(data, self._ymatrix[i0:i1],
+                                         self._xmatrix)
+            yield (rows, self._cols, values)
+
+
+def _get_cells(inside):
+    """Get the indices of the True values of a boolean array.
+
+    :param inside:
+      1D boolean array.
+    :returns:
+      Slice object when the True values are contiguous (empty when there
+      are none), otherwise a 1D integer array of their indices.
+    """
+    index = np.flatnonzero(inside)
+    if not len(index):
+        return slice(0, 0)
+    if index[-1] - index[0] + 1 == len(index):
+        return slice(index[0], index[-1] + 1)
+    return index
+
+
+def get_exposure_plan(hazarddict, popdict, method='nearest'):
+    """Get the (cached) plan for sampling a hazard grid at the cell
+    centers of a population grid.
+
+    :param hazarddict:
+      GeoDict of the hazard grid.
+    :param popdict:
+      GeoDict of the population grid.
+    :param method:
+      One of EXPOSURE_METHODS.
+    :returns:
+      ExposurePlan object.
+    """
+    key = (_geodict_key(hazarddict), _geodict_key(popdict), method)
+    plan = _PLAN_CACHE.get(key)
+    if plan is None:
+        plan = ExposurePlan(hazarddict, popdict, method=method)
+        _PLAN_CACHE.put(key, plan)
+    return plan
+
+
+def calc_exposure(hazard, popgrid, layer='mmi', bins=MMI_BINS, labels=None,
+                  method='nearest', tileRows=None):
+    """Sum the population exposed to each bin of a hazard grid.
+
+    The hazard grid (i.e., a ShakeMap MMI layer) is sampled at the cell
+    centers of the population grid, a band of population rows at a time,
+    and the population of each band is added to the bins it falls in.  The
+    hazard grid is never resampled to the full population resolution.
+
+    :param hazard:
+      Grid2D object, or MultiGrid (ShakeGrid) object holding the hazard
+      layer.  Masked (nodata) hazard cells are not counted.
+    :param popgrid:
+      Grid2D object of population counts.  NaN and masked cells are
+      ignored.
+    :param layer:
+      Name of the hazard layer when hazard is a MultiGrid.
+    :param bins:
+      Monotonically increasing sequence of hazard bin edges.  The last bin
+      includes its upper edge, and hazard values outside of the edges (or
+      NaN) are not counted.  The default bins are MMI I through X.
+    :param labels:
+      Optional zones to break the exposure down by (i.e., countries), one
+      of:
+        - 2D integer array or Grid2D object on the population grid, with
+          zone numbers (0 and up) or negative numbers for cells outside
+          of every zone.
+        - ZoneLabels object (see zonal.get_zone_labels()) on the
+          population grid.
+    :param method:
+      One of 'nearest' or 'linear' sampling of the hazard grid.
+    :param tileRows:
+      Number of population rows processed at a time.
+    :returns:
+      1D float64 array of the population in each bin, or 2D array of shape
+      (number of zones, number of bins) when labels is given.
+    :raises DataSetException:
+      When the labels do not have the shape of the population grid, or
+      method is not one of EXPOSURE_METHODS.
+    """
+    if isinstance(hazard, MultiGrid):
+        hazard = hazard.getLayer(layer)
+    popdict = popgrid.getGeoDict()
+    plan = get_exposure_plan(hazard.getGeoDict(), popdict, method=method)
+    bins = np.asarray(bins, dtype=np.float64)
+    nbins = len(bins) - 1
+
+    nzones = 1
+    if labels is not None:
+        if isinstance(labels, ZoneLabels):
+            nzones = labels.nzones
+            labels = labels.labels
+        else:
+            if not isinstance(labels, np.ndarray):
+                labels = labels.getData()
+            nzones = max(int(labels.max()) + 1, 0) if labels.size else 0
+        if labels.shape != (popdict.ny, popdict.nx):
+            raise DataSetException('Labels must have the shape of the '
+                                   'population grid.')
+
+    # masked hazard cells become NaN, which falls outside of every bin
+    hazdata = hazard.getData()
+    hazmask = hazard.getMask()
+    if hazmask is not None and hazmask.any():
+        hazdata = np.where(hazmask, np.nan, hazdata)
+
+    popdata = popgrid.getData()
+    popmask = popgrid.getMask()
+    exposure = np.zeros(nzones * nbins)
+    for rows, cols, values in plan.iterBands(hazdata, tileRows):
+        pop = popdata[rows, cols]
+        index = np.searchsorted(bins, values, side='right') - 1
+        index[values == bins[-1]] = nbins - 1
+        valid = (index >= 0) & (index < nbins)
+        if np.issubdtype(pop.dtype, np.floating):
+            valid &= ~np.isnan(pop)
+        if popmask is not None:
+            valid &= ~popmask[rows, cols]
+        if labels is not None:
+            zones = labels[rows, cols]
+            valid &= zones >= 0
+            index = zones[valid].astype(np.intp) * nbins + index[valid]
+        else:
+            index = index[valid]
+        exposure += np.bincount(index, weights=pop[valid],
+                                minlength=nzones * nbins)
+    if labels is None:
+        return exposure
+    return exposure.reshape((nzones, nbins))
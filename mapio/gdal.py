@@ -16,6 +16,7 @@ import numpy as np
 from .grid2d import Grid2D
 from .dataset import DataSetException, DataSetWarning
 from .geodict import GeoDict
+from .pyramid import get_pyramid_file
 
 
 def get_affine(src):
@@ -30,13 +31,16 @@ def get_affine(src):
 
 
 class GDALGrid(Grid2D):
-    def __init__(self, data, geodict):
+    def __init__(self, data, geodict, copy=False):
         """Construct a GMTGrid object.
         :param data:
            2D numpy data array (must match geodict spec)
         :param geodict:
            GeoDict Object specifying the spatial extent,resolution and shape
            of the data.
+        :param copy:
+           If True, the object holds a copy of data, otherwise (the
+           default) it holds data itself.
         :returns:
            A GMTGrid object.
         :raises DataSetException:
@@ -46,12 +50,16 @@ class GDALGrid(Grid2D):
         if m != geodict.ny or n != geodict.nx:
             raise DataSetException(
                 'Input geodict does not match shape of input data.')
+        if copy:
+            data = data.copy()
         self._data = data
         self._geodict = geodict
+        self._mask = None
 
     @classmethod
     def load(cls, filename, samplegeodict=None, resample=False,
-             method='linear', doPadding=False, padValue=np.nan):
+             method='linear', doPadding=False, padValue=np.nan,
+             usePyramid=True):
         """
         This method should do the following:
         1) If resampling, buffer bounds outwards.
@@ -61,6 +69,10 @@ class GDALGrid(Grid2D):
         5) Pad as requested.
         6) Resample as requested.
         7) Return Grid2D subclass.
+
+        With usePyramid, coarse sampling grids are resampled from the
+        coarsest adequate level of the file's pyramid, when it has one
+        (see pyramid.build_pyramid()), unless their cells are file cells.
         """
         # get the geodict describing the source file, plus a boolean telling
         # us if the last column
@@ -72,11 +84,37 @@ class GDALGrid(Grid2D):
         if samplegeodict is not None and samplegeodict == filegeodict:
             resample = False
 
-        # If the sample grid is aligned with the host grid, then resampling
-        # won't accomplish anything
-        # if samplegeodict is not None and
-        # filegeodict.isAligned(samplegeodict):
-        #     resample = False
+        # If the sample grid is aligned with the host grid (at the same
+        # resolution, or an integer multiple of it), then resampling
+        # won't accomplish anything, so just cut the sample cells out of
+        # the file data.
+        stride = None
+        if resample:
+            stride = cls.getSampleStride(filegeodict, samplegeodict)
+        if stride is not None:
+            stridedict = cls.getStrideGeoDict(filegeodict, samplegeodict,
+                                              stride)
+            data_range = cls.getDataRange(
+                filegeodict, stridedict,
+                first_column_duplicated=first_column_duplicated)
+            data, geodict = cls.readFile(filename, data_range)
+            data = cls.sliceToSample(data, geodict, samplegeodict, stride)
+            if data is not None:
+                if method != 'nearest' and 'float' not in str(data.dtype):
+                    data = data.astype(np.float32)
+                return cls(data=np.ascontiguousarray(data),
+                           geodict=samplegeodict.copy())
+
+        # otherwise resample coarse sampling grids from the coarsest
+        # adequate level of the file's pyramid, if it has one (see
+        # pyramid.build_pyramid())
+        if resample and usePyramid and samplegeodict is not None:
+            levelfile, _ = get_pyramid_file(filename, filegeodict,
+                                            samplegeodict, method=method)
+            if levelfile != filename:
+                return cls.load(levelfile, samplegeodict, resample=True,
+                                method=method, doPadding=doPadding,
+                                padValue=padValue, usePyramid=False)
 
         if samplegeodict is not None and \
                 not filegeodict.intersects(samplegeodict):
@@ -117,14 +155,16 @@ class GDALGrid(Grid2D):
             filegeodict, sampledict,
             first_column_duplicated=first_column_duplicated)
         data, geodict = cls.readFile(filename, data_range)
-        if (doPadding or resample) and 'float' not in str(data.dtype):
+        # padGrid promotes integer data only when padValue needs it, and
+        # nearest neighbor resampling keeps the integer values as they are.
+        if resample and method != 'nearest' and \
+                'float' not in str(data.dtype):
             data = data.astype(np.float32)
         # parent static method
         pad_dict = cls.getPadding(filegeodict, samplegeodict,
                                   doPadding=doPadding)
-        data, geodict = cls.padGrid(data, geodict, pad_dict)
-        if doPadding:
-            data[np.isinf(data)] = padValue
+        data, geodict = cls.padGrid(data, geodict, pad_dict,
+                                    padValue=padValue)
         grid = cls(data=data, geodict=geodict)
         if resample:
             grid = grid.interpolateToGrid(samplegeodict, method=method)
@@ -478,14 +518,14 @@ class GDALGrid(Grid2D):
                 'Only "%s" file formats supported for saving' % str(supported))
         hdr = self._getHeader()
         # create a reference to the data - this may be overridden by a
-        # downcasted version for doubles
-        data = self._data
+        # downcasted version for doubles, or a filled copy for masked data
+        data = self._getFilledData(hdr['NODATA'])
         if self._data.dtype == np.float32:
             # so we can find/reset nan values without screwing up original data
-            data = self._data.astype(np.float32)
+            data = data.astype(np.float32)
             data[np.isnan(data)] = hdr['NODATA']
         elif self._data.dtype == np.float64:
-            data = self._data.astype(np.float32)
+            data = data.astype(np.float32)
             data[np.isnan(data)] = hdr['NODATA']
             warnings.warn(DataSetWarning('Down-casting double precision '
                                          'floating point to single precision'))
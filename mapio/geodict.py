@@ -515,6 +515,8 @@ class GeoDict(object):
                    'ny': self._ny,
                    'nx': self._nx,
                    'projection': self._projection}
+        if self._nodata is not None:
+            geodict['nodata'] = self._nodata
         return GeoDict(geodict)
 
     def __eq__(self, other):
@@ -611,9 +613,10 @@ class GeoDict(object):
         dx = self._dx
         dy = self._dy
         # check to see if we're in a scenario where the grid crosses the meridian
+        # (without modifying the caller's lon array)
         if self._xmax < ulx and np.any(lon < 0):
             if not isinstance(lat, scalar_types):
-                lon[lon < 0] += 360
+                lon = np.where(lon < 0, lon + 360, lon)
             else:
                 lon += 360
         col = (lon - ulx) / dx
@@ -11,6 +11,7 @@ from scipy.io import netcdf
 from .grid2d import Grid2D
 from .dataset import DataSetException
 from .geodict import GeoDict
+from .pyramid import get_pyramid_file
 import h5py
 
 
@@ -207,13 +208,16 @@ class GMTGrid(Grid2D):
 
      '''
 
-    def __init__(self, data, geodict):
+    def __init__(self, data, geodict, copy=False):
         """Construct a GMTGrid object.
         :param data:
            2D numpy data array (must match geodict spec)
         :param geodict:
            Dictionary specifying the spatial extent,resolution and shape of
                the data.
+        :param copy:
+           If True, the object holds a copy of data, otherwise (the
+           default) it holds data itself.
         :returns:
            A GMTGrid object.
         :raises DataSetException:
@@ -223,8 +227,11 @@ class GMTGrid(Grid2D):
         if m != geodict.ny or n != geodict.nx:
             raise DataSetException(
                 'Input geodict does not match shape of input data.')
+        if copy:
+            data = data.copy()
         self._data = data
         self._geodict = geodict
+        self._mask = None
 
     @classmethod
     def getFileType(cls, grdfile):
@@ -892,7 +899,9 @@ class GMTGrid(Grid2D):
             y[:] = np.linspace(self._geodict.ymin,
                                self._geodict.ymax, self._geodict.ny)
             z = f.createVariable('z', self._data.dtype, ('y', 'x'))
-            z[:] = np.flipud(self._data)
+            if self._mask is not None:
+                z._FillValue = self._data.dtype.type(self._getFillValue())
+            z[:] = np.flipud(self._getFilledData())
             z.actual_range = np.array(
                 (np.nanmin(self._data), np.nanmax(self._data)))
             f.close()
@@ -928,10 +937,13 @@ class GMTGrid(Grid2D):
             y.attrs['actual_range'] = np.array((yvar[0], yvar[-1]))
 
             # create the z data set
-            z = f.create_dataset('z', data=np.flipud(self._data),
+            z = f.create_dataset('z', data=np.flipud(self._getFilledData()),
                                  shape=self._data.shape,
                                  dtype=str(self._data.dtype))
             z.attrs['long_name'] = 'z'
+            if self._mask is not None:
+                z.attrs['_FillValue'] = self._data.dtype.type(
+                    self._getFillValue())
             # zvar.attrs['_FillValue'] = array([ nan], dtype=float32)
             z.attrs['actual_range'] = np.array(
                 (np.nanmin(self._data), np.nanmax(self._data)))
@@ -968,7 +980,7 @@ class GMTGrid(Grid2D):
             # fpos1 = f.tell()
             # the left-right flip is necessary because of the way tofile()
             # works
-            newdata = np.fliplr(np.flipud(self._data[:]))
+            newdata = np.fliplr(np.flipud(self._getFilledData()))
             newdata.tofile(f)
             # fpos2 = f.tell()
             # bytesout = fpos2 - fpos1
@@ -976,7 +988,8 @@ class GMTGrid(Grid2D):
 
     @classmethod
     def load(cls, filename, samplegeodict=None, resample=False,
-             method='linear', doPadding=False, padValue=np.nan):
+             method='linear', doPadding=False, padValue=np.nan,
+             usePyramid=True):
         """Create a GMTGrid object from a (possibly subsetted, resampled, or
         padded) GMT grid file.
         :param gmtfilename:
@@ -994,7 +1007,12 @@ class GMTGrid(Grid2D):
           Boolean used to indicate whether, if samplegeodict is outside bounds
           of grid, to pad values around the edges.
         :param padValue:
-          Value to fill in around the edges if doPadding=True.
+          Value to fill in around the edges if doPadding=True.  Integer
+          data keeps its type if padValue fits in it.
+        :param usePyramid:
+          Whether to resample from the coarsest adequate level of the
+          file's pyramid, when it has one (see pyramid.build_pyramid()).
+          Sampling grids whose cells are file cells are read from the file.
         :returns:
           GMTgrid instance (possibly subsetted, padded, or resampled)
         :raises DataSetException:
@@ -1011,11 +1029,37 @@ class GMTGrid(Grid2D):
         if samplegeodict is not None and samplegeodict == filegeodict:
             resample = False
 
-        # If the sample grid is aligned with the host grid, then resampling
-        # won't accomplish anything
-        # if samplegeodict is not None and
-        # filegeodict.isAligned(samplegeodict):
-        #     resample = False
+        # If the sample grid is aligned with the host grid (at the same
+        # resolution, or an integer multiple of it), then resampling
+        # won't accomplish anything, so just cut the sample cells out of
+        # the file data.
+        stride = None
+        if resample:
+            stride = cls.getSampleStride(filegeodict, samplegeodict)
+        if stride is not None:
+            stridedict = cls.getStrideGeoDict(filegeodict, samplegeodict,
+                                              stride)
+            data_range = cls.getDataRange(
+                filegeodict, stridedict,
+                first_column_duplicated=first_column_duplicated)
+            data, geodict = cls.readFile(filename, data_range)
+            data = cls.sliceToSample(data, geodict, samplegeodict, stride)
+            if data is not None:
+                if method != 'nearest' and 'float' not in str(data.dtype):
+                    data = data.astype(np.float32)
+                return cls(data=np.ascontiguousarray(data),
+                           geodict=samplegeodict.copy())
+
+        # otherwise resample coarse sampling grids from the coarsest
+        # adequate level of the file's pyramid, if it has one (see
+        # pyramid.build_pyramid())
+        if resample and usePyramid and samplegeodict is not None:
+            levelfile, _ = get_pyramid_file(filename, filegeodict,
+                                            samplegeodict, method=method)
+            if levelfile != filename:
+                return cls.load(levelfile, samplegeodict, resample=True,
+                                method=method, doPadding=doPadding,
+                                padValue=padValue, usePyramid=False)
 
         # buffer out the sample geodict (if resampling) enough to allow
         # interpolation.
@@ -1049,14 +1093,16 @@ class GMTGrid(Grid2D):
             filegeodict, sampledict,
             first_column_duplicated=first_column_duplicated)
         data, geodict = cls.readFile(filename, data_range)
-        if (doPadding or resample) and 'float' not in str(data.dtype):
+        # padGrid promotes integer data only when padValue needs it, and
+        # nearest neighbor resampling keeps the integer values as they are.
+        if resample and method != 'nearest' and \
+                'float' not in str(data.dtype):
             data = data.astype(np.float32)
         # parent static method
         pad_dict = cls.getPadding(
             filegeodict, samplegeodict, doPadding=doPadding)
-        data, geodict = cls.padGrid(data, geodict, pad_dict)
-        if doPadding:
-            data[np.isinf(data)] = padValue
+        data, geodict = cls.padGrid(data, geodict, pad_dict,
+                                    padValue=padValue)
         grid = cls(data=data, geodict=geodict)
         if resample:
             grid = grid.interpolateToGrid(samplegeodict, method=method)
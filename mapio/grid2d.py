@@ -8,15 +8,24 @@ import abc
 import textwrap
 import sys
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # third party imports
 from .gridbase import Grid
 from .dataset import DataSetException
 from .geodict import GeoDict
+from .resample import (get_interp_coords, get_resample_plan,
+                       subdivide_regular, is_periodic, PointPlan)
+from .aggregate import (block_reduce, grid_points, fill_empty_cells,
+                        get_conservative_plan, POINT_FILLS)
+from .cache import LRUCache
 
 import numpy as np
-from scipy import interpolate
 import shapely
+from shapely.geometry import box
+from shapely.geometry import shape as as_shape
+from shapely.strtree import STRtree
 from affine import Affine
 from rasterio import features
 from rasterio.warp import reproject, calculate_default_transform
@@ -24,6 +33,11 @@ from rasterio.crs import CRS
 from rasterio.enums import Resampling
 from osgeo import osr
 
+# parsed CRS objects, and the set-up work of Grid2D.project() for recently
+# used (projection, source grid) combinations
+_CRS_CACHE = LRUCache(maxsize=32)
+_PROJECTION_CACHE = LRUCache(maxsize=32)
+
 
 def _center_projection(projection):
     parts = projection.split('+')[1:]
@@ -36,10 +50,254 @@ def _center_projection(projection):
     return newprojection
 
 
+def _get_crs(projection):
+    """Get the (cached) rasterio CRS object for a proj4 string.
+
+    :param projection:
+      Proj4 projection string.
+    :returns:
+      rasterio CRS object.
+    """
+    crs = _CRS_CACHE.get(projection)
+    if crs is None:
+        crs = CRS.from_string(projection)
+        _CRS_CACHE.put(projection, crs)
+    return crs
+
+
+def _get_projection_plan(geodict, projection):
+    """Get the (cached) set-up needed to project a grid.
+
+    Everything that does not depend on the data values - the parsed
+    CRS objects, the source and destination transforms and the
+    destination GeoDict - is computed once per (projection, source
+    GeoDict) combination.
+
+    :param geodict:
+      GeoDict of the source grid.
+    :param projection:
+      Valid proj4 projection string.
+    :returns:
+      Tuple of (src_crs, dst_crs, src_transform, dst_transform, outdict),
+      where outdict is the GeoDict of the projected grid (not to be
+      modified).
+    :raises DataSetException:
+      If projection is not a valid Proj4 string.
+    """
+    key = (projection, geodict.xmin, geodict.xmax, geodict.ymin,
+           geodict.ymax, geodict.dx, geodict.dy, geodict.ny, geodict.nx,
+           geodict.projection)
+    plan = _PROJECTION_CACHE.get(key)
+    if plan is not None:
+        return plan
+
+    # hack to handle projections that wrap around the 180 meridian.
+    crosses = geodict.xmax < geodict.xmin
+    lon_set = 'lon_0' in projection
+    old_projection = projection
+    if crosses and lon_set:
+        # make a new geodict that keeps latitudes the same
+        # but centers around lon 0
+        tdict = geodict.asDict()
+        txrange = ((tdict['xmax'] + 360) - tdict['xmin'])
+        tdict['xmin'] = 0 - txrange / 2.0
+        tdict['xmax'] = 0 + txrange / 2.0
+        geodict = GeoDict(tdict)
+
+        # make a new projection string centered on lon 0
+        projection = _center_projection(projection)
+
+    # check to see if the input projection is valid
+    srs = osr.SpatialReference()
+    srs.ImportFromProj4(projection)
+    if srs.ExportToProj4() == '':
+        raise DataSetException('%s is not a valid proj4 string.' %
+                               projection)
+
+    # define the input Affine object
+    src_transform = Affine.from_gdal(geodict.xmin -
+                                     geodict.dx / 2.0,
+                                     geodict.dx,
+                                     0.0,  # x rotation, not used by us
+                                     geodict.ymax +
+                                     geodict.dy / 2.0,
+                                     0.0,  # y rotation, not used by us
+                                     # their dy is negative
+                                     -1 * geodict.dy)
+
+    # set the source and destination projections
+    src_crs = _get_crs(geodict.projection)
+    dst_crs = _get_crs(projection)
+
+    # determine the boundaries in src coordinates
+    if geodict.xmin < geodict.xmax:
+        right = geodict.xmax - (geodict.dx / 2.0)
+    else:
+        txmax = geodict.xmax + 360
+        right = txmax - (geodict.dx / 2.0)
+    left = geodict.xmin - (geodict.dx / 2.0)
+    top = geodict.ymax + (geodict.dy / 2.0)
+    bottom = geodict.ymin + (geodict.dy / 2.0)
+
+    # use this convenience function to determine optimal output
+    # transform and dimensions
+    dst_transform, width, height = calculate_default_transform(
+        src_crs, dst_crs, geodict.nx, geodict.ny, left, bottom, right, top)
+
+    # get the pieces of the output transformation
+    xmin, dx, xrot, ymax, yrot, mdy = dst_transform.to_gdal()
+
+    # affine dy is negative, so we have to flip it back
+    dy = -1 * mdy
+
+    # correct for different pixel offsets
+    xmin = xmin + (dx / 2.0)
+    ymax = ymax - (dy / 2.0)
+
+    # if we crossed the meridian, we have to set the projection string
+    # to reflect where we actually are.
+    if crosses and lon_set:
+        projection = old_projection
+
+    # Construct a new GeoDict
+    gdict = {'xmin': xmin,
+             'xmax': xmin + width * dx,
+             'ymin': ymax - height * dy,
+             'ymax': ymax,
+             'dx': dx,
+             'dy': dy,
+             'nx': width,
+             'ny': height,
+             'projection': projection}
+    outdict = GeoDict(gdict, adjust='bounds')
+    plan = (src_crs, dst_crs, src_transform, dst_transform, outdict)
+    _PROJECTION_CACHE.put(key, plan)
+    return plan
+
+
+def _rasterize_tiles(shapes, out, transform, fillValue, burnValue,
+                     allTouched, tileSize, numThreads):
+    """Rasterize shapes into an array one tile at a time.
+
+    Each tile only rasterizes the shapes whose bounding boxes overlap it,
+    which are found with a spatial index of the shapes.
+
+    :param shapes:
+      Sequence of shapely geometries or GeoJSON-like geometries, or of
+      (geometry, value) tuples.
+    :param out:
+      2D numpy array to write the rasterized values into.
+    :param transform:
+      Affine transform of the (pixel registered) out array.
+    :param fillValue:
+      Value of the cells not touched by any geometry.
+    :param burnValue:
+      Value of the cells touched by geometries that have no value.
+    :param allTouched:
+      Whether every cell touched by a geometry is burned, instead of only
+      the cells whose centers are inside it.
+    :param tileSize:
+      Number of rows and columns in each tile.
+    :param numThreads:
+      Number of tiles to rasterize at the same time.
+    """
+    geometries = []
+    pairs = []
+    for shape in shapes:
+        if isinstance(shape, tuple):
+            geometry, value = shape
+        else:
+            geometry, value = (shape, burnValue)
+        if not isinstance(geometry, shapely.geometry.base.BaseGeometry):
+            geometry = as_shape(geometry)
+        geometries.append(geometry)
+        pairs.append((geometry, value))
+    tree = STRtree(geometries)
+    ny, nx = out.shape
+
+    def burn_tile(tile):
+        row, col = tile
+        rows = slice(row, min(row + tileSize, ny))
+        cols = slice(col, min(col + tileSize, nx))
+        left, top = transform * (cols.start, rows.start)
+        right, bottom = transform * (cols.stop, rows.stop)
+        # keep the input order, so that later shapes still win where
+        # shapes overlap
+        indices = np.sort(tree.query(box(left, bottom, right, top)))
+        if not len(indices):
+            out[rows, cols] = fillValue
+            return
+        tile_transform = transform * Affine.translation(cols.start,
+                                                        rows.start)
+        out[rows, cols] = features.rasterize(
+            [pairs[i] for i in indices],
+            out_shape=(rows.stop - rows.start, cols.stop - cols.start),
+            fill=fillValue, transform=tile_transform,
+            all_touched=allTouched, default_value=burnValue,
+            dtype=out.dtype)
+
+    tiles = [(row, col) for row in range(0, ny, tileSize)
+             for col in range(0, nx, tileSize)]
+    if numThreads > 1:
+        with ThreadPoolExecutor(max_workers=numThreads) as executor:
+            list(executor.map(burn_tile, tiles))
+    else:
+        for tile in tiles:
+            burn_tile(tile)
+
+
+def _get_pad_dtype(dtype, padValue):
+    """Get the dtype of a padded copy of an array.
+
+    :param dtype:
+      numpy dtype of the input array.
+    :param padValue:
+      Value to fill padding pixels with.
+    :returns:
+      dtype, promoted only as far as needed to hold padValue.
+    """
+    padValue = np.asarray(padValue)
+    dtype = np.dtype(dtype)
+    # integral float pad values (0.0, -9999.0) fit in integer data
+    if dtype.kind in 'iu' and padValue.dtype.kind == 'f' and \
+            np.isfinite(padValue) and float(padValue).is_integer() and \
+            abs(float(padValue)) < 2**63:
+        padValue = padValue.astype(np.int64)
+    padtype = np.min_scalar_type(padValue)
+    if np.can_cast(padtype, dtype):
+        return dtype
+    return np.promote_types(dtype, padtype)
+
+
+def _get_pad_value(dtype, geodict, padValue):
+    """Get the value to pad an array with.
+
+    :param dtype:
+      numpy dtype of the input array.
+    :param geodict:
+      GeoDict object describing the input array.
+    :param padValue:
+      Value to fill padding pixels with, or None for the default.
+    :returns:
+      padValue, or NaN for floating point data, or the geodict nodata
+      value for other data.
+    :raises DataSetException:
+      When padValue is None and there is no default for dtype.
+    """
+    if padValue is not None:
+        return padValue
+    if np.dtype(dtype).kind in 'fc':
+        return np.nan
+    if geodict.nodata is not None:
+        return geodict.nodata
+    raise DataSetException('Padding %s data requires a padValue or a '
+                           'nodata value.' % np.dtype(dtype))
+
+
 class Grid2D(Grid):
     reqfields = set(['xmin', 'xmax', 'ymin', 'ymax', 'dx', 'dy', 'nx', 'ny'])
 
-    def __init__(self, data=None, geodict=None):
+    def __init__(self, data=None, geodict=None, copy=True):
         """
         Construct a Grid object.
 
@@ -47,6 +305,11 @@ class Grid2D(Grid):
             A 2D numpy array (can be None).
         :param geodict:
             A GeoDict Object (or None) containing the following fields:
+        :param copy:
+            If True (the default), the Grid holds a copy of data.  If
+            False, the Grid holds data itself, and changes to one are seen
+            in the other.  Use copy=False when handing over an array that
+            nothing else will modify.
         :returns:
             A Grid2D object.
         :raises DataSetException:
@@ -64,10 +327,15 @@ class Grid2D(Grid):
                 raise DataSetException('Input geodict does not match shape '
                                        'of input data.')
             self._geodict = geodict.copy()
-            self._data = data.copy()
+            if copy:
+                self._data = data.copy()
+            else:
+                self._data = data
         else:
             self._data = None
             self._geodict = None
+        # boolean array, True where cells hold no data (see applyNaN)
+        self._mask = None
 
     @staticmethod
     def checkFirstColumnDuplicated(geodict):
@@ -221,6 +489,111 @@ class Grid2D(Grid):
                 raise DataSetException('File dimensions are different '
                                        'from sampledict dimensions.')
 
+    @staticmethod
+    def getSampleStride(filegeodict, samplegeodict):
+        """Determine whether every cell center of a sampling grid is also
+        a cell center of a file grid.
+
+        When it is, resampling the file to the sampling grid with any
+        interpolation method just returns the file values at those
+        cells, so loaders can slice (or, when the sampling grid is an
+        integer decimation of the file, stride through) the file data
+        instead of interpolating it.
+
+        :param filegeodict:
+          GeoDict object describing file.
+        :param samplegeodict:
+          GeoDict object describing grid to use for sampling.
+        :returns:
+          Tuple of (rowstep, colstep), the number of file cells between
+          sampling grid cells, or None if the sampling grid is not
+          contained by the file or its cells are not on file cells.
+        """
+        if samplegeodict is None or \
+                not filegeodict.contains(samplegeodict):
+            return None
+        steps = []
+        for sstep, fstep in [(samplegeodict.dy, filegeodict.dy),
+                             (samplegeodict.dx, filegeodict.dx)]:
+            step = sstep / fstep
+            if step < 0.5 or not np.isclose(step, np.round(step)):
+                return None
+            steps.append(int(np.round(step)))
+        if Grid2D._getSampleOffset(filegeodict, samplegeodict) is None:
+            return None
+        return tuple(steps)
+
+    @staticmethod
+    def getStrideGeoDict(filegeodict, samplegeodict, stride):
+        """Get the file cells spanned by a sampling grid found by
+        getSampleStride().
+
+        :param filegeodict:
+          GeoDict object describing file.
+        :param samplegeodict:
+          GeoDict object describing grid to use for sampling.
+        :param stride:
+          Tuple of (rowstep, colstep) from getSampleStride().
+        :returns:
+          GeoDict object with the bounds of the sampling grid and the
+          resolution of the file.
+        """
+        rowstep, colstep = stride
+        stridedict = samplegeodict.asDict()
+        stridedict['dx'] = filegeodict.dx
+        stridedict['dy'] = filegeodict.dy
+        stridedict['ny'] = (samplegeodict.ny - 1) * rowstep + 1
+        stridedict['nx'] = (samplegeodict.nx - 1) * colstep + 1
+        return GeoDict(stridedict)
+
+    @staticmethod
+    def _getSampleOffset(geodict, samplegeodict):
+        """Get the row and column of a grid holding the upper left cell of
+        a sampling grid.
+
+        :param geodict:
+          GeoDict object of the grid.
+        :param samplegeodict:
+          GeoDict object of the sampling grid.
+        :returns:
+          Tuple of integer (row, col), or None if the upper left sampling
+          cell is not centered on a cell of the grid.
+        """
+        row = (geodict.ymax - samplegeodict.ymax) / geodict.dy
+        col = np.mod(samplegeodict.xmin - geodict.xmin + geodict.dx / 2.0,
+                     360.0) / geodict.dx - 0.5
+        if not np.isclose(row, np.round(row)) or \
+                not np.isclose(col, np.round(col)):
+            return None
+        return (int(np.round(row)), int(np.round(col)))
+
+    @staticmethod
+    def sliceToSample(data, geodict, samplegeodict, stride):
+        """Take the cells of a sampling grid out of a grid containing them.
+
+        :param data:
+          2D numpy array.
+        :param geodict:
+          GeoDict object describing data.
+        :param samplegeodict:
+          GeoDict object of the sampling grid.
+        :param stride:
+          Tuple of (rowstep, colstep) from getSampleStride().
+        :returns:
+          2D numpy array (a view of data) with the shape of the sampling
+          grid, or None if data does not hold all of the sampling cells.
+        """
+        offset = Grid2D._getSampleOffset(geodict, samplegeodict)
+        if offset is None or offset[0] < 0 or offset[1] < 0:
+            return None
+        row, col = offset
+        rowstep, colstep = stride
+        sliced = data[row::rowstep, col::colstep]
+        sliced = sliced[:samplegeodict.ny, :samplegeodict.nx]
+        if sliced.shape != (samplegeodict.ny, samplegeodict.nx):
+            return None
+        return sliced
+
     @staticmethod
     def bufferBounds(samplegeodict, filegeodict, resample=False,
                      buffer_pixels=1, doPadding=False):
@@ -305,9 +678,13 @@ class Grid2D(Grid):
         return geodict
 
     @staticmethod
-    def padGrid(data, geodict, pad_dict):
+    def padGrid(data, geodict, pad_dict, padValue=None):
         """Pad input data array with pixels specified by pad_dict on each side.
 
+        The padded array is allocated once, in the dtype of the input data.
+        The dtype is promoted only when padValue cannot be represented in
+        it (i.e., NaN or inf padding of integer data).
+
         :param data:
           2D numpy array of data.
         :param geodict:
@@ -318,52 +695,82 @@ class Grid2D(Grid):
             - padright The number of padding pixels on the right edge.
             - padbottom The number of padding pixels on the bottom edge.
             - padtop The number of padding pixels on the top edge.
+        :param padValue:
+          Value to fill padding pixels with.  Defaults to NaN for floating
+          point data, and to the geodict nodata value for integer data.
         :returns:
           Tuple of (data,geodict) where data has been padded and geodict
           represents new padded data.
+        :raises DataSetException:
+          When padding integer data with no padValue and no nodata value
+          in geodict.
         """
-        if pad_dict['padleft'] == 0 and pad_dict['padright'] == 0 and \
-                pad_dict['padbottom'] == 0 and pad_dict['padtop'] == 0:
-            return (data, geodict)
-        newdata = data.copy()
-        ny, nx = newdata.shape
-        dx, dy = geodict.dx, geodict.dy
-        # we're padding with inf so that we don't interfere with other nan
-        # pixels in the data
-        leftcols = np.ones((ny, pad_dict['padleft'])) * np.inf
-        newdata = np.hstack((leftcols, newdata))
-        ny, nx = newdata.shape
-        rightcols = np.ones((ny, pad_dict['padright'])) * np.inf
-        newdata = np.hstack((newdata, rightcols))
-        ny, nx = newdata.shape
-        bottomrows = np.ones((pad_dict['padbottom'], nx)) * np.inf
-        newdata = np.vstack((newdata, bottomrows))
-        ny, nx = newdata.shape
-        toprows = np.ones((pad_dict['padtop'], nx)) * np.inf
-        newdata = np.vstack((toprows, newdata))
-
-        ny, nx = newdata.shape
-
-        # get the shapes of the pads - sometimes these can have a shape
-        # of (3,0) and a length of 3
-        leftheight, leftwidth = leftcols.shape
-        rightheight, rightwidth = rightcols.shape
-        bottomheight, bottomwidth = bottomrows.shape
-        topheight, topwidth = toprows.shape
-
-        newxmin = geodict.xmin - leftwidth * dx
-        newxmax = geodict.xmax + rightwidth * dx
-        newymin = geodict.ymin - bottomheight * dy
-        newymax = geodict.ymax + topheight * dy
-        newdict = GeoDict({'xmin': newxmin,
-                           'xmax': newxmax,
-                           'ymin': newymin,
-                           'ymax': newymax,
-                           'nx': nx,
-                           'ny': ny,
-                           'dx': dx,
-                           'dy': dy}, adjust='res')
-        return (newdata, newdict)
+        layers, newdict = Grid2D.padGrids([data], geodict, pad_dict,
+                                          padValue=padValue)
+        return (layers[0], newdict)
+
+    @staticmethod
+    def padGrids(layers, geodict, pad_dict, padValue=None):
+        """Pad several data arrays sharing one geodict (see padGrid).
+
+        :param layers:
+          Sequence of 2D numpy arrays, or an OrderedDict of 2D numpy arrays,
+          all described by geodict.
+        :param geodict:
+          GeoDict object describing each layer.
+        :param pad_dict:
+          A dictionary containing fields padleft, padright, padbottom and
+          padtop (see padGrid).
+        :param padValue:
+          Value to fill padding pixels with (see padGrid for the default).
+        :returns:
+          Tuple of (layers,geodict) where layers is a list (or OrderedDict,
+          if one was passed in) of padded arrays and geodict represents the
+          padded data.
+        :raises DataSetException:
+          When padding integer data with no padValue and no nodata value
+          in geodict.
+        """
+        padleft = pad_dict['padleft']
+        padright = pad_dict['padright']
+        padbottom = pad_dict['padbottom']
+        padtop = pad_dict['padtop']
+        if isinstance(layers, dict):
+            keys = list(layers.keys())
+            arrays = list(layers.values())
+        else:
+            keys = None
+            arrays = list(layers)
+        if padleft == 0 and padright == 0 and padbottom == 0 and padtop == 0:
+            newdict = geodict
+            newarrays = arrays
+        else:
+            ny, nx = arrays[0].shape
+            dx, dy = geodict.dx, geodict.dy
+            newny = ny + padtop + padbottom
+            newnx = nx + padleft + padright
+            newarrays = []
+            for data in arrays:
+                fill = _get_pad_value(data.dtype, geodict, padValue)
+                dtype = _get_pad_dtype(data.dtype, fill)
+                newdata = np.empty((newny, newnx), dtype=dtype)
+                newdata[:padtop, :] = fill
+                newdata[padtop + ny:, :] = fill
+                newdata[padtop:padtop + ny, :padleft] = fill
+                newdata[padtop:padtop + ny, padleft + nx:] = fill
+                newdata[padtop:padtop + ny, padleft:padleft + nx] = data
+                newarrays.append(newdata)
+            newdict = GeoDict({'xmin': geodict.xmin - padleft * dx,
+                               'xmax': geodict.xmax + padright * dx,
+                               'ymin': geodict.ymin - padbottom * dy,
+                               'ymax': geodict.ymax + padtop * dy,
+                               'nx': newnx,
+                               'ny': newny,
+                               'dx': dx,
+                               'dy': dy}, adjust='res')
+        if keys is not None:
+            newarrays = OrderedDict(zip(keys, newarrays))
+        return (newarrays, newdict)
 
     @staticmethod
     def getPadding(filegeodict, samplegeodict, doPadding=False):
@@ -529,7 +936,10 @@ class Grid2D(Grid):
             raise DataSetException('Input to copyFromGrid must be an '
                                    'instance of a Grid2D object (inc. '
                                    'subclasses)')
-        return cls(grid.getData(), grid.getGeoDict())
+        newgrid = cls(grid.getData(), grid.getGeoDict())
+        if grid.getMask() is not None:
+            newgrid._mask = grid.getMask().copy()
+        return newgrid
 
     # This should be a @classmethod in subclasses
     @abc.abstractmethod
@@ -620,6 +1030,93 @@ class Grid2D(Grid):
                                    'and columns of existing data.')
         self._data = data
 
+    def getMask(self):
+        """Return a reference to the nodata mask inside the Grid.
+
+        :returns:
+          A reference to a 2D boolean numpy array, True where cells hold no
+          data, or None if the Grid has no nodata mask.
+        """
+        return self._mask
+
+    def setMask(self, mask):
+        """Set (or remove) the nodata mask of the Grid.
+
+        :param mask:
+          A 2D boolean numpy array, True where cells hold no data, or None
+          to remove the mask.
+        :raises:
+          DataSetException if the number of rows and columns do not match
+          the internal GeoDict.
+        """
+        if mask is None:
+            self._mask = None
+            return
+        mask = np.asarray(mask, dtype=np.bool_)
+        if mask.shape != (self._geodict.ny, self._geodict.nx):
+            raise DataSetException('setMask() input array must match rows '
+                                   'and columns of existing data.')
+        self._mask = mask
+
+    def getMaskedData(self):
+        """Return the data inside the Grid as a masked array.
+
+        The masked array shares memory with the Grid data.
+
+        :returns:
+          A numpy masked array, with the cells in the nodata mask masked.
+        """
+        if self._mask is None:
+            return np.ma.MaskedArray(self._data)
+        return np.ma.MaskedArray(self._data, mask=self._mask)
+
+    def _getFillValue(self):
+        """Get the value written to file for cells in the nodata mask.
+
+        :returns:
+          The geodict nodata value if there is one, otherwise NaN for
+          floating point data or the smallest value of the data type.
+        """
+        nodata = self._geodict.nodata
+        if nodata is not None:
+            return nodata
+        if np.issubdtype(self._data.dtype, np.floating):
+            return np.nan
+        return np.iinfo(self._data.dtype).min
+
+    def _getFilledData(self, fillValue=None):
+        """Get the data with the cells in the nodata mask set to a value.
+
+        :param fillValue:
+          Value for masked cells, by default the result of _getFillValue().
+        :returns:
+          The Grid data itself when there is no nodata mask, otherwise a
+          filled copy of it.
+        """
+        if self._mask is None:
+            return self._data
+        if fillValue is None:
+            fillValue = self._getFillValue()
+        data = self._data.copy()
+        data[self._mask] = fillValue
+        return data
+
+    def _setMaskOf(self, grid, mask):
+        """Give a Grid derived from this one a nodata mask.
+
+        :param grid:
+          Grid2D instance made from this Grid's data.
+        :param mask:
+          Boolean array matching the new Grid, or None.
+        :returns:
+          The input grid, with mask and (if there is a mask) this Grid's
+          nodata value.
+        """
+        grid._mask = mask
+        if mask is not None:
+            grid._geodict.nodata = self._geodict.nodata
+        return grid
+
     def getGeoDict(self):
         """
         Return a reference to the geodict inside the Grid.
@@ -638,10 +1135,12 @@ class Grid2D(Grid):
         return (self._geodict.xmin, self._geodict.xmax, self._geodict.ymin,
                 self._geodict.ymax)
 
-    def applyNaN(self, force=False):
+    def applyNaN(self, force=False, useMask=False):
         """Apply no data value to internal data, cast to float if necessary.
 
         Intelligently cast data in grid to be able to handle NaN values.
+        Alternatively, set a boolean nodata mask and leave the data as it
+        is, so that integer data stays integer.
 
         Usage:
         Integer data with a precision of 16 bits or less
@@ -658,13 +1157,32 @@ class Grid2D(Grid):
 
         :param force:
           Boolean indicating whether to override OverflowError (see Usage).
+        :param useMask:
+          Boolean indicating that cells equal to the nodata value should
+          be marked in a nodata mask (see getMask()) instead of set to NaN.
+          The mask is only kept when there are nodata cells.
         """
         nodata = self._geodict.nodata
+        if useMask:
+            if nodata is None:
+                return
+            if np.isnan(nodata):
+                if not np.issubdtype(self._data.dtype, np.floating):
+                    return
+                mask = np.isnan(self._data)
+            else:
+                mask = self._data == nodata
+            if mask.any():
+                self._mask = mask
+            return
         if nodata is None or np.isnan(nodata) or np.isnan(self._data).any():
             return
         isint = 'int' in str(self._data.dtype)
         precision = self._data.dtype.itemsize
         if not isint:
+            if not self._data.flags.writeable:
+                # don't modify data we share with another grid
+                self._data = self._data.copy()
             self._data[self._data == nodata] = np.nan
         if isint:
             if precision <= 2:
@@ -699,7 +1217,8 @@ class Grid2D(Grid):
           host grid.
         :param cellFill:
           String defining how to fill cells that span more than one host
-          grid cell.
+          grid cell (cells on a host cell corner combine all four host
+          cells).
           Choices are:
             'max': Choose maximum value of host grid cells.
             'min': Choose minimum value of host grid cells.
@@ -721,137 +1240,73 @@ class Grid2D(Grid):
             raise DataSetException('subdivide() input GeoDict must intersect '
                                    'host grid.')
 
-        # things are simple if the host grid cell dx/dy are a multiple
-        # of finer grid dx/dy and are
-        # aligned in the sense that every host grid cell edge matches
-        # an edge of finer grid cell.
-        resXMultiple = self._geodict.dx / finerdict.dx == \
-            int(self._geodict.dx / finerdict.dx)
-        resYMultiple = self._geodict.dy / finerdict.dy == \
-            int(self._geodict.dy / finerdict.dy)
-        # this stuff below may not be right...?
-        dxmin = (self._geodict.xmin - finerdict.xmin) / finerdict.dx
-        isXAligned = np.isclose(dxmin, int(dxmin))
-        dymin = (self._geodict.ymin - finerdict.ymin) / finerdict.dy
-        isYAligned = np.isclose(dymin, int(dymin))
-        isAligned = resXMultiple and resYMultiple and isXAligned and isYAligned
-        finedata = np.ones((finerdict.ny, finerdict.nx),
-                           dtype=self._data.dtype) * np.nan
-        if isAligned:
-            for i in range(0, self._geodict.ny):
-                for j in range(0, self._geodict.nx):
-                    cellvalue = self._data[i, j]
-                    # what is the longitude of the first finer cell inside
-                    # the host cell?
-                    # coordinates of center of host cell
-                    clat, clon = self.getLatLon(i, j)
-                    # get the left edge of the cell
-                    fleftlon = clon - (self._geodict.dx / 2) + finerdict.dx / 2
-                    ftoplat = clat + (self._geodict.dy / 2) - finerdict.dy / 2
-                    frightlon = clon + (self._geodict.dx /
-                                        2) - finerdict.dx / 2
-                    fbottomlat = clat - \
-                        (self._geodict.dy / 2) + finerdict.dy / 2
-                    itop, jleft = finerdict.getRowCol(ftoplat, fleftlon)
-                    itop = itop
-                    jleft = jleft
-                    ibottom, jright = finerdict.getRowCol(fbottomlat,
-                                                          frightlon)
-                    ibottom = ibottom
-                    jright = jright
-                    finedata[itop:ibottom + 1, jleft:jright + 1] = cellvalue
-        else:
-            for i in range(0, self._geodict.ny):
-                for j in range(0, self._geodict.nx):
-                    cellvalue = self._data[i, j]
-                    # get the indices of all cells that are
-                    # completely contained inside this one.
-                    # coordinates of center of host cell
-                    clat, clon = self.getLatLon(i, j)
-                    # what is the longitude of of our first approximated
-                    # left edge fine
-                    # cell that is contained by host cell?
-                    fleftlon = clon - self._geodict.dx / 2.0 + finerdict.dx / 2
-                    frightlon = clon + self._geodict.dx / 2.0 - finerdict.dx / 2
-                    jleft = int(np.ceil((fleftlon - finerdict.xmin) /
-                                        finerdict.dx))
-                    jright = int(np.floor((frightlon - finerdict.xmin) /
-                                          finerdict.dx))
-
-                    # what is the latitude of of our first approximated
-                    # bottom edge fine
-                    # cell that is contained by host cell?
-                    fbottomlat = clat - self._geodict.dy / 2.0 + finerdict.dy / 2
-                    ftoplat = clat + self._geodict.dy / 2.0 - finerdict.dy / 2
-                    ibottom = int(np.floor((finerdict.ymax - fbottomlat) /
-                                           finerdict.dy))
-                    itop = int(np.ceil((finerdict.ymax - ftoplat) /
-                                       finerdict.dy))
-                    # ibottom = int(np.ceil((fbottomlat - finerdict.ymin) /
-                    # finerdict.dy))
-                    # itop = int(np.floor((ftoplat - finerdict.ymin) /
-                    # finerdict.dy))
-
-                    finedata[itop:ibottom + 1, jleft:jright + 1] = cellvalue
-                    # now what do I do about cells that aren't completely
-                    # contained?
-
-            # we have to now find all rows/columns where there are NaN
-            # values and deal with them
-            # accordingly - let's look at output rows first, looking for a
-            # row that is all NaN
-            # and doesn't have an all NaN row above or below it.
-
-            # np.minimum and maximum throw warnings with NaN values, even
-            # the behavior with respect
-            # to those is clearly documented.  So, let's ignore those
-            # warnings in this
-            # section where we use those methods.
-            with np.errstate(invalid='ignore'):
-                colidx = finerdict.nx // 2
-                while colidx > -1:
-                    col = finedata[:, colidx]
-                    if not np.isnan(col).all():
-                        nanrows = np.where(np.isnan(col))
-                        break
-                    colidx -= 1
-                for i in nanrows[0]:
-                    if i == 0 or i == finerdict.ny - 1:
-                        continue
-                    if cellFill == 'min':
-                        finedata[i, :] = np.minimum(finedata[i - 1, :],
-                                                    finedata[i + 1, :])
-                    elif cellFill == 'max':
-                        finedata[i, :] = np.maximum(finedata[i - 1, :],
-                                                    finedata[i + 1, :])
-                    else:  # cellFill == 'mean':
-                        finedata[i, :] = (finedata[i - 1, :] +
-                                          finedata[i + 1, :]) / 2.0
-                # now look at output columns
-                rowidx = finerdict.ny // 2
-                while rowidx > -1:
-                    row = finedata[rowidx, :]
-                    if not np.isnan(row).all():
-                        nancols = np.where(np.isnan(row))
-                        break
-                    rowidx -= 1
-                for j in nancols[0]:
-                    if j == 0 or j == finerdict.nx - 1:
-                        continue
-                    if cellFill == 'min':
-                        finedata[:, j] = np.minimum(finedata[:, j - 1],
-                                                    finedata[:, j + 1])
-                    elif cellFill == 'max':
-                        finedata[:, j] = np.maximum(finedata[:, j - 1],
-                                                    finedata[:, j + 1])
-                    else:  # cellFill == 'mean':
-                        finedata[:, j] = (finedata[:, j - 1] +
-                                          finedata[:, j + 1]) / 2.0
-
-        finegrid = Grid2D(finedata, finerdict)
-        return finegrid
-
-    def cut(self, xmin, xmax, ymin, ymax, align=False):
+        # every fine row (column) overlaps one or two host rows (columns),
+        # so the fine grid can be built a row and a column at a time.
+        finedata = subdivide_regular(self._data, self._geodict, finerdict,
+                                     cell_fill=cellFill)
+        finegrid = Grid2D(finedata, finerdict, copy=False)
+        finemask = None
+        if self._mask is not None:
+            # fine cells touching any masked host cell are masked
+            finemask = subdivide_regular(self._mask, self._geodict,
+                                         finerdict, cell_fill='max') > 0
+        return self._setMaskOf(finegrid, finemask)
+
+    def blockReduce(self, geodict, stat='mean'):
+        """Aggregate the cells of the host grid onto a coarser grid.
+
+        When coarse cells are made up of a whole number of host cells
+        (e.g., 30 arc-second cells onto 0.5 degree cells) the host cells in
+        each block are reduced directly.  Otherwise 'mean', 'sum' and 'count'
+        weight each host cell by the fraction of its area inside a coarse
+        cell, and the other statistics use the host cells whose centers are
+        inside the coarse cell.
+
+        :param geodict:
+          GeoDict object defining a grid with resolution coarser than (or
+          equal to) the host grid.
+        :param stat:
+          Statistic of the valid (non-NaN, unmasked) host cells inside each
+          coarse cell, one of:
+            'mean': Mean value.
+            'sum': Sum of values (i.e., for counts like population).
+            'max': Maximum value.
+            'min': Minimum value.
+            'median': Median value.
+            'mode': Most common value (i.e., for categories like
+                    landcover).  Ties go to the smallest value.
+            'count': Number of valid cells.
+        :returns:
+          Grid2D instance with the coarse values.  Coarse cells without
+          valid host cells are NaN (0 for 'count').
+        :raises DataSetException:
+          When geodict is finer resolution than the host grid, does not
+          intersect the host grid, or stat is not valid.
+        """
+        if not geodict.intersects(self._geodict):
+            raise DataSetException('blockReduce() input GeoDict must '
+                                   'intersect host grid.')
+        data = self._data
+        if self._mask is not None:
+            data = np.where(self._mask, np.nan, data)
+        data = block_reduce(data, self._geodict, geodict, stat=stat)
+        return Grid2D(data, geodict, copy=False)
+
+    def blockmean(self, geodict):
+        """Average the cells of the host grid onto a coarser grid.
+
+        See blockReduce() for details.
+
+        :param geodict:
+          GeoDict object defining a grid with resolution coarser than (or
+          equal to) the host grid.
+        :returns:
+          Grid2D instance with the mean values of the host cells inside
+          each coarse cell.
+        """
+        return self.blockReduce(geodict, stat='mean')
+
+    def cut(self, xmin, xmax, ymin, ymax, align=False, copy=True):
         """Cut out a section of Grid and return it.
 
         :param xmin: Longitude coordinate of upper left pixel, must be
@@ -864,6 +1319,11 @@ class Grid2D(Grid):
             aligned with Grid.
         :param align: Boolean indicating whether input boundaries
             should be modified to align with host grid.
+        :param copy: If True (the default), the new Grid holds a copy of
+            the data.  If False, the new Grid holds a read-only view of this
+            Grid's data, which costs no memory but reflects any later
+            changes to this Grid's data.  Methods that modify the data of
+            the new Grid in place copy it first.
         """
         td1 = GeoDict.createDictFromBox(xmin, xmax, ymin, ymax,
                                         self._geodict.dx,
@@ -883,57 +1343,145 @@ class Grid2D(Grid):
         uly, ulx = self._geodict.getRowCol(td.ymax, td.xmin)
         lry, lrx = self._geodict.getRowCol(td.ymin, td.xmax)
         data = self._data[uly:lry + 1, ulx:lrx + 1]
-        grid = Grid2D(data, td)
-        return grid
-
-    def getValue(self, lat, lon, method='nearest', default=None):
-        # return nearest neighbor value
-        """Return numpy array at given latitude and longitude (using
-        nearest neighbor).
+        mask = None
+        if self._mask is not None:
+            mask = self._mask[uly:lry + 1, ulx:lrx + 1]
+        if copy:
+            if mask is not None:
+                mask = mask.copy()
+            return self._setMaskOf(Grid2D(data, td), mask)
+        data = data.view()
+        data.flags.writeable = False
+        return self._setMaskOf(Grid2D(data, td, copy=False), mask)
+
+    def getValue(self, lat, lon, method='nearest', default=None,
+                 nanPolicy='propagate'):
+        """Return numpy array at given latitude and longitude.
+
+        Arrays of points are sampled in one vectorized pass, so sampling
+        millions of points (i.e., station or site coordinates) is fast.
 
         :param lat:
-           Latitude (in decimal degrees) of desired data value.
+           Latitude (in decimal degrees) of desired data value(s).
         :param lon:
-           Longitude (in decimal degrees) of desired data value.
+           Longitude (in decimal degrees) of desired data value(s).
         :param method:
-           Interpolation method, one of ('nearest','linear','cubic','quintic')
+           Interpolation method, one of:
+             'nearest': Value of the nearest cell.
+             'linear': Bilinear interpolation between the four nearest
+                       cell centers.
+             'cubic': Cubic convolution over the sixteen nearest cells.
+           Between the outer cell centers and the edge of the grid,
+           'linear' and 'cubic' use the values on the outer cell centers.
+           On grids covering 360 degrees of longitude they interpolate
+           across the edges of the grid.
         :param default:
-           Default value to return when lat/lon is outside of grid bounds.
+           Default value to return when lat/lon is outside of grid bounds,
+           or an array of per-point defaults the shape of lat.
+        :param nanPolicy:
+           How 'linear' and 'cubic' treat NaN (and inf) cells, or cells in
+           the nodata mask:
+             'propagate': Points that draw on a NaN cell are NaN.
+             'renormalize': Weights are renormalized over the valid
+             neighboring cells, so points are only NaN when no neighbor is
+             valid.
         :return:
-           Value at input latitude,longitude position.
+           Value at input latitude,longitude position.  Points that take
+           their value from a cell in the nodata mask are NaN with every
+           method.  'linear' and 'cubic' values (and 'nearest' values of
+           integer grids with a nodata mask) are floating point.
         :raises DataSetException:
-          When lat/lon is outside of bounds and default is None.
+          When lat/lon is outside of bounds and default is None, or
+          nanPolicy is not valid.
+        :raises NotImplementedError:
+          When method is not one of 'nearest', 'linear' or 'cubic'.
         """
+        if method not in ['nearest', 'linear', 'cubic']:
+            raise NotImplementedError('nearest, linear and cubic are the '
+                                      'only interpolation methods '
+                                      'currently supported.')
+        plan, inside, shape = self._getPointPlan(lat, lon, method)
+        return self._applyPointPlan(plan, inside, shape, default, nanPolicy)
+
+    def _getPointPlan(self, lat, lon, method):
+        """Build the plan for sampling the grid at given latitudes and
+        longitudes.
 
+        The plan only depends on the geodict, so it can be applied to any
+        grid with the same geodict (i.e., the layers of a MultiGrid).
+
+        :param lat:
+           Latitude(s) (in decimal degrees).
+        :param lon:
+           Longitude(s) (in decimal degrees).
+        :param method:
+           One of 'nearest', 'linear' or 'cubic'.
+        :returns:
+           Tuple of (plan, inside, shape), where plan is a PointPlan for the
+           points inside the grid, inside is a flat boolean array marking
+           those points, and shape is the shape of lat (None for scalars).
+        """
         if method == 'nearest':
             row, col = self.getRowCol(lat, lon)
         else:
-            raise NotImplementedError('nearest is the only interpolation '
-                                      'method currently supported.')
-        ny, nx = self._data.shape
+            row, col = self.getRowCol(lat, lon, returnFloat=True)
+        shape = None
         if isinstance(row, np.ndarray):
-            outidx = np.where((row < 0) | (row > ny - 1) | (col < 0) |
-                              (col > nx - 1))
-            inidx = np.where((row >= 0) & (row <= ny - 1) & (col >= 0) &
-                             (col <= nx - 1))
-            value = np.empty_like(row).astype(self._data.dtype)
-            if len(outidx[0]):
-                if default is None:
-                    msg = 'One of more of your lat/lon values is outside '\
-                        'Grid boundaries: %s' % (str(self.getBounds()))
-                    raise DataSetException(msg)
-                value[outidx] = default
-            value[inidx] = self._data[row[inidx], col[inidx]]
+            shape = row.shape
+        row = np.asarray(row, dtype=np.float64).ravel()
+        col = np.asarray(col, dtype=np.float64).ravel()
+        ny, nx = self._data.shape
+        wrap = False
+        if method == 'nearest':
+            inside = (row >= 0) & (row <= ny - 1) & \
+                (col >= 0) & (col <= nx - 1)
         else:
-            if (row < 0 or row > ny - 1 or col < 0 or col > nx - 1):
+            # between the outer cell centers and the grid edges the edge
+            # values are used
+            wrap = is_periodic(nx, self._geodict.dx, 360.0)
+            if wrap:
+                # bring points from any longitude onto the grid
+                col = np.mod(col + 0.5, nx) - 0.5
+            inside = (row >= -0.5) & (row <= ny - 0.5) & \
+                (col >= -0.5) & (col <= nx - 0.5)
+        if not inside.all():
+            row = row[inside]
+            col = col[inside]
+        plan = PointPlan(self._data.shape, row, col, method=method,
+                         wrap=wrap)
+        return (plan, inside, shape)
+
+    def _applyPointPlan(self, plan, inside, shape, default, nanPolicy):
+        """Sample the grid using a plan from _getPointPlan().
+
+        See getValue() for the default and nanPolicy parameters.
+
+        :returns:
+           Scalar or array of sampled values.
+        """
+        if shape is None:
+            if not inside[0]:
                 if default is None:
                     msg = 'Your lat/lon value is outside Grid boundaries: %s'\
                         % (str(self.getBounds()))
                     raise DataSetException(msg)
-                else:
-                    return default
-            value = self._data[row, col]
-        return value
+                return default
+            return plan.apply(self._data, nan_policy=nanPolicy,
+                              mask=self._mask)[0]
+        allinside = len(plan) == len(inside)
+        if not allinside and default is None:
+            msg = 'One of more of your lat/lon values is outside '\
+                'Grid boundaries: %s' % (str(self.getBounds()))
+            raise DataSetException(msg)
+        values = plan.apply(self._data, nan_policy=nanPolicy,
+                            mask=self._mask)
+        if allinside:
+            return values.reshape(shape)
+        value = np.empty(inside.shape, dtype=values.dtype)
+        value[inside] = values
+        outside = ~inside
+        value[outside] = np.broadcast_to(default, shape).ravel()[outside]
+        return value.reshape(shape)
 
     def getLatLon(self, row, col):
         """Return geographic coordinates (lat/lon decimal degrees) for
@@ -965,75 +1513,7 @@ class Grid2D(Grid):
         return self._geodict.getRowCol(lat, lon, returnFloat)
 
     def _getInterpCoords(self, geodict):
-        # make sure that the grid we're resampling TO is completely
-        # contained by host
-        if not self._geodict.contains(geodict):
-            raise DataSetException('Grid you are resampling TO is not '
-                                   'completely contained by base grid.')
-
-        # translate geographic coordinates to 2 1-D arrays of X and Y
-        # pixel coordinates
-        # remember that pixel coordinates are (0,0) at the top left and
-        # increase going down and to the right
-        # geographic coordinates are (xmin,ymin) at the bottom left and
-        # increase going up and to the right
-
-        # we need to check if these two grids (host and sample) are in
-        # the same longitude system
-        # if not, adjust one to the other
-        hostxmin = self._geodict.xmin
-        hostxmax = self._geodict.xmax
-        hostymin = self._geodict.ymin
-        hostymax = self._geodict.ymax
-
-        # there are three cases for longitude coordinates we need to
-        # deal with here:
-        # 1) Both xmin/xmax are both positive (left)
-        # 2) Both xmin/xmax are both negative (right)
-        # 3) xmin is positive, xmax is negative (cross)
-        host_left = hostxmin > 0 and hostxmax > 0
-        host_right = hostxmin < 0 and hostxmax < 0
-        host_cross = hostxmin > 0 and hostxmax < 0
-
-        samplexmin = geodict.xmin
-        samplexmax = geodict.xmax
-        sampleymin = geodict.ymin
-        sampleymax = geodict.ymax
-
-        sample_left = samplexmin > 0 and samplexmax > 0
-        sample_right = samplexmin < 0 and samplexmax < 0
-        sample_cross = samplexmin > 0 and samplexmax < 0
-
-        # # if sets of longitudes are in a different system,
-        # # make them both left (positive)
-
-        if not host_left:
-            if host_right:
-                hostxmin += 360
-                hostxmax += 360
-            elif host_cross:
-                hostxmax += 360
-        if not sample_left:
-            if sample_right:
-                samplexmin += 360
-                samplexmax += 360
-            elif sample_cross:
-                samplexmax += 360
-
-        # extract the geographic information about the grid we're sampling to
-        sampleny = geodict.ny
-        samplenx = geodict.nx
-
-        hostdx = self._geodict.dx
-        hostdy = self._geodict.dy
-
-        gxi = np.linspace(samplexmin, samplexmax, num=samplenx)
-        gyi = np.linspace(sampleymin, sampleymax, num=sampleny)
-
-        xi = (gxi - hostxmin) / hostdx
-        yi = np.array(sorted(((hostymax - gyi) / hostdy)))
-
-        return (xi, yi)
+        return get_interp_coords(self._geodict, geodict)
 
     def interpolate2(self, geodict, method='linear'):
         """
@@ -1093,8 +1573,8 @@ class Grid2D(Grid):
                                          geodict.ymax + geodict.dy / 2.0,
                                          0.0,  # y rotation, not used by us
                                          -1 * geodict.dy)  # their dy is negative
-        src_crs = CRS().from_string(GeoDict.DEFAULT_PROJ4).to_dict()
-        dst_crs = CRS().from_string(GeoDict.DEFAULT_PROJ4).to_dict()
+        src_crs = _get_crs(GeoDict.DEFAULT_PROJ4)
+        dst_crs = src_crs
         reproject(self._data.astype(np.float64), destination,
                   src_transform=src_transform,
                   src_crs=src_crs,
@@ -1104,9 +1584,10 @@ class Grid2D(Grid):
                   dst_nodata=np.nan,
                   resampling=resampling)
 
-        return self.__class__(destination, geodict)
+        return self.__class__(destination, geodict, copy=False)
 
-    def interpolateToGrid(self, geodict, method='linear'):
+    def interpolateToGrid(self, geodict, method='linear',
+                          nanPolicy='propagate', areaWeighted=False):
         """
         Given a geodict specifying another grid extent and resolution,
         resample current grid to match.
@@ -1115,76 +1596,64 @@ class Grid2D(Grid):
             geodict dictionary from another grid whose extents are inside
             the extent of this grid.
         :param method:
-            Optional interpolation method - ['linear', 'cubic','nearest']
+            Optional interpolation method - ['linear', 'cubic','nearest',
+            'conservative'].  'conservative' splits each cell value between
+            the new cells it overlaps in proportion to its area inside each
+            one, so that totals (i.e., of population or count grids) are
+            conserved.  It works for finer or coarser new grids, and new
+            cells outside of this grid are NaN.
+        :param nanPolicy:
+            How NaN (and inf) cells are treated by 'linear' and 'cubic'
+            interpolation:
+              'propagate': Output cells that draw on a NaN cell are NaN.
+              'renormalize': Weights are renormalized over the valid
+              neighboring cells, so output cells are only NaN when no
+              neighbor is valid.
+            For 'conservative' resampling, 'renormalize' leaves NaN cells
+            out of the totals.
+        :param areaWeighted:
+            If True, 'conservative' resampling weights cell areas by
+            cos(latitude), instead of treating them as equal in degrees.
         :raises DataSetException:
            If the Grid object upon which this function is being called is
            not completely contained by the grid to which this Grid is being
-           resampled.
+           resampled ('conservative' resampling does not require this).
         :raises DataSetException:
-           If the method is not one of ['nearest','linear','cubic']
+           If the method is not one of ['nearest','linear','cubic',
+           'conservative']
+           If nanPolicy is not one of ['propagate','renormalize']
            If the resulting interpolated grid shape does not match input
            geodict.
         :returns:
           A new instance of the Grid2D class or subclass with interpolated
-          data.
+          data.  Grids with a nodata mask keep one: 'nearest' resamples
+          the mask along with the (unchanged type of) data, the other
+          methods treat masked cells as NaN and mask the NaN results.
         """
-        if method not in ['linear', 'cubic', 'nearest']:
+        if method not in ['linear', 'cubic', 'nearest', 'conservative']:
             raise DataSetException('Resampling method must be one of '
-                                   '"linear", "cubic","nearest"')
-        ny, nx = (geodict.ny, geodict.nx)
-        xi, yi = self._getInterpCoords(geodict)
-
-        # now using scipy interpolate functions
-        baserows, basecols = self._geodict.ny, self._geodict.nx
-        basex = np.arange(0, basecols)  # base grid PIXEL coordinates
-        basey = np.arange(0, baserows)
-        newdata = None
-        if method in ['linear', 'cubic']:
-            hasnan = np.isnan(self._data).any()
-            hasinf = np.isinf(self._data).any()
-            if not hasnan and not hasinf:
-                # at the time of this writing, interp2d does not support
-                # NaN values at all.
-                f = interpolate.interp2d(basex, basey, self._data, kind=method)
-                # self._data = f(xi,yi)
-                newdata = f(xi, yi)
-                newdata = newdata.reshape((yi.size, xi.size))
-            else:
-                # is Nan values are present, use griddata (slower by ~2
-                # orders of magnitude but supports NaN).
-                xi, yi = np.meshgrid(xi, yi)
-                newrows, newcols = xi.shape
-                xi = xi.flatten()
-                yi = yi.flatten()
-                xnew = np.zeros((len(xi), 2))
-                xnew[:, 0] = xi
-                xnew[:, 1] = yi
-                basex, basey = np.meshgrid(basex, basey)
-                basex = basex.flatten()
-                basey = basey.flatten()
-                xold = np.zeros((len(basex), 2))
-                xold[:, 0] = basex
-                xold[:, 1] = basey
-                # self._data = interpolate.griddata(xold,
-                # self._data.flatten(),xnew,method=method)
-                # self._data = self._data.reshape((newrows,newcols))
-                newdata = interpolate.griddata(xold, self._data.flatten(),
-                                               xnew, method=method)
-                newdata = newdata.reshape((newrows, newcols))
+                                   '"linear", "cubic","nearest",'
+                                   '"conservative"')
+        # the plan (pixel coordinates, weights, indices) only depends on
+        # the two geodicts, so it is cached and shared between grids.
+        if method == 'conservative':
+            plan = get_conservative_plan(self._geodict, geodict,
+                                         area_weighted=areaWeighted)
+        else:
+            plan = get_resample_plan(self._geodict, geodict, method=method)
+        newmask = None
+        if self._mask is None:
+            newdata = plan.apply(self._data, nan_policy=nanPolicy)
+        elif method == 'nearest':
+            newdata = plan.apply(self._data)
+            newmask = plan.apply(self._mask)
         else:
-            x, y = np.meshgrid(basex, basey)
-            # in Python2, list doesn't do anything
-            # in python3, it makes result of zip from iterator into list
-            xy = list(zip(x.flatten(), y.flatten()))
-            f = interpolate.NearestNDInterpolator(xy, self._data.flatten())
-            newrows = geodict.ny
-            newcols = geodict.nx
-            xi = np.tile(xi, (newrows, 1))
-            yi = np.tile(yi.reshape(newrows, 1), (1, newcols))
-            # self._data = f(list(zip(xi.flatten(),yi.flatten())))
-            # self._data = self._data.reshape(xi.shape)
-            newdata = f(list(zip(xi.flatten(), yi.flatten())))
-            newdata = newdata.reshape(xi.shape)
+            work = self._data
+            if not np.issubdtype(work.dtype, np.floating):
+                work = work.astype(np.float64)
+            work = np.where(self._mask, np.nan, work)
+            newdata = plan.apply(work, nan_policy=nanPolicy)
+            newmask = np.isnan(newdata)
 
         ny, nx = geodict.ny, geodict.nx
         # dims = self._data.shape
@@ -1207,12 +1676,63 @@ class Grid2D(Grid):
                  'dy': geodict.dy}
         # self._geodict = GeoDict(gdict)
         newdict = GeoDict(gdict)
-        return self.__class__(newdata, newdict)
+        newgrid = self.__class__(newdata, newdict, copy=False)
+        return self._setMaskOf(newgrid, newmask)
+
+    @classmethod
+    def loadFromCloud(cls, cloud, geodict, method='mean', fill=None,
+                      fillNeighbors=8, fillDistance=None):
+        """Create a grid from scattered points, binning the points into the
+        cells that contain them.
+
+        :param cloud:
+          Tuple of (lat, lon, data) arrays of point latitudes, longitudes
+          and values.  Points outside the grid or with NaN values are
+          ignored.
+        :param geodict:
+          GeoDict object defining the grid (may cross the 180 meridian).
+        :param method:
+          How to combine the points inside a cell, one of:
+            'mean': Mean value.
+            'median': Median value.
+            'max': Maximum value.
+            'min': Minimum value.
+            'count': Number of points.
+            'nearest': Value of the point closest to the cell center.
+        :param fill:
+          How to fill cells containing no points, one of:
+            None: Leave them NaN (0 for 'count').
+            'idw': Inverse distance squared weighting of the nearest
+                   cells containing points.
+            'linear': Linear interpolation between cells containing points
+                      (cells outside of those remain NaN).
+        :param fillNeighbors:
+          Number of cells used to fill each empty cell with 'idw'.
+        :param fillDistance:
+          Maximum distance (decimal degrees) from an empty cell to the
+          cells used to fill it, or None for no limit.
+        :returns:
+          Grid2D instance.
+        :raises DataSetException:
+          When method or fill are not valid, or the lat, lon and data
+          arrays are not the same length.
+        """
+        if fill not in POINT_FILLS:
+            raise DataSetException('fill must be one of %s.' % POINT_FILLS)
+        lat, lon, values = cloud
+        data = grid_points(lat, lon, values, geodict, stat=method)
+        if fill is not None and method != 'count':
+            data = fill_empty_cells(data, geodict, method=fill,
+                                    neighbors=fillNeighbors,
+                                    max_distance=fillDistance)
+        return cls(data, geodict, copy=False)
 
     @classmethod
     def rasterizeFromGeometry(cls, shapes, geodict, burnValue=1.0,
                               fillValue=np.nan,
-                              mustContainCenter=False, attribute=None):
+                              mustContainCenter=False, attribute=None,
+                              dtype=None, out=None, tileSize=None,
+                              numThreads=1):
         """
         Create a Grid2D object from vector shapes, where the presence
         of a shape
@@ -1239,9 +1759,30 @@ class Grid2D(Grid):
           Optional boolean which indicates whether the geometry must touch
           the center of the cell or merely be inside the cell in order to
           set the value.
+        :param attribute:
+          Optional name of the property of GeoJSON-like shapes that holds
+          the value to burn.
+        :param dtype:
+          Optional data type of the output grid (i.e., np.uint8 for burn
+          masks).  By default it is chosen by rasterio, or is float64 when
+          tileSize is set.
+        :param out:
+          Optional preallocated 2D array the shape of the grid to write
+          the output into, such as a np.memmap to write straight to a
+          file-backed array.  Its data type overrides dtype.
+        :param tileSize:
+          Optional number of rows and columns in each tile.  When set, the
+          grid is rasterized one tile at a time, with each tile only
+          burning the shapes that overlap it, so that no full-grid
+          temporary arrays are created.
+        :param numThreads:
+          Number of tiles to rasterize at the same time when tileSize is
+          set.
         :raises DataSetException:
           When geometry input is not a subclass of
           shapely.geometry.base.BaseGeometry.
+          When out does not have the shape of the grid, or fillValue
+          cannot be stored in the output data type.
         :returns:
           Grid2D object.
         This method is a thin wrapper around rasterio->features->rasterize(),
@@ -1326,10 +1867,42 @@ class Grid2D(Grid):
         outshape = (ny, nx)
         transform = Affine.from_gdal(txmin, dx, 0.0, tymax, 0.0, -dy)
         allTouched = not mustContainCenter
-        img = features.rasterize(shapes, out_shape=outshape, fill=fillValue,
-                                 transform=transform,
-                                 all_touched=allTouched,
-                                 default_value=burnValue)
+        if out is None and dtype is None and tileSize is None:
+            img = features.rasterize(shapes, out_shape=outshape,
+                                     fill=fillValue,
+                                     transform=transform,
+                                     all_touched=allTouched,
+                                     default_value=burnValue)
+            return cls(img, geodict, copy=False)
+
+        # write into the array we were given, or a new one of the
+        # requested type
+        if out is not None:
+            if out.shape != outshape:
+                raise DataSetException('Output array must have shape %s.'
+                                       % str(outshape))
+            dtype = out.dtype
+        elif dtype is None:
+            dtype = np.float64
+        dtype = np.dtype(dtype)
+        if not np.issubdtype(dtype, np.floating) and \
+                not np.isfinite(fillValue):
+            raise DataSetException('Fill value %s cannot be stored as %s.'
+                                   % (fillValue, dtype))
+        if out is None:
+            out = np.empty(outshape, dtype=dtype)
+
+        if tileSize is None:
+            out.fill(fillValue)
+            features.rasterize(shapes, out=out, transform=transform,
+                               all_touched=allTouched,
+                               default_value=burnValue)
+        else:
+            _rasterize_tiles(shapes, out, transform, fillValue, burnValue,
+                             allTouched, tileSize, numThreads)
+        img = out
+        if isinstance(img, np.memmap):
+            img.flush()
         # geodict = GeoDict({'xmin':xmin,'xmax':xmax,'ymin':ymin,'ymax':ymax,
         # 'dx':dx,'dy':dy,'ny':ny,'nx':nx})
         # gd = geodict.asDict()
@@ -1337,141 +1910,130 @@ class Grid2D(Grid):
         # gd['nx'] = nx
         # gd['ny'] = ny
         # geodict = GeoDict(gd,adjust='bounds')
-        return cls(img, geodict)
+        return cls(img, geodict, copy=False)
 
-    def project(self, projection, method='bilinear'):
-        """Project Grid2D data into desired projection.
+    @staticmethod
+    def projectLayers(layers, geodict, projection, method='bilinear',
+                      numThreads=1, warpMemLimit=0, out=None, dtype=None):
+        """Project several layers sharing one geodict in a single warp.
 
+        :param layers:
+          Sequence of 2D numpy arrays, all of the shape given by geodict.
+        :param geodict:
+          GeoDict object shared by all of the layers.
         :param projection:
           Valid proj4 projection string.
         :param method:
           One of the sampling methods described here:
               https://mapbox.github.io/rasterio/topics/resampling.html#resampling-methods
+        :param numThreads:
+          Number of threads GDAL uses to warp the data.
+        :param warpMemLimit:
+          Working memory (in MB) GDAL may use to warp the data, or 0 for
+          the GDAL default.
+        :param out:
+          Optional (nlayers, ny, nx) numpy array (as returned by a previous
+          call with the same geodict and projection) to write the projected
+          data into.
+        :param dtype:
+          Data type of the projected data, by default the common data type
+          of the input layers.
         :raises DataSetException:
           If input projection is not a valid Proj4 string.
           If method is not a valid resampling method found in above URL.
+          If out does not have the projected shape and data type.
         :returns:
-          Re-projected Grid2D object.
+          Tuple of (nlayers, ny, nx) numpy array of projected data and the
+          GeoDict of the projected layers.
         """
-        # hack to handle projections that wrap around the 180 meridian.
-        crosses = self._geodict.xmax < self._geodict.xmin
-        lon_set = 'lon_0' in projection
-        old_projection = projection
-        if crosses and lon_set:
-            # make a new geodict that keeps latitudes the same
-            # but centers around lon 0
-            tdict = self._geodict.asDict()
-            txrange = ((tdict['xmax'] + 360) - tdict['xmin'])
-            tdict['xmin'] = 0 - txrange / 2.0
-            tdict['xmax'] = 0 + txrange / 2.0
-            geodict = GeoDict(tdict)
-
-            # make a new projection string centered on lon 0
-            projection = _center_projection(projection)
-        else:
-            geodict = self._geodict
-
-        # check to see if the input projection is valid
-        srs = osr.SpatialReference()
-        srs.ImportFromProj4(projection)
-        if srs.ExportToProj4() == '':
-            raise DataSetException('%s is not a valid proj4 string.' %
-                                   self._geodict['projection'])
-
         # check to see if the input resampling method is valid
-        int_method = 1  # bi-linear
         try:
             int_method = getattr(Resampling, method)
         except AttributeError:
             raise DataSetException('%s is not a valid resampling '
                                    'method.' % method)
 
-        # get the dimensions of the input data
-        nrows, ncols = self._data.shape
-        # define the input Affine object
-        src_transform = Affine.from_gdal(geodict.xmin -
-                                         geodict.dx / 2.0,
-                                         geodict.dx,
-                                         0.0,  # x rotation, not used by us
-                                         geodict.ymax +
-                                         geodict.dy / 2.0,
-                                         0.0,  # y rotation, not used by us
-                                         # their dy is negative
-                                         -1 * geodict.dy)
-
-        # set the source and destination projections (have to be CRS
-        # dictionaries)
-        src_crs = CRS().from_string(geodict.projection).to_dict()
-        dst_crs = CRS().from_string(projection).to_dict()
-
-        # determine the boundaries in src coordinates
-        if geodict.xmin < geodict.xmax:
-            right = geodict.xmax - (geodict.dx / 2.0)
+        # the CRS objects, transforms and output geodict only depend on
+        # the projection and the source geodict, so they are cached and
+        # shared between grids.
+        (src_crs, dst_crs, src_transform, dst_transform,
+         outdict) = _get_projection_plan(geodict, projection)
+        srctype = np.result_type(*layers)
+        if dtype is None:
+            dtype = srctype
+        dtype = np.dtype(dtype)
+
+        # stack the layers into one array of bands (a single layer is
+        # just viewed as one)
+        if len(layers) == 1:
+            source = np.asarray(layers[0])[np.newaxis]
+        else:
+            source = np.empty((len(layers), geodict.ny, geodict.nx),
+                              dtype=srctype)
+            for i, layer in enumerate(layers):
+                source[i] = layer
+
+        # allocate space for output data, or clear the buffer we were given
+        shape = (len(layers), outdict.ny, outdict.nx)
+        if out is None:
+            destination = np.zeros(shape, dtype=dtype)
         else:
-            txmax = geodict.xmax + 360
-            right = txmax - (geodict.dx / 2.0)
-        left = geodict.xmin - (geodict.dx / 2.0)
-        top = geodict.ymax + (geodict.dy / 2.0)
-        bottom = geodict.ymin + (geodict.dy / 2.0)
-
-        # use this convenience function to determine optimal output
-        # transform and dimensions
-        dst_transform, width, height = calculate_default_transform(
-            src_crs, dst_crs, ncols, nrows, left, bottom, right, top)
-
-        # allocate space for output data (very C-like)
-        destination = np.zeros((height, width))
-
-        # if the input has nan values, then tell reproject about that
-        # and set the output to that value as well
+            if out.shape != shape or out.dtype != dtype:
+                raise DataSetException('Output array must have shape %s '
+                                       'and type %s.' % (shape, dtype))
+            destination = out
+            destination.fill(0)
+
+        # only floating point data can hold NaN values, so tell reproject
+        # about them and set the output to NaN as well
         src_nan = None
         dst_nan = None
-        if np.any(np.isnan(self._data)):
-            src_nan = np.nan
-            dst_nan = np.nan
-        if self._data.dtype in (np.float32, np.float64):
+        if np.issubdtype(srctype, np.floating):
             src_nan = np.nan
             dst_nan = np.nan
 
         # call the reproject function
         reproject(
-            self._data,
+            source,
             destination,
             src_transform=src_transform,
             src_crs=src_crs,
             dst_transform=dst_transform,
             src_nodata=src_nan,
             dst_nodata=dst_nan,
-            dst_crs=projection,
-            resampling=int_method)
-
-        # get the pieces of the output transformation
-        xmin, dx, xrot, ymax, yrot, mdy = dst_transform.to_gdal()
-
-        # affine dy is negative, so we have to flip it back
-        dy = -1 * mdy
-
-        # correct for different pixel offsets
-        xmin = xmin + (dx / 2.0)
-        ymax = ymax - (dy / 2.0)
-
-        # if we crossed the meridian, we have to set the projection string
-        # to reflect where we actually are.
-        if crosses and lon_set:
-            projection = old_projection
-
-        # Construct a new GeoDict
-        gdict = {'xmin': xmin,
-                 'xmax': xmin + width * dx,
-                 'ymin': ymax - height * dy,
-                 'ymax': ymax,
-                 'dx': dx,
-                 'dy': dy,
-                 'nx': width,
-                 'ny': height,
-                 'projection': projection}
-        geodict = GeoDict(gdict, adjust='bounds')
+            dst_crs=dst_crs,
+            resampling=int_method,
+            num_threads=numThreads,
+            warp_mem_limit=warpMemLimit)
+
+        return (destination, outdict.copy())
+
+    def project(self, projection, method='bilinear', numThreads=1,
+                warpMemLimit=0):
+        """Project Grid2D data into desired projection.
+
+        :param projection:
+          Valid proj4 projection string.
+        :param method:
+          One of the sampling methods described here:
+              https://mapbox.github.io/rasterio/topics/resampling.html#resampling-methods
+        :param numThreads:
+          Number of threads GDAL uses to warp the data.
+        :param warpMemLimit:
+          Working memory (in MB) GDAL may use to warp the data, or 0 for
+          the GDAL default.
+        :raises DataSetException:
+          If input projection is not a valid Proj4 string.
+          If method is not a valid resampling method found in above URL.
+        :returns:
+          Re-projected Grid2D object.
+        """
+        # the projected data has always been double precision
+        destination, geodict = Grid2D.projectLayers(
+            [self._data], self._geodict, projection, method=method,
+            numThreads=numThreads, warpMemLimit=warpMemLimit,
+            dtype=np.float64)
 
         # Make a new Grid2D object and return it
-        newgrid = Grid2D(destination, geodict)
+        newgrid = Grid2D(destination[0], geodict, copy=False)
         return newgrid
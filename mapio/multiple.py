@@ -179,6 +179,47 @@ class MultiGrid(Grid):
         """
         return self._layers[layername].getValue(lat,lon,method=method,default=default)
 
+    def sample(self,lats,lons,layers=None,method='nearest',default=None,nanPolicy='propagate'):
+        """Sample several layers at the same latitudes and longitudes.
+
+        The cells and weights of each point are computed once and applied to every layer, 
+        which is much faster than calling getValue() for each layer.
+        
+        :param lats: 
+           Latitude(s) (in decimal degrees) of desired data values.
+        :param lons: 
+           Longitude(s) (in decimal degrees) of desired data values.
+        :param layers:
+           List of names of layers to sample, or None for all layers.
+        :param method:
+           Interpolation method, one of ('nearest','linear','cubic') (see Grid2D.getValue()).
+        :param default:
+           Default value to return when lat/lon is outside of grid bounds, or an array of 
+           per-point defaults the shape of lats.
+        :param nanPolicy:
+           How 'linear' and 'cubic' treat NaN cells, one of ('propagate','renormalize').
+        :returns: 
+           OrderedDict of sampled values (scalars, or arrays the shape of lats), keyed by layer name.
+        :raises DataSetException:
+           When a layer name is not in the MultiGrid, or lat/lon is outside of bounds and default is None.
+        """
+        if layers is None:
+            layers = list(self._layers.keys())
+        for layername in layers:
+            if layername not in self._layers:
+                raise DataSetException('Layer %s not found in MultiGrid.' % layername)
+        samples = OrderedDict()
+        if not len(layers):
+            return samples
+        if method not in ['nearest','linear','cubic']:
+            raise NotImplementedError('nearest, linear and cubic are the only interpolation methods currently supported.')
+        # all layers share one geodict, and therefore one sampling plan
+        plan,inside,shape = self._layers[layers[0]]._getPointPlan(lats,lons,method)
+        for layername in layers:
+            layer = self._layers[layername]
+            samples[layername] = layer._applyPointPlan(plan,inside,shape,default,nanPolicy)
+        return samples
+
     def getLatLon(self,row,col):
         """Return geographic coordinates (lat/lon decimal degrees) for given data row and column.
         
@@ -228,6 +269,74 @@ class MultiGrid(Grid):
             layers[layername] = layer.subdivide(finerdict,cellFill=cellFill)
         return MultiGrid(layers)
     
+    def blockReduce(self,geodict,stat='mean'):
+        """
+        Aggregate all layers onto a coarser grid.
+
+        :param geodict:
+          GeoDict object defining a grid with resolution coarser than (or equal to) the host grid.
+        :param stat:
+          One of 'mean','sum','max','min','median','mode','count' (see Grid2D.blockReduce()).
+        :returns:
+          MultiGrid instance with the coarse values of each layer.
+        """
+        layers = OrderedDict()
+        for (layername,layer) in self._layers.items():
+            layers[layername] = layer.blockReduce(geodict,stat=stat)
+        return MultiGrid(layers)
+
+    def blockmean(self,geodict):
+        """
+        Average all layers onto a coarser grid.
+
+        :param geodict:
+          GeoDict object defining a grid with resolution coarser than (or equal to) the host grid.
+        :returns:
+          MultiGrid instance with the mean values of each layer.
+        """
+        return self.blockReduce(geodict,stat='mean')
+    
+    def project(self,projection,method='bilinear',numThreads=1,warpMemLimit=0,out=None):
+        """
+        Project all layers into desired projection with a single warp.
+
+        :param projection:
+          Valid proj4 projection string.
+        :param method:
+          One of the sampling methods described here:
+              https://mapbox.github.io/rasterio/topics/resampling.html#resampling-methods
+        :param numThreads:
+          Number of threads GDAL uses to warp the data.
+        :param warpMemLimit:
+          Working memory (in MB) GDAL may use to warp the data, or 0 for the GDAL default.
+        :param out:
+          Optional MultiGrid returned by a previous call with the same projection 
+          (on a grid with the same geodict), whose layer data is overwritten with the 
+          projected data instead of allocating new arrays.
+        :raises DataSetException:
+          If input projection is not a valid Proj4 string.
+          If method is not a valid resampling method (see Grid2D.project()).
+        :returns:
+          MultiGrid instance with the projected layers, in the data type of the input layers.
+        """
+        data,geodict = self._projectLayers(projection,method,numThreads,warpMemLimit,out)
+        layers = OrderedDict()
+        for i,layername in enumerate(self._layers.keys()):
+            layers[layername] = Grid2D(data[i],geodict.copy(),copy=False)
+        return MultiGrid(layers,descriptions=list(self._descriptions.values()))
+
+    def _projectLayers(self,projection,method,numThreads,warpMemLimit,out):
+        #the projected layers are views into one array of bands, which out must share
+        buffer = None
+        if out is not None:
+            buffer = out.getLayer(list(out.getLayerNames())[0]).getData().base
+            if buffer is None or buffer.ndim != 3 or len(buffer) != len(self._layers):
+                raise DataSetException('Output MultiGrid was not created by project().')
+        layers = [layer.getData() for layer in self._layers.values()]
+        return Grid2D.projectLayers(layers,self._geodict,projection,method=method,
+                                    numThreads=numThreads,warpMemLimit=warpMemLimit,
+                                    out=buffer)
+
     def interpolateToGrid(self,geodict,method='linear'):
         """
         Given a geodict specifying another grid extent and resolution, resample all grids to match.
@@ -245,6 +354,8 @@ class MultiGrid(Grid):
         This function modifies the internal griddata and geodict object variables.
         """
         layers = OrderedDict()
+        #all layers share one geodict, so the resampling plan is built for the first
+        #layer and pulled from the plan cache for the rest.
         for (layername,layer) in self._layers.items():
             #layer.interpolateToGrid(geodict,method=method)
             layers[layername] = layer.interpolateToGrid(geodict,method=method)
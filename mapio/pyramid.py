@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+# stdlib imports
+import os.path
+
+# third party imports
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+
+# local imports
+from .dataset import DataSetException
+from .geodict import GeoDict
+
+# decimation factors of the levels of a pyramid, finest first
+PYRAMID_FACTORS = [2, 4, 8, 16]
+
+# relative tolerance when comparing level and sampling resolutions
+_RES_TOL = 1e-6
+
+
+def get_level_filename(filename, factor):
+    """Get the name of the file holding one level of a grid file's pyramid.
+
+    :param filename:
+      Name of the full resolution grid file.
+    :param factor:
+      Decimation factor of the level.
+    :returns:
+      Name of the level file (i.e., grid_ovr4.grd for grid.grd).
+    """
+    base, ext = os.path.splitext(filename)
+    return '%s_ovr%i%s' % (base, factor, ext)
+
+
+def get_level_geodict(geodict, factor):
+    """Get the GeoDict of one level of a grid's pyramid.
+
+    Each level cell is a block of factor x factor grid cells, starting in
+    the upper left corner of the grid.  The partial blocks left over on
+    the right and bottom edges are not part of the level.
+
+    :param geodict:
+      GeoDict of the full resolution grid.
+    :param factor:
+      Decimation factor of the level.
+    :returns:
+      GeoDict of the level, or None if the grid is too small to hold two
+      level cells in each direction.
+    """
+    nx = geodict.nx // factor
+    ny = geodict.ny // factor
+    if nx < 2 or ny < 2:
+        return None
+    dx = geodict.dx * factor
+    dy = geodict.dy * factor
+    xmin = geodict.xmin + geodict.dx * (factor - 1) / 2.0
+    ymax = geodict.ymax - geodict.dy * (factor - 1) / 2.0
+    xmax = xmin + (nx - 1) * dx
+    if xmax > 180:
+        xmax -= 360
+    ymin = ymax - (ny - 1) * dy
+    return GeoDict({'xmin': xmin, 'xmax': xmax,
+                    'ymin': ymin, 'ymax': ymax,
+                    'dx': dx, 'dy': dy,
+                    'nx': nx, 'ny': ny})
+
+
+def build_pyramid(grid, filename, format=None, factors=PYRAMID_FACTORS,
+                  stat='mean'):
+    """Save a pyramid of coarser copies of a grid next to the grid file.
+
+    Each level is saved with the save() method of the grid (i.e., a
+    GMTGrid or GDALGrid), to a file named by get_level_filename().
+    GMTGrid.load(), GDALGrid.load() and reader.read() then read coarse
+    sampling grids from the coarsest adequate level (see
+    get_pyramid_file()).  Build the pyramid after saving the grid file,
+    since levels older than the grid file are ignored.
+
+    :param grid:
+      GMTGrid or GDALGrid object, as saved to filename.
+    :param filename:
+      Name of the full resolution grid file.
+    :param format:
+      Format passed to the save() method of the grid, or None for its
+      default format.
+    :param factors:
+      Decimation factors of the levels.  Levels too small to hold two
+      cells in each direction are skipped.
+    :param stat:
+      Statistic of the grid cells in each level cell (see
+      Grid2D.blockReduce()), i.e. 'mean' for continuous data or 'mode'
+      for categories.
+    :returns:
+      List of the names of the level files saved.
+    :raises DataSetException:
+      When a factor is not an integer of 2 or more.
+    """
+    levelfiles = []
+    geodict = grid.getGeoDict()
+    dtype = grid.getData().dtype
+    for factor in factors:
+        if int(factor) != factor or factor < 2:
+            raise DataSetException('Pyramid factors must be integers of 2 '
+                                   'or more.')
+        leveldict = get_level_geodict(geodict, int(factor))
+        if leveldict is None:
+            continue
+        level = grid.blockReduce(leveldict, stat=stat)
+        data = level.getData()
+        # keep floating point data in its own precision, and categories in
+        # their own type
+        if np.issubdtype(dtype, np.floating) or \
+                stat in ['max', 'min', 'mode']:
+            data = data.astype(dtype)
+        elif data.dtype == np.float64:
+            data = data.astype(np.float32)
+        level = grid.__class__(data, leveldict)
+        levelfile = get_level_filename(filename, int(factor))
+        if format is None:
+            level.save(levelfile)
+        else:
+            level.save(levelfile, format=format)
+        levelfiles.append(levelfile)
+    return levelfiles
+
+
+def get_pyramid_file(filename, filegeodict, samplegeodict, method='linear',
+                     factors=PYRAMID_FACTORS):
+    """Pick the coarsest pyramid level of a grid file adequate for
+    resampling to a sampling grid.
+
+    A level is adequate when its cells are no coarser than the sampling
+    grid cells, it contains the sampling grid, and its file is no older
+    than the grid file.  'conservative' resampling (which sums the grid
+    cells) always uses the grid file.
+
+    :param filename:
+      Name of the full resolution grid file.
+    :param filegeodict:
+      GeoDict of the full resolution grid file.
+    :param samplegeodict:
+      GeoDict of the sampling grid.
+    :param method:
+      Resampling method (see Grid2D.interpolateToGrid()).
+    :param factors:
+      Decimation factors of the levels to look for.
+    :returns:
+      Tuple of (filename, geodict) of the level, or of the grid file
+      itself when no level is adequate.
+    """
+    if method == 'conservative':
+        return (filename, filegeodict)
+    try:
+        mtime = os.path.getmtime(filename)
+    except OSError:
+        return (filename, filegeodict)
+    for factor in sorted(factors, reverse=True):
+        if filegeodict.dx * factor > samplegeodict.dx * (1 + _RES_TOL) or \
+                filegeodict.dy * factor > samplegeodict.dy * (1 + _RES_TOL):
+            continue
+        levelfile = get_level_filename(filename, factor)
+        if not os.path.isfile(levelfile) or \
+                os.path.getmtime(levelfile) < mtime:
+            continue
+        leveldict = get_level_geodict(filegeodict, factor)
+        if leveldict is None or not leveldict.contains(samplegeodict):
+            continue
+        return (levelfile, leveldict)
+    return (filename, filegeodict)
+
+
+def build_overviews(filename, factors=PYRAMID_FACTORS, method='average'):
+    """Add GDAL overviews to a raster file.
+
+    GeoTIFF files hold the overviews internally, other formats get a
+    sidecar .ovr file.  reader.read() uses them to read coarse sampling
+    grids when called with decimate=True.
+
+    :param filename:
+      Name of a raster file that rasterio can open for update, or for
+      reading when the format can not be updated.
+    :param factors:
+      Decimation factors of the overviews.
+    :param method:
+      Name of the GDAL resampling method used to build the overviews
+      (i.e., 'average', 'nearest' or 'mode').
+    """
+    resampling = Resampling[method]
+    try:
+        src = rasterio.open(filename, 'r+')
+    except rasterio.errors.RasterioIOError:
+        src = rasterio.open(filename)
+    with src:
+        src.build_overviews(list(factors), resampling)
+        src.update_tags(ns='rio_overview', resampling=method)
@@ -1,11 +1,35 @@
+# stdlib imports
+import os
+import threading
+from contextlib import contextmanager
+
 # third party imports
 import numpy as np
 import rasterio
 import h5py
+from rasterio.enums import Resampling
 
 # local imports
-from .grid2d import Grid2D
+from .grid2d import Grid2D, _get_pad_dtype
 from .geodict import GeoDict
+from .dataset import DataSetException
+from .cache import LRUCache
+from .pyramid import get_pyramid_file
+
+# maximum number of files kept open between calls to read()
+DATASET_POOL_SIZE = 16
+
+# maximum size (bytes) of the chunk cache of an HDF file read with h5py
+HDF_CACHE_BYTES = 64 * 1024**2
+
+# sampling grids at least this many times coarser than the file are read
+# decimated (see _read_decimated())
+DECIMATE_FACTOR = 2
+
+# GDAL resampling used to decimate a file for each interpolation method
+DECIMATE_METHODS = {'nearest': Resampling.nearest,
+                    'linear': Resampling.bilinear,
+                    'cubic': Resampling.cubic}
 
 
 def _is_hdf(filename):
@@ -54,7 +78,137 @@ def _get_geodict_from_src(src):
     return gd
 
 
-def _get_geodict_from_window(affine, window, data):
+class _Dataset(object):
+    """An open raster file, with the properties read() needs from it.
+
+    Reading from a rasterio dataset is not thread-safe, so a thread must
+    hold lock while it uses src.
+    """
+
+    def __init__(self, filename, stamp=None):
+        """Open a raster file.
+
+        Args:
+            filename (str): rasterio supported file format.
+            stamp (tuple): Modification time and size of the file when it
+                           was opened, or None if it is not pooled.
+        """
+        self.src = rasterio.open(filename)
+        self.stamp = stamp
+        self.transform = self.src.transform
+        self.nodata = self.src.nodata
+        self.geodict = _get_geodict_from_src(self.src)
+        # only netCDF files are read through h5py, so only those are sniffed
+        self.is_hdf = False
+        if self.src.driver == 'netCDF':
+            try:
+                self.is_hdf = _is_hdf(self.src.files[0])
+            except (IndexError, OSError):
+                pass
+        self.lock = threading.Lock()
+        self.closed = False
+        self._hdffile = None
+        self._hdfgrid = None
+        self._cachebytes = 0
+
+    def get_hdf_grid(self, ncols):
+        """Get the grid of an HDF (NetCDF4) file, opened with h5py.
+
+        The file stays open until the dataset is closed.  For a chunked
+        grid, the chunk cache is grown (up to HDF_CACHE_BYTES) to hold a
+        row of the chunks spanned by ncols columns, so that reading a
+        window one row of chunks at a time decompresses every chunk once.
+
+        Args:
+            ncols (int): Number of grid columns in the request.
+        Returns:
+            h5py.Dataset: Grid, with rows stored bottom up.
+        """
+        if self._hdffile is None:
+            self._hdffile = h5py.File(self.src.files[0], 'r')
+            self._hdfgrid = self._hdffile['z']
+        grid = self._hdfgrid
+        if grid.chunks is None or self._cachebytes >= HDF_CACHE_BYTES:
+            return grid
+        chunkrows, chunkcols = grid.chunks
+        chunkbytes = chunkrows * chunkcols * grid.dtype.itemsize
+        nchunks = -(-ncols // chunkcols) + 1
+        nbytes = min(max(nchunks * chunkbytes, 1024**2), HDF_CACHE_BYTES)
+        if nbytes > self._cachebytes:
+            # HDF5 suggests ~100 hash slots per cached chunk
+            nslots = 100 * max(nbytes // chunkbytes, 1) + 1
+            dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+            dapl.set_chunk_cache(nslots, nbytes, 0.75)
+            self._hdfgrid = h5py.Dataset(
+                h5py.h5d.open(self._hdffile.id, b'z', dapl))
+            self._cachebytes = nbytes
+        return self._hdfgrid
+
+    def close(self):
+        """Close the file, waiting for any thread reading from it.
+        """
+        with self.lock:
+            if not self.closed:
+                if self._hdffile is not None:
+                    self._hdffile.close()
+                    self._hdffile = None
+                    self._hdfgrid = None
+                self.src.close()
+                self.closed = True
+
+
+# open datasets of recently read files, keyed on absolute path
+_DATASET_POOL = LRUCache(maxsize=DATASET_POOL_SIZE,
+                         onEvict=_Dataset.close)
+
+
+@contextmanager
+def _open_dataset(filename):
+    """Get exclusive use of an open dataset from the pool.
+
+    The dataset is re-opened when the file has changed since it was
+    pooled.  Files that are not on the local file system are opened for
+    this use only.
+
+    Args:
+        filename (str): rasterio supported file format.
+    Yields:
+        _Dataset: Open dataset, locked for the calling thread.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        dataset = _Dataset(filename)
+        try:
+            yield dataset
+        finally:
+            dataset.close()
+        return
+    path = os.path.abspath(filename)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    while True:
+        dataset = _DATASET_POOL.get(path)
+        if dataset is None or dataset.stamp != stamp:
+            dataset = _Dataset(path, stamp)
+            _DATASET_POOL.put(path, dataset)
+        dataset.lock.acquire()
+        # another thread may have evicted and closed it in the meantime
+        if not dataset.closed:
+            break
+        dataset.lock.release()
+    try:
+        yield dataset
+    finally:
+        dataset.lock.release()
+
+
+def close_datasets():
+    """Close all of the files held open between calls to read().
+    """
+    _DATASET_POOL.clear()
+
+
+def _get_geodict_from_window(affine, window, data, step=(1, 1)):
     """Return a geodict from a rasterio Window object.
 
     Args:
@@ -63,15 +217,17 @@ def _get_geodict_from_window(affine, window, data):
         window (Window): Object describing the subset of the data that
                          was read from the file.
         data (ndarray): Data which was read from the file.
+        step (tuple): Number of file rows and columns between the rows
+                      and columns of data.
     Returns:
         GeoDict: GeoDict describing the Window of data read in.
     """
     xmin, ymax = affine * (window.col_off, window.row_off)
     geodict = {}
-    geodict['dx'] = affine.a
-    geodict['dy'] = -1 * affine.e
-    geodict['xmin'] = xmin + geodict['dx'] / 2.0
-    geodict['ymax'] = ymax - geodict['dy'] / 2.0
+    geodict['dx'] = affine.a * step[1]
+    geodict['dy'] = -1 * affine.e * step[0]
+    geodict['xmin'] = xmin + affine.a / 2.0
+    geodict['ymax'] = ymax + affine.e / 2.0
     nrows, ncols = data.shape
     geodict['ny'] = nrows
     geodict['nx'] = ncols
@@ -156,66 +312,102 @@ def _geodict_to_window(geodict, src, pad=False):
     return window
 
 
-def _read_pixels(src, window):
+def _read_hdf(dataset, window, step=(1, 1)):
+    """Read pixels from an HDF (NetCDF4) file with h5py.
+
+    The window is read in bands of rows lining up with the chunks of the
+    grid, straight into the output array.
+
+    Args:
+        dataset (_Dataset): Open dataset.
+        window (Window): Object describing the subset of the data that
+                         we wish to read from the file, or None for all
+                         of it.
+        step (tuple): Read every step[0]th row and step[1]th column of
+                      the window, starting with the first.
+    Returns:
+        ndarray: Numpy array containing data read, top row first (a
+                 flipped view of the rows read from the file).
+    """
+    src = dataset.src
+    if window is None:
+        window = rasterio.windows.Window(0, 0, src.width, src.height)
+    rowstep, colstep = step
+    cstart = int(window.col_off)
+    cend = cstart + int(window.width)
+    rend = src.height - int(window.row_off)
+    # rows are stored bottom up, so stride up from the bottom
+    # of the rows we want
+    nrows = (int(window.height) - 1) // rowstep + 1
+    ncols = (int(window.width) - 1) // colstep + 1
+    rstart = rend - 1 - (nrows - 1) * rowstep
+    grid = dataset.get_hdf_grid(cend - cstart)
+    data = np.empty((nrows, ncols), dtype=grid.dtype)
+    chunkrows = grid.chunks[0] if grid.chunks is not None else src.height
+    # t1 = time.time()
+    row = rstart
+    irow = 0
+    while irow < nrows:
+        # the rows up to the next chunk boundary
+        boundary = (row // chunkrows + 1) * chunkrows
+        n = min(nrows - irow, (boundary - row - 1) // rowstep + 1)
+        rows = slice(row, row + (n - 1) * rowstep + 1, rowstep)
+        grid.read_direct(data, np.s_[rows, cstart:cend:colstep],
+                         np.s_[irow:irow + n, :])
+        row += n * rowstep
+        irow += n
+    # t2 = time.time()
+    # print('h5py read: %.3f seconds.' % (t2-t1))
+    return np.flipud(data)
+
+
+def _read_pixels(dataset, window, step=(1, 1)):
     """Read pixels from a rasterio supported file format.
 
     NB: At the time of this writing, rasterio reading of
     compressed HDF files can be *very* slow, so for this format
-    we are closing the input DatasetReader object, opening the
-    file with h5py, reading the data, closing the file, and re-creating
-    the DatasetReader object. This is why src is returned from the
-    function.
+    we are reading the data with h5py instead (see _read_hdf()).
 
     Args:
-        src (DatasetReader): Open rasterio DatasetReader object.
+        dataset (_Dataset): Open dataset.
         window (Window): Object describing the subset of the data that
                          we wish to read from the file.
+        step (tuple): Read every step[0]th row and step[1]th column of
+                      the window, starting with the first.
     Returns:
-        tuple: Numpy array containing data read, and a DatasetReader
-               object representing the open file (see NB above).
+        ndarray: Numpy array containing data read.
 
     """
-    fname = src.files[0]
-    is_hdf = _is_hdf(fname)
-    if src.driver != 'netCDF' or not is_hdf:
-        data = np.squeeze(src.read(window=window), axis=0)
-    else:
-        src.close()
-        f = h5py.File(fname, 'r')
-        if window is None:
-            data = np.flipud(f['z'])
-        else:
-            cstart = int(window.col_off)
-            cend = cstart + int(window.width)
-            rend = src.height - int(window.row_off)
-            rstart = rend - int(window.height)
-            # t1 = time.time()
-            data = np.flipud(f['z'][rstart:rend, cstart:cend])
-            # t2 = time.time()
-            # print('h5py read: %.3f seconds.' % (t2-t1))
-        f.close()
-        src = rasterio.open(fname)
+    if dataset.is_hdf:
+        return _read_hdf(dataset, window, step=step)
+    rowstep, colstep = step
+    data = np.squeeze(dataset.src.read(window=window), axis=0)
+    if rowstep > 1 or colstep > 1:
+        data = np.ascontiguousarray(data[::rowstep, ::colstep])
 
     # some kinds of files have NaN values encoded as special values like
     # -9999. I would have thought that rasterio w
-    return (data, src)
+    return data
 
 
-def _read_data(src, samplegeodict, resample, method):
+def _read_data(dataset, samplegeodict, resample, method, step=(1, 1)):
     """Read data from an open file, given subsetting/sampling information.
 
     This method will handle reading across the 180 meridian in the case
     of a global file, and a samplegeodict that spans that meridian.
 
     Args:
-        src (DatasetReader): Open rasterio DatasetReader object.
+        dataset (_Dataset): Open dataset.
         samplegeodict (GeoDict): GeoDict describing the subset we wish to read.
         resample (bool): True if resampling should be performed.
         method (str): One of ('nearest','linear').
+        step (tuple): Keep every step[0]th row and step[1]th column of the
+                      data, starting with the first.
     Returns:
         Grid2D: Object containing data and geospatial information.
     """
-    affine = src.transform
+    src = dataset.src
+    affine = dataset.transform
     dx = affine.a
     dy = -1 * affine.e
     is_edge = samplegeodict.xmax < samplegeodict.xmin
@@ -227,10 +419,10 @@ def _read_data(src, samplegeodict, resample, method):
         window = _geodict_to_window(samplegeodict,
                                     src,
                                     pad=pad)
-        data, src = _read_pixels(src, window)
-        gd = _get_geodict_from_window(affine, window, data)
-        gd.nodata = src.nodata
-        grid = Grid2D(data, gd)
+        data = _read_pixels(dataset, window, step=step)
+        gd = _get_geodict_from_window(affine, window, data, step=step)
+        gd.nodata = dataset.nodata
+        grid = Grid2D(data, gd, copy=False)
         return grid
     else:
         # split the windowing into two pieces - xmin to right edge
@@ -252,10 +444,10 @@ def _read_data(src, samplegeodict, resample, method):
                                                  ymin, ymax, dx, dy)
         left_window = _geodict_to_window(sample_left, src, pad=pad)
 
-        left_block, src = _read_pixels(src, left_window)
+        left_block = _read_pixels(dataset, left_window)
 
         right_window = _geodict_to_window(sample_right, src, pad=pad)
-        right_block, src = _read_pixels(src, right_window)
+        right_block = _read_pixels(dataset, right_window)
 
         left_gd = _get_geodict_from_window(affine,
                                            left_window,
@@ -265,9 +457,19 @@ def _read_data(src, samplegeodict, resample, method):
                                             right_window,
                                             right_block)
         data = np.concatenate((left_block, right_block), axis=1)
+        xmax = right_gd.xmax
+        rowstep, colstep = step
+        if rowstep > 1 or colstep > 1:
+            data = np.ascontiguousarray(data[::rowstep, ::colstep])
+            dx *= colstep
+            dy *= rowstep
+            xmax = left_gd.xmin + (data.shape[1] - 1) * dx
+            if xmax > 180:
+                xmax -= 360
+            ymin = ymax - (data.shape[0] - 1) * dy
         nrows, ncols = data.shape
         geodict = {'xmin': left_gd.xmin,
-                   'xmax': right_gd.xmax,
+                   'xmax': xmax,
                    'ymin': ymin,
                    'ymax': ymax,
                    'dx': dx,
@@ -275,10 +477,98 @@ def _read_data(src, samplegeodict, resample, method):
                    'nx': ncols,
                    'ny': nrows}
         gd = GeoDict(geodict)
-        grid = Grid2D(data, gd)
+        grid = Grid2D(data, gd, copy=False)
         return grid
 
 
+def _read_aligned(dataset, samplegeodict, stride):
+    """Read the cells of a sampling grid whose cells are all file cells.
+
+    Args:
+        dataset (_Dataset): Open dataset.
+        samplegeodict (GeoDict): GeoDict describing the sampling grid.
+        stride (tuple): Number of file rows and columns between sampling
+                        grid rows and columns (see
+                        Grid2D.getSampleStride()).
+    Returns:
+        Grid2D: Object containing the sampled data, or None if the data
+                read does not line up with the sampling grid.
+    """
+    readdict = Grid2D.getStrideGeoDict(dataset.geodict, samplegeodict,
+                                       stride)
+    grid = _read_data(dataset, readdict, False, 'nearest', step=stride)
+    data = Grid2D.sliceToSample(grid._data, grid._geodict, samplegeodict,
+                                (1, 1))
+    if data is None:
+        return None
+    copy = data.shape != grid._data.shape
+    if not copy:
+        data = grid._data
+    geodict = samplegeodict.copy()
+    geodict.nodata = dataset.nodata
+    return Grid2D(data, geodict, copy=copy)
+
+
+def _read_decimated(dataset, samplegeodict, method):
+    """Read the data surrounding a coarse sampling grid at about the
+    sampling resolution.
+
+    Args:
+        dataset (_Dataset): Open dataset.
+        samplegeodict (GeoDict): GeoDict describing the sampling grid.
+        method (str): Interpolation method that will be used to resample
+                      the data.
+    Returns:
+        Grid2D: Object containing the decimated data, or None if the
+                sampling grid is not coarse enough, or the data can not be
+                decimated (see read()).
+    """
+    filedict = dataset.geodict
+    rowfactor = int(np.floor(samplegeodict.dy / filedict.dy + 1e-6))
+    colfactor = int(np.floor(samplegeodict.dx / filedict.dx + 1e-6))
+    if min(rowfactor, colfactor) < DECIMATE_FACTOR or \
+            method not in DECIMATE_METHODS or dataset.is_hdf or \
+            samplegeodict.xmax < samplegeodict.xmin or \
+            not filedict.contains(samplegeodict):
+        return None
+
+    # the padded window has two sampling cells around the sampling grid
+    src = dataset.src
+    window = _geodict_to_window(samplegeodict, src, pad=True)
+    (row0, row1), (col0, col1) = window.toranges()
+    # GDAL reads from the finest overview at least as coarse as the
+    # decimation, snapping the window to its cells, so snap it here first
+    # to keep track of where the cells are.
+    factor = min(rowfactor, colfactor)
+    overview = max([f for f in src.overviews(1) if f <= factor] + [1])
+    row0, col0 = (row0 - row0 % overview, col0 - col0 % overview)
+    row1 = min(-(-row1 // overview) * overview, src.height)
+    col1 = min(-(-col1 // overview) * overview, src.width)
+    window = rasterio.windows.Window.from_slices((row0, row1), (col0, col1))
+    height, width = (row1 - row0, col1 - col0)
+    out_shape = (-(-height // rowfactor), -(-width // colfactor))
+    data = src.read(1, window=window, out_shape=out_shape,
+                    resampling=DECIMATE_METHODS[method])
+    west, north = dataset.transform * (window.col_off, window.row_off)
+    geodict = {}
+    geodict['dx'] = width * filedict.dx / out_shape[1]
+    geodict['dy'] = height * filedict.dy / out_shape[0]
+    geodict['xmin'] = west + geodict['dx'] / 2.0
+    geodict['ymax'] = north - geodict['dy'] / 2.0
+    geodict['ny'], geodict['nx'] = out_shape
+    geodict['xmax'] = geodict['xmin'] + (geodict['nx'] - 1) * geodict['dx']
+    geodict['ymin'] = geodict['ymax'] - (geodict['ny'] - 1) * geodict['dy']
+    gd = GeoDict(geodict)
+    gd.nodata = dataset.nodata
+
+    # near the edges of the file, the decimated cells may not surround
+    # the sampling grid
+    if gd.xmin > samplegeodict.xmin or gd.xmax < samplegeodict.xmax or \
+            gd.ymin > samplegeodict.ymin or gd.ymax < samplegeodict.ymax:
+        return None
+    return Grid2D(data, gd, copy=False)
+
+
 def get_file_geodict(filename):
     """Get the GeoDict describing the entire file.
 
@@ -287,14 +577,15 @@ def get_file_geodict(filename):
     Returns:
         GeoDict: GeoDict: GeoDict describing the entire file.
     """
-    src = rasterio.open(filename)
-    gd = _get_geodict_from_src(src)
+    with _open_dataset(filename) as dataset:
+        gd = dataset.geodict.copy()
     return gd
 
 
 def read(filename, samplegeodict=None, resample=False,
          method='linear', doPadding=False, padValue=np.nan,
-         apply_nan=True, force_cast=True):
+         apply_nan=True, force_cast=True, use_mask=False, decimate=False,
+         use_pyramid=True):
     """Read part or all of a rasterio file, resampling and padding as necessary.
 
     If samplegeodict is not provided, then the entire file will be read.
@@ -310,6 +601,9 @@ def read(filename, samplegeodict=None, resample=False,
     In addition to pad pixels, extra data may be read around the edges of
     the desired area to ensure raw data is read on integer row/column offsets.
 
+    Files are kept open between calls (up to DATASET_POOL_SIZE of them,
+    see close_datasets()), and re-opened when they change on disk.
+
     Args:
         filename (str): rasterio supported file format.
         samplegeodict (GeoDict): GeoDict describing the subset we wish to read.
@@ -320,22 +614,127 @@ def read(filename, samplegeodict=None, resample=False,
         padValue (float): Value to insert in ring of padding pixels.
         apply_nan (bool): Convert nodata values to NaNs, upcasting to float if necessary.
         force_cast (bool): If data values exceed 
+        use_mask (bool): With apply_nan, mark nodata values in a nodata mask
+                         (see Grid2D.getMask()) instead of converting them
+                         to NaN, so integer data stays integer.  Pad pixels
+                         are masked too, and hold padValue, or the nodata
+                         value if padValue does not fit the data type.
+        decimate (bool): When resampling to a grid at least DECIMATE_FACTOR
+                         times coarser than the file (in both directions),
+                         let GDAL read the file decimated to about the
+                         sampling resolution (from overviews, if the file
+                         has them) with the matching resampling method,
+                         and interpolate from that.  I/O and memory then
+                         scale with the sampling grid rather than the
+                         file, but the results differ slightly from
+                         interpolating the full resolution data, so this
+                         is off by default.  Not used for HDF files, 'conservative' resampling,
+                         sampling grids extending past the edges of the
+                         file, or sampling across the 180 meridian.
+        use_pyramid (bool): When resampling, read from the coarsest level
+                            of the file's pyramid (see
+                            pyramid.build_pyramid()) that is adequate for
+                            the sampling grid, if the file has one, unless
+                            the sampling grid cells are file cells (see
+                            Grid2D.getSampleStride()).  The GMTGrid.load()
+                            and GDALGrid.load() option is usePyramid.
     """
-    # use rasterio to read all formats
-    src = rasterio.open(filename)
+    # sampling grids aligned with the file are read from it directly (see
+    # _read_aligned()), and other coarse sampling grids from the coarsest
+    # adequate level of the file's pyramid, if it has one
+    if resample and use_pyramid and samplegeodict is not None:
+        filedict = get_file_geodict(filename)
+        if Grid2D.getSampleStride(filedict, samplegeodict) is None:
+            filename, _ = get_pyramid_file(filename, filedict,
+                                           samplegeodict, method=method)
+
+    # use rasterio to read all formats.  The file is locked only while the
+    # data is read from it, so other threads can read it while this one
+    # converts, pads and resamples the data.
+    with _open_dataset(filename) as dataset:
+        filedict = dataset.geodict
+        nodata = dataset.nodata
+        grid, source = _read_raw(dataset, samplegeodict, resample, method,
+                                 decimate)
+    return _read(grid, source, filedict, nodata, samplegeodict, resample,
+                 method, doPadding, padValue, apply_nan, force_cast,
+                 use_mask)
+
+
+def _read_raw(dataset, samplegeodict, resample, method, decimate):
+    """Read the data read() needs from an open dataset, as stored in it.
 
+    Args:
+        dataset (_Dataset): Open dataset.
+        See read() for the other arguments.
+    Returns:
+        tuple: (grid, source), where grid is a Grid2D object holding the
+               data, and source says what it holds, one of 'file' (the
+               whole file), 'aligned' (the sampling grid cells, see
+               _read_aligned()), 'decimated' (see _read_decimated()) or
+               'window' (the file cells around the sampling grid).
+    """
     # first establish if we are subsetting the data.
     # if not, read the whole file and return.
     if samplegeodict is None:
-        data, src = _read_pixels(src, None)
-        gd = _get_geodict_from_src(src)
-        grid = Grid2D(data, gd)
-        src.close()
-        return grid
+        data = _read_pixels(dataset, None)
+        gd = dataset.geodict.copy()
+        grid = Grid2D(data, gd, copy=False)
+        return (grid, 'file')
+
+    # If the sample grid is aligned with the file grid (at the same
+    # resolution, or an integer multiple of it), then resampling won't
+    # accomplish anything, so read just the sample cells from the file.
+    stride = None
+    if resample:
+        stride = Grid2D.getSampleStride(dataset.geodict, samplegeodict)
+    if stride is not None:
+        grid = _read_aligned(dataset, samplegeodict, stride)
+        if grid is not None:
+            return (grid, 'aligned')
+
+    # A sampling grid much coarser than the file is interpolated from
+    # data read at about its own resolution.
+    if resample and decimate:
+        grid = _read_decimated(dataset, samplegeodict, method)
+        if grid is not None:
+            return (grid, 'decimated')
 
     # if non-nearest resampling, this grid may have a ring of padding pixels
     # around the outside.
-    grid = _read_data(src, samplegeodict, resample, method)
+    grid = _read_data(dataset, samplegeodict, resample, method)
+    return (grid, 'window')
+
+
+def _read(grid, source, filedict, nodata, samplegeodict, resample, method,
+          doPadding, padValue, apply_nan, force_cast, use_mask):
+    """Convert, pad and resample the data read from a file (see read()).
+
+    Args:
+        grid (Grid2D): Data read from the file.
+        source (str): What grid holds (see _read_raw()).
+        filedict (GeoDict): GeoDict describing the entire file.
+        nodata (float): The file's nodata value, or None.
+        See read() for the other arguments.
+    Returns:
+        Grid2D: Object containing data and geospatial information.
+    """
+    if source == 'file':
+        return grid
+
+    if source == 'aligned':
+        if apply_nan:
+            grid.applyNaN(force=force_cast, useMask=use_mask)
+        if method != 'nearest' and \
+                not np.issubdtype(grid._data.dtype, np.floating):
+            # match the data type interpolation would have produced
+            grid._data = grid._data.astype(np.float64)
+        return grid
+
+    if source == 'decimated':
+        if apply_nan:
+            grid.applyNaN(force=force_cast, useMask=use_mask)
+        return grid.interpolateToGrid(samplegeodict, method=method)
 
     # make sure this raw grid is big enough to support resampling
     # if padding is turned off
@@ -358,22 +757,136 @@ def read(filename, samplegeodict=None, resample=False,
                    'edge of grid.')
             raise IndexError(msg)
 
-    grid._geodict.nodata = src.nodata
+    grid._geodict.nodata = nodata
     if apply_nan:
-        grid.applyNaN(force=force_cast)
+        grid.applyNaN(force=force_cast, useMask=use_mask)
 
     if doPadding:
-        filedict = get_file_geodict(filename)
         # use the padDict method of Grid2D to create our padded grid
         # Pad one row/col on all sides.
         pd = grid.getPadding(filedict, samplegeodict, doPadding=True)
-        data, gd = Grid2D.padGrid(grid._data, grid._geodict, pd)
-        if len(data[np.isinf(data)]):
-            data[np.isinf(data)] = padValue
-        grid = Grid2D(data, gd)
+        fill = padValue
+        dtype = grid._data.dtype
+        if use_mask and nodata is not None and \
+                _get_pad_dtype(dtype, padValue) != dtype:
+            fill = nodata
+        data, gd = Grid2D.padGrid(grid._data, grid._geodict, pd,
+                                  padValue=fill)
+        mask = grid.getMask()
+        if use_mask and data is not grid._data:
+            if mask is None:
+                mask = np.zeros(grid._data.shape, dtype=np.bool_)
+            mask, _ = Grid2D.padGrid(mask, grid._geodict, pd, padValue=True)
+        grid = grid._setMaskOf(Grid2D(data, gd, copy=False), mask)
 
     if resample:
         grid = grid.interpolateToGrid(samplegeodict, method=method)
 
-    src.close()
     return grid
+
+
+def _get_block_shape(dataset):
+    """Get the shape of the blocks (or chunks) the file is stored in.
+
+    Args:
+        dataset (_Dataset): Open dataset.
+    Returns:
+        tuple: (rows, cols) of one block, with rows counted from the top
+               of the grid for HDF files too.
+    """
+    src = dataset.src
+    if dataset.is_hdf:
+        chunks = dataset.get_hdf_grid(0).chunks
+        if chunks is None:
+            return (src.height, src.width)
+        return chunks
+    return src.block_shapes[0]
+
+
+def _get_tile_size(size, blocksize):
+    """Round a tile dimension up to a whole number of blocks.
+
+    Args:
+        size (int): Requested number of rows or columns of a tile.
+        blocksize (int): Number of rows or columns in a file block.
+    Returns:
+        int: Number of rows or columns in a tile.
+    """
+    # blocks bigger than a tile (i.e., strips of whole rows) are split
+    if blocksize > size:
+        return size
+    return -(-size // blocksize) * blocksize
+
+
+def iter_tiles(filename, tile_shape=None, halo=0, samplegeodict=None,
+               apply_nan=True, force_cast=True, use_mask=False):
+    """Read a rasterio file (or the part covering samplegeodict) a tile
+    at a time.
+
+    Tiles line up with the blocks (or chunks) the file is stored in, so
+    that every block is read once, and only one tile is held in memory
+    at a time.  Each tile can carry a halo of cells from its neighbours,
+    for resampling or filtering near its edges.  The file is not held
+    locked between tiles, so other threads can read it meanwhile.
+
+    Args:
+        filename (str): rasterio supported file format.
+        tile_shape (tuple): (rows, cols) of file cells in a tile, rounded
+                            up to a whole number of blocks.  By default,
+                            one block.
+        halo (int): Number of cells each tile extends into its
+                    neighbours (stopping at the edges of the file).
+        samplegeodict (GeoDict): GeoDict describing the subset we wish to
+                                 read (not resampled, and not crossing the
+                                 180 meridian).
+        apply_nan (bool): Convert nodata values to NaNs, upcasting to float
+                          if necessary.
+        force_cast (bool): See read().
+        use_mask (bool): See read().
+    Yields:
+        tuple: (rows, cols, grid), where grid is a Grid2D object holding a
+               tile and its halo, and rows and cols are the slices of the
+               grid data outside of the halo.  These cores of the tiles
+               cover the file (or subset) without overlapping.
+    Raises:
+        DataSetException: When samplegeodict crosses the 180 meridian.
+    """
+    with _open_dataset(filename) as dataset:
+        src = dataset.src
+        height, width = (src.height, src.width)
+        blockrows, blockcols = _get_block_shape(dataset)
+        if samplegeodict is None:
+            (row0, row1), (col0, col1) = ((0, height), (0, width))
+        else:
+            if samplegeodict.xmax < samplegeodict.xmin:
+                raise DataSetException('Tiles cannot be read across the '
+                                       '180 meridian.')
+            window = _geodict_to_window(samplegeodict, src)
+            (row0, row1), (col0, col1) = window.toranges()
+    if tile_shape is None:
+        tile_shape = (blockrows, blockcols)
+    tilerows = _get_tile_size(tile_shape[0], blockrows)
+    tilecols = _get_tile_size(tile_shape[1], blockcols)
+
+    # HDF rows are stored bottom up, so their blocks start at the bottom
+    rowphase = height % tilerows if dataset.is_hdf else 0
+    rowstart = row0 - (row0 - rowphase) % tilerows
+    colstart = col0 - col0 % tilecols
+    for top in range(rowstart, row1, tilerows):
+        trow0, trow1 = (max(top, row0), min(top + tilerows, row1))
+        hrow0, hrow1 = (max(trow0 - halo, 0), min(trow1 + halo, height))
+        for left in range(colstart, col1, tilecols):
+            tcol0, tcol1 = (max(left, col0), min(left + tilecols, col1))
+            hcol0, hcol1 = (max(tcol0 - halo, 0), min(tcol1 + halo, width))
+            window = rasterio.windows.Window.from_slices((hrow0, hrow1),
+                                                         (hcol0, hcol1))
+            with _open_dataset(filename) as dataset:
+                data = _read_pixels(dataset, window)
+                gd = _get_geodict_from_window(dataset.transform, window,
+                                              data)
+                gd.nodata = dataset.nodata
+            grid = Grid2D(data, gd, copy=False)
+            if apply_nan:
+                grid.applyNaN(force=force_cast, useMask=use_mask)
+            yield (slice(trow0 - hrow0, trow1 - hrow0),
+                   slice(tcol0 - hcol0, tcol1 - hcol0), grid)
@@ -0,0 +1,1361 @@
+#!/usr/bin/env python
+
+# stdlib imports
+import threading
+
+# third party imports
+import numpy as np
+from scipy import sparse
+from scipy.interpolate import BSpline
+from scipy.linalg import get_lapack_funcs
+from scipy.linalg.blas import daxpy
+
+# local imports
+from .dataset import DataSetException
+from .cache import LRUCache
+
+# number of sub/super diagonals in the cubic spline collocation matrix
+_SPLINE_KL = 2
+_SPLINE_KU = 2
+
+# free parameter of the Keys cubic convolution kernel
+_KEYS_A = -0.5
+
+# minimum fraction of the cubic kernel weight that must fall on valid cells
+# before we trust a renormalized cubic value over a linear one
+_CUBIC_MIN_WEIGHT = 0.5
+
+METHODS = ['nearest', 'linear', 'cubic']
+CELL_FILLS = ['min', 'max', 'mean']
+NAN_POLICIES = ['propagate', 'renormalize']
+
+# number of grid values gathered at a time when sampling points
+_POINT_BLOCK = 2**16
+
+# cell edges closer than this (in cells) to another grid's cell edge are
+# treated as lying on it
+_EDGE_TOL = 1e-6
+
+# number of grid cells per block of rows in sparse column passes
+_BLOCK_CELLS = 2**16
+
+# resampling plans for recently used (host, sample, method) combinations
+_PLAN_CACHE = LRUCache(maxsize=32)
+
+# cubic spline factorizations of recently used axis lengths
+_FACTOR_CACHE = LRUCache(maxsize=16)
+
+
+def _get_work_dtype(dtype):
+    """Return the floating point type used to interpolate data of a given type.
+
+    :param dtype:
+      numpy dtype of the input data.
+    :returns:
+      numpy.float32 for single precision (or smaller) floating point data,
+      numpy.float64 for everything else.
+    """
+    if dtype in (np.float16, np.float32):
+        return np.float32
+    return np.float64
+
+
+def _linear_taps(coords, n):
+    """Compute the two indices and weights per output coordinate needed
+    to linearly interpolate along one axis.
+
+    :param coords:
+      1D array of fractional pixel coordinates (0 is the center of the
+      first cell, n-1 the center of the last).
+    :param n:
+      Number of cells along the axis in the source grid.
+    :returns:
+      Tuple of (indices, weights), both arrays of shape (len(coords), 2).
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    nout = len(coords)
+    idx = np.zeros((nout, 2), dtype=np.intp)
+    weights = np.zeros((nout, 2), dtype=np.float64)
+    if n == 1:
+        weights[:, 0] = 1.0
+        return (idx, weights)
+    coords = np.clip(coords, 0, n - 1)
+    i0 = np.floor(coords).astype(np.intp)
+    np.clip(i0, 0, n - 2, out=i0)
+    frac = coords - i0
+    idx[:, 0] = i0
+    idx[:, 1] = i0 + 1
+    weights[:, 0] = 1.0 - frac
+    weights[:, 1] = frac
+    return (idx, weights)
+
+
+def _keys_taps(coords, n):
+    """Compute the four cubic convolution (Keys) indices and weights per
+    output coordinate along one axis.
+
+    Unlike the spline taps these are local and apply directly to data
+    values, so they can be used on grids containing NaN values.  Indices
+    past the edges of the grid are clamped to the edge cells.
+
+    :param coords:
+      1D array of fractional pixel coordinates.
+    :param n:
+      Number of cells along the axis in the source grid.
+    :returns:
+      Tuple of (indices, weights), both arrays of shape (len(coords), 4).
+    """
+    coords = np.clip(np.asarray(coords, dtype=np.float64), 0, n - 1)
+    i1 = np.floor(coords).astype(np.intp)
+    frac = coords - i1
+    idx = i1[:, None] + np.arange(-1, 3)[None, :]
+    np.clip(idx, 0, n - 1, out=idx)
+    # distance from each of the four taps
+    dist = np.abs(frac[:, None] - np.arange(-1, 3)[None, :])
+    return (idx, _keys_kernel(dist))
+
+
+def _keys_kernel(dist):
+    """Evaluate the Keys cubic convolution kernel.
+
+    :param dist:
+      Array of distances (in cells) from the interpolation point.
+    :returns:
+      Array of kernel weights, the same shape as dist.
+    """
+    a = _KEYS_A
+    near = (a + 2) * dist**3 - (a + 3) * dist**2 + 1
+    far = a * dist**3 - 5 * a * dist**2 + 8 * a * dist - 4 * a
+    return np.where(dist <= 1, near, np.where(dist < 2, far, 0.0))
+
+
+def _drop_zero_taps(taps):
+    """Redirect taps with zero weight onto the dominant tap of their row.
+
+    A zero weight times an infinite or NaN neighbour is still NaN, which
+    would leak invalid values into outputs that lie exactly on a valid
+    cell.  Zero weights only occur when an output coordinate falls on a
+    source cell (weight 1), so every tap in such a row is pointed at that
+    cell with an equal share of its weight.  For two or four taps the
+    result is bit-for-bit the cell value.
+
+    :param taps:
+      Tuple of (indices, weights), each of shape (nout, ntaps).
+    :returns:
+      Tuple of (indices, weights) with no zero weights.
+    """
+    idx, weights = taps
+    rows = np.where((weights == 0).any(axis=1))[0]
+    if not len(rows):
+        return taps
+    idx = idx.copy()
+    weights = weights.copy()
+    ntaps = idx.shape[1]
+    best = np.argmax(np.abs(weights[rows]), axis=1)
+    idx[rows, :] = idx[rows, best][:, None]
+    weights[rows, :] = (weights[rows, best] / ntaps)[:, None]
+    return (idx, weights)
+
+
+def _spline_taps(coords, n):
+    """Compute the four B-spline indices and weights per output coordinate
+    needed to evaluate a not-a-knot cubic spline along one axis.
+
+    The weights are applied to spline *coefficients* (see
+    _spline_prefilter), not to the data values themselves.
+
+    :param coords:
+      1D array of fractional pixel coordinates.
+    :param n:
+      Number of cells along the axis in the source grid (must be >= 4).
+    :returns:
+      Tuple of (indices, weights), both arrays of shape (len(coords), 4).
+    """
+    coords = np.clip(np.asarray(coords, dtype=np.float64), 0, n - 1)
+    knots = _spline_knots(n)
+    dmatrix = BSpline.design_matrix(coords, knots, 3)
+    idx = dmatrix.indices.reshape((len(coords), 4)).astype(np.intp)
+    weights = dmatrix.data.reshape((len(coords), 4))
+    return (idx, weights)
+
+
+def _spline_knots(n):
+    """Return the not-a-knot cubic spline knot vector for n unit-spaced
+    samples.
+
+    :param n:
+      Number of samples (must be >= 4).
+    :returns:
+      1D array of knots.
+    """
+    x = np.arange(n, dtype=np.float64)
+    return np.concatenate(([0.0] * 4, x[2:-2], [n - 1.0] * 4))
+
+
+def _spline_factor(n):
+    """Factor the collocation matrix of the not-a-knot cubic spline through
+    n unit-spaced samples.
+
+    The factors only depend on n, so they are cached and shared between
+    plans.
+
+    :param n:
+      Number of samples (must be >= 4).
+    :returns:
+      Tuple of (lu, piv, sweep), where lu and piv are as returned by LAPACK
+      gbtrf, with two sub- and two super-diagonals, and sweep holds the
+      same factors as elimination steps for _spline_sweep() (None if the
+      factorization pivoted).
+    """
+    factor = _FACTOR_CACHE.get(n)
+    if factor is not None:
+        return factor
+    idx, weights = _spline_taps(np.arange(n, dtype=np.float64), n)
+    ab = np.zeros((2 * _SPLINE_KL + _SPLINE_KU + 1, n), dtype=np.float64)
+    rows = np.repeat(np.arange(n), 4)
+    cols = idx.ravel()
+    weights = weights.ravel()
+    # the end rows carry explicit zeros outside of the band
+    keep = weights != 0
+    rows, cols, weights = rows[keep], cols[keep], weights[keep]
+    ab[_SPLINE_KL + _SPLINE_KU + rows - cols, cols] = weights
+    gbtrf, = get_lapack_funcs(('gbtrf',), dtype=np.float64)
+    lu, piv, info = gbtrf(ab, _SPLINE_KL, _SPLINE_KU)
+    if info != 0:
+        raise DataSetException('Could not factor cubic spline matrix.')
+    # B-spline collocation matrices are totally positive, so elimination
+    # without pivoting is stable and gbtrf does not pivot in practice
+    sweep = None
+    if np.array_equal(piv, np.arange(n)):
+        sweep = _get_sweep(lu, n)
+    factor = (lu, piv, sweep)
+    _FACTOR_CACHE.put(n, factor)
+    return factor
+
+
+def _get_sweep(lu, n):
+    """Convert unpivoted banded LU factors into elimination steps.
+
+    :param lu:
+      LU factors in LAPACK band storage, as returned by gbtrf.
+    :param n:
+      Number of rows of the factored matrix.
+    :returns:
+      Tuple of (forward, scale, backward), where forward and backward are
+      lists of (row, ((offset, weight), ...)) steps of the unit lower and
+      unit upper triangular solves, and scale is the 1D array of inverse
+      pivots applied in between.
+    """
+    diag = _SPLINE_KL + _SPLINE_KU
+    scale = 1.0 / lu[diag]
+    forward = []
+    backward = []
+    for i in range(n):
+        # L[i, i - k] is stored at lu[diag + k, i - k]
+        taps = tuple((k, lu[diag + k, i - k])
+                     for k in range(1, _SPLINE_KL + 1)
+                     if i - k >= 0 and lu[diag + k, i - k] != 0)
+        if taps:
+            forward.append((i, taps))
+        # U[i, i + k] is stored at lu[diag - k, i + k]
+        taps = tuple((k, lu[diag - k, i + k] * scale[i])
+                     for k in range(1, diag + 1)
+                     if i + k < n and lu[diag - k, i + k] != 0)
+        if taps:
+            backward.append((i, taps))
+    return (forward, scale, backward[::-1])
+
+
+def _spline_sweep(coeffs, sweep):
+    """Solve for spline coefficients along the first axis, in place.
+
+    Each elimination step works on a whole row at a time, so the solve
+    runs at numpy speed however many columns there are, which is much
+    faster than a LAPACK solve per column.
+
+    :param coeffs:
+      2D C-contiguous float64 array of data values, replaced by the spline
+      coefficients.
+    :param sweep:
+      Elimination steps from _spline_factor() for the length of the first
+      axis.
+    """
+    forward, scale, backward = sweep
+    # daxpy updates each (contiguous) row in place
+    for i, taps in forward:
+        row = coeffs[i]
+        for k, weight in taps:
+            daxpy(coeffs[i - k], row, a=-weight)
+    coeffs *= scale[:, None]
+    for i, taps in backward:
+        row = coeffs[i]
+        for k, weight in taps:
+            daxpy(coeffs[i + k], row, a=-weight)
+
+
+def _spline_prefilter(data, factor, axis):
+    """Convert data values into not-a-knot cubic spline coefficients along
+    one axis.
+
+    :param data:
+      2D floating point array.
+    :param factor:
+      Tuple from _spline_factor() for the length of axis.
+    :param axis:
+      Axis (0 or 1) along which to solve for the spline coefficients.
+    :returns:
+      2D float64 array of spline coefficients, same shape as data (the
+      transpose of a C-contiguous array when axis is 1).
+    """
+    lu, piv, sweep = factor
+    if sweep is not None:
+        # the rows of the solve axis are swept in a C-contiguous copy
+        if axis == 0:
+            coeffs = np.array(data, dtype=np.float64, order='C')
+        else:
+            coeffs = np.array(data.T, dtype=np.float64, order='C')
+        _spline_sweep(coeffs, sweep)
+        return coeffs if axis == 0 else coeffs.T
+
+    gbtrs, = get_lapack_funcs(('gbtrs',), dtype=np.float64)
+    # LAPACK wants the solve axis first, in Fortran order - the transpose of
+    # a C-ordered array solved along axis 1 is exactly that.
+    data = np.asarray(data, dtype=np.float64)
+    if axis == 0:
+        coeffs, info = gbtrs(lu, _SPLINE_KL, _SPLINE_KU, data, piv)
+    else:
+        coeffs, info = gbtrs(lu, _SPLINE_KL, _SPLINE_KU, data.T, piv)
+        coeffs = coeffs.T
+    if info != 0:
+        raise DataSetException('Could not solve for cubic spline '
+                               'coefficients.')
+    return coeffs
+
+
+def _taps_to_matrix(taps, n, dtype=np.float64):
+    """Convert per-output tap indices and weights into a sparse matrix.
+
+    Duplicate indices within a row are kept as separate entries (they are
+    summed when the matrix is applied).
+
+    :param taps:
+      Tuple of (indices, weights), each of shape (nout, ntaps).
+    :param n:
+      Number of cells along the axis in the source grid.
+    :param dtype:
+      Data type of the matrix weights.
+    :returns:
+      scipy.sparse CSR matrix of shape (nout, n).
+    """
+    idx, weights = taps
+    nout, ntaps = idx.shape
+    indptr = np.arange(0, nout * ntaps + 1, ntaps)
+    return sparse.csr_matrix((weights.ravel().astype(dtype), idx.ravel(),
+                              indptr), shape=(nout, n))
+
+
+def _apply_columns(data, matrix):
+    """Apply a sparse operator along the rows of data (data @ matrix.T).
+
+    scipy works on the transpose of data for this, so C-contiguous data
+    is done a block of rows at a time, keeping the transposed copies in
+    cache.
+
+    :param data:
+      2D floating point array.
+    :param matrix:
+      Sparse matrix of shape (nxout, nx).
+    :returns:
+      2D C-contiguous array of shape (ny, nxout).
+    """
+    if data.flags.f_contiguous and not data.flags.c_contiguous:
+        # the transpose is C-contiguous already
+        return np.ascontiguousarray((matrix @ data.T).T)
+    ny, nx = data.shape
+    dtype = np.result_type(data.dtype, matrix.dtype)
+    newdata = np.empty((ny, matrix.shape[0]), dtype=dtype)
+    step = max(1, _BLOCK_CELLS // max(nx, 1))
+    for i0 in range(0, ny, step):
+        newdata[i0:i0 + step] = (matrix @ data[i0:i0 + step].T).T
+    return newdata
+
+
+def _apply_matrices(data, ymatrix, xmatrix):
+    """Apply sparse row and column operators to data, doing the pass that
+    shrinks the data the most first.
+
+    The output is built a block of rows at a time, so the intermediate
+    results of the first pass stay in cache.
+
+    :param data:
+      2D floating point array.
+    :param ymatrix:
+      Sparse matrix of shape (nyout, ny).
+    :param xmatrix:
+      Sparse matrix of shape (nxout, nx).
+    :returns:
+      2D C-contiguous array of shape (nyout, nxout).
+    """
+    ny, nx = data.shape
+    nyout, nxout = (ymatrix.shape[0], xmatrix.shape[0])
+    dtype = np.result_type(data.dtype, ymatrix.dtype, xmatrix.dtype)
+    newdata = np.empty((nyout, nxout), dtype=dtype)
+    rowsfirst = nyout * nx <= ny * nxout
+    step = max(1, _BLOCK_CELLS // max(nx, nxout, 1))
+    for i0 in range(0, nyout, step):
+        i1 = min(nyout, i0 + step)
+        if rowsfirst:
+            work = _row_band(ymatrix, i0, i1) @ data
+            newdata[i0:i1] = (xmatrix @ work.T).T
+            continue
+        # only the data rows under this band go through the column pass
+        k0, k1 = (ymatrix.indptr[i0], ymatrix.indptr[i1])
+        if k0 == k1:
+            newdata[i0:i1] = 0
+            continue
+        i = ymatrix.indices[k0:k1].min()
+        j = ymatrix.indices[k0:k1].max() + 1
+        work = (xmatrix @ data[i:j].T).T
+        newdata[i0:i1] = _row_band(ymatrix, i0, i1, i, j) @ work
+    return newdata
+
+
+def _row_band(matrix, i0, i1, j0=0, j1=None):
+    """Get a block of a CSR matrix, without the checks of scipy slicing.
+
+    :param matrix:
+      scipy.sparse CSR matrix.
+    :param i0:
+      First row of the block.
+    :param i1:
+      End row (exclusive) of the block.
+    :param j0:
+      First column of the block, which must hold every entry of the rows
+      from j0 on.
+    :param j1:
+      End column (exclusive) of the block, by default the last column.
+    :returns:
+      scipy.sparse CSR matrix of shape (i1 - i0, j1 - j0).
+    """
+    if j1 is None:
+        j1 = matrix.shape[1]
+    k0, k1 = (matrix.indptr[i0], matrix.indptr[i1])
+    indices = matrix.indices[k0:k1]
+    if j0:
+        indices = indices - j0
+    return sparse.csr_matrix((matrix.data[k0:k1], indices,
+                              matrix.indptr[i0:i1 + 1] - k0),
+                             shape=(i1 - i0, j1 - j0))
+
+
+def _nearest_index(coords, n, wrap=False):
+    """Round fractional pixel coordinates to the nearest cell index.
+
+    Exact ties between two cells go to the lower index, matching the
+    original KD-tree based nearest neighbor results.
+
+    :param coords:
+      1D array of fractional pixel coordinates.
+    :param n:
+      Number of cells along the axis in the source grid.
+    :param wrap:
+      If True, indices past either end of the axis wrap around (global
+      longitude axes), otherwise they are clamped to the edge cells.
+    :returns:
+      1D integer array of indices into the axis.
+    """
+    idx = np.ceil(np.asarray(coords, dtype=np.float64) - 0.5).astype(np.intp)
+    if wrap:
+        return np.mod(idx, n)
+    return np.clip(idx, 0, n - 1)
+
+
+def get_interp_coords(hostdict, sampledict):
+    """Get the fractional pixel coordinates in a host grid of the cell
+    centers of a sampling grid.
+
+    :param hostdict:
+      GeoDict of the grid being resampled.
+    :param sampledict:
+      GeoDict of the grid to resample to.
+    :returns:
+      Tuple of (xi, yi), 1D arrays of fractional column and row
+      coordinates in the host grid.
+    :raises DataSetException:
+      When the sampling grid is not contained by the host grid.
+    """
+    # make sure that the grid we're resampling TO is completely
+    # contained by host
+    if not hostdict.contains(sampledict):
+        raise DataSetException('Grid you are resampling TO is not '
+                               'completely contained by base grid.')
+
+    # translate geographic coordinates to 2 1-D arrays of X and Y
+    # pixel coordinates
+    # remember that pixel coordinates are (0,0) at the top left and
+    # increase going down and to the right
+    # geographic coordinates are (xmin,ymin) at the bottom left and
+    # increase going up and to the right
+
+    # we need to check if these two grids (host and sample) are in
+    # the same longitude system
+    # if not, adjust one to the other
+    hostxmin = hostdict.xmin
+    hostxmax = hostdict.xmax
+    hostymin = hostdict.ymin
+    hostymax = hostdict.ymax
+
+    # there are three cases for longitude coordinates we need to
+    # deal with here:
+    # 1) Both xmin/xmax are both positive (left)
+    # 2) Both xmin/xmax are both negative (right)
+    # 3) xmin is positive, xmax is negative (cross)
+    host_left = hostxmin > 0 and hostxmax > 0
+    host_right = hostxmin < 0 and hostxmax < 0
+    host_cross = hostxmin > 0 and hostxmax < 0
+
+    samplexmin = sampledict.xmin
+    samplexmax = sampledict.xmax
+    sampleymin = sampledict.ymin
+    sampleymax = sampledict.ymax
+
+    sample_left = samplexmin > 0 and samplexmax > 0
+    sample_right = samplexmin < 0 and samplexmax < 0
+    sample_cross = samplexmin > 0 and samplexmax < 0
+
+    # # if sets of longitudes are in a different system,
+    # # make them both left (positive)
+
+    if not host_left:
+        if host_right:
+            hostxmin += 360
+            hostxmax += 360
+        elif host_cross:
+            hostxmax += 360
+    if not sample_left:
+        if sample_right:
+            samplexmin += 360
+            samplexmax += 360
+        elif sample_cross:
+            samplexmax += 360
+
+    # extract the geographic information about the grid we're sampling to
+    sampleny = sampledict.ny
+    samplenx = sampledict.nx
+
+    hostdx = hostdict.dx
+    hostdy = hostdict.dy
+
+    gxi = np.linspace(samplexmin, samplexmax, num=samplenx)
+    gyi = np.linspace(sampleymin, sampleymax, num=sampleny)
+
+    xi = (gxi - hostxmin) / hostdx
+    yi = np.array(sorted(((hostymax - gyi) / hostdy)))
+
+    return (xi, yi)
+
+
+class ResamplePlan(object):
+    def __init__(self, shape, xi, yi, method='linear', wrap=False):
+        """Construct a reusable plan for resampling grids of one shape
+        at a fixed set of fractional pixel coordinates.
+
+        All of the work that does not depend on the data values (the
+        per-axis indices and weights, and the spline factorizations) is
+        done once, so the plan can be applied cheaply to any number of
+        same-shaped arrays.  The sparse operators of each axis are built on
+        first use, under a lock, so plans can be shared between threads.
+
+        :param shape:
+          Tuple of (ny, nx), the shape of the grids to be resampled.
+        :param xi:
+          1D array of (ascending) fractional column coordinates to sample.
+        :param yi:
+          1D array of (ascending) fractional row coordinates to sample.
+        :param method:
+          One of 'nearest', 'linear' (bilinear) or 'cubic' (not-a-knot
+          bicubic spline, equivalent to the former scipy
+          interp2d(kind='cubic') results).
+        :param wrap:
+          If True, 'nearest' columns wrap around the edges of the grid
+          (use for grids covering 360 degrees of longitude).
+        :raises DataSetException:
+          When method is not one of METHODS.
+        """
+        if method not in METHODS:
+            raise DataSetException('Resampling method must be one of %s.' %
+                                   METHODS)
+        self._shape = tuple(shape)
+        self._method = method
+        self._xi = np.array(xi, dtype=np.float64)
+        self._yi = np.array(yi, dtype=np.float64)
+        self._matrices = {}
+        self._lock = threading.Lock()
+        ny, nx = self._shape
+        if method == 'nearest':
+            self._rows = _nearest_index(self._yi, ny)
+            self._cols = _nearest_index(self._xi, nx, wrap=wrap)
+            return
+        self._yfactor = self._xfactor = None
+        if method == 'cubic' and ny >= 4:
+            self._yfactor = _spline_factor(ny)
+        if method == 'cubic' and nx >= 4:
+            self._xfactor = _spline_factor(nx)
+
+    @property
+    def shape(self):
+        """Shape of the grids this plan applies to.
+
+        :returns:
+          Tuple of (ny, nx).
+        """
+        return self._shape
+
+    @property
+    def method(self):
+        """Interpolation method of this plan.
+
+        :returns:
+          One of METHODS.
+        """
+        return self._method
+
+    def _get_matrix(self, axis, kind, dtype):
+        """Get (building on first use) the sparse operator for one axis.
+
+        :param axis:
+          0 for rows, 1 for columns.
+        :param kind:
+          One of 'linear', 'spline', 'keys', or 'linear_drop'/'keys_drop'
+          for the variants with zero weight taps removed.
+        :param dtype:
+          Data type of the matrix weights.
+        :returns:
+          scipy.sparse CSR matrix.
+        """
+        key = (axis, kind, np.dtype(dtype))
+        matrix = self._matrices.get(key)
+        if matrix is not None:
+            return matrix
+        with self._lock:
+            matrix = self._matrices.get(key)
+            if matrix is not None:
+                return matrix
+            n = self._shape[axis]
+            coords = self._yi if axis == 0 else self._xi
+            base = kind.replace('_drop', '')
+            if base == 'spline':
+                taps = _spline_taps(coords, n)
+            elif base == 'keys':
+                taps = _keys_taps(coords, n)
+            else:
+                taps = _linear_taps(coords, n)
+            if kind.endswith('_drop'):
+                taps = _drop_zero_taps(taps)
+            matrix = _taps_to_matrix(taps, n, dtype)
+            self._matrices[key] = matrix
+        return matrix
+
+    def apply(self, data, nan_policy='propagate'):
+        """Resample a grid using this plan.
+
+        :param data:
+          2D numpy array with the shape of this plan.
+        :param nan_policy:
+          How 'linear' and 'cubic' plans treat NaN/inf cells, one of:
+            'propagate': Any output cell with a non-zero weight on a NaN
+                         (inf) cell is NaN (inf).
+            'renormalize': Weights are renormalized over the valid
+                           neighbors of each output cell, which is NaN
+                           only when it has no valid neighbors.
+        :returns:
+          2D array of shape (len(yi), len(xi)).  'nearest' plans preserve
+          the data type of the input, the others return floating point.
+        :raises DataSetException:
+          When the data shape does not match the plan, or nan_policy is
+          not one of NAN_POLICIES.
+        """
+        if data.shape != self._shape:
+            raise DataSetException('Data shape %s does not match resampling '
+                                   'plan shape %s.' %
+                                   (str(data.shape), str(self._shape)))
+        if self._method == 'nearest':
+            return data[np.ix_(self._rows, self._cols)]
+        if nan_policy not in NAN_POLICIES:
+            raise DataSetException('nan_policy must be one of %s.' %
+                                   NAN_POLICIES)
+        work = data.astype(_get_work_dtype(data.dtype), copy=False)
+        if not np.isfinite(work).all():
+            return self._apply_nan(work, self._method, nan_policy)
+
+        if self._method == 'linear':
+            return _apply_matrices(work,
+                                   self._get_matrix(0, 'linear', work.dtype),
+                                   self._get_matrix(1, 'linear', work.dtype))
+
+        yfactor, xfactor = self._yfactor, self._xfactor
+        if yfactor is not None:
+            ymatrix = self._get_matrix(0, 'spline', np.float64)
+        else:
+            ymatrix = self._get_matrix(0, 'linear', work.dtype)
+        if xfactor is not None:
+            xmatrix = self._get_matrix(1, 'spline', np.float64)
+        else:
+            xmatrix = self._get_matrix(1, 'linear', work.dtype)
+        if yfactor is None and xfactor is None:
+            return _apply_matrices(work, ymatrix, xmatrix)
+
+        ny, nx = self._shape
+        nyout, nxout = len(self._yi), len(self._xi)
+        # do the pass that shrinks the data the most first
+        if nyout * nx <= ny * nxout:
+            if yfactor is not None:
+                work = _spline_prefilter(work, yfactor, 0)
+            work = np.asarray(ymatrix @ work)
+            if xfactor is not None:
+                work = _spline_prefilter(work, xfactor, 1)
+            newdata = _apply_columns(work, xmatrix)
+        else:
+            if xfactor is not None:
+                work = _spline_prefilter(work, xfactor, 1)
+            work = _apply_columns(work, xmatrix)
+            if yfactor is not None:
+                work = _spline_prefilter(work, yfactor, 0)
+            newdata = ymatrix @ work
+        return np.asarray(newdata)
+
+    def _apply_nan(self, data, method, nan_policy):
+        """Resample a grid containing NaN or infinite values.
+
+        The global cubic spline would spread invalid values over the whole
+        grid, so only local kernels are used here (bilinear, or Keys cubic
+        convolution for 'cubic').
+
+        :param data:
+          2D floating point array.
+        :param method:
+          One of 'linear' or 'cubic'.
+        :param nan_policy:
+          One of 'propagate' or 'renormalize' (see apply()).
+        :returns:
+          2D array of shape (len(yi), len(xi)).
+        """
+        kind = 'keys' if method == 'cubic' else 'linear'
+        if nan_policy == 'propagate':
+            # plain arithmetic carries NaN/inf into every output they touch.
+            ymatrix = self._get_matrix(0, kind + '_drop', data.dtype)
+            xmatrix = self._get_matrix(1, kind + '_drop', data.dtype)
+            with np.errstate(invalid='ignore'):
+                return _apply_matrices(data, ymatrix, xmatrix)
+
+        # renormalize the weights over the valid neighbors of each output.
+        valid = np.isfinite(data)
+        filled = np.where(valid, data, 0)
+        weight = valid.astype(data.dtype)
+        ymatrix = self._get_matrix(0, kind, data.dtype)
+        xmatrix = self._get_matrix(1, kind, data.dtype)
+        total = _apply_matrices(filled, ymatrix, xmatrix)
+        norm = _apply_matrices(weight, ymatrix, xmatrix)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            newdata = total / norm
+        if method == 'cubic':
+            # when most of the kernel falls on invalid cells the cubic
+            # weights are poorly conditioned; use the linear estimate.
+            weak = norm < _CUBIC_MIN_WEIGHT
+            if weak.any():
+                linear = self._apply_nan(data, 'linear', nan_policy)
+                newdata[weak] = linear[weak]
+        else:
+            newdata[norm <= 0] = np.nan
+        return newdata
+
+
+def get_cell_edges(offset, fstep, nfine, hstep, period=None):
+    """Get the edges of the cells of one grid axis in units of the cells of
+    another (usually coarser) grid axis.
+
+    :param offset:
+      Distance from the leading edge of the first host cell to the leading
+      edge of the first fine cell, in the direction of increasing index.
+    :param fstep:
+      Fine cell size.
+    :param nfine:
+      Number of fine cells.
+    :param hstep:
+      Host cell size.
+    :param period:
+      Optional period of the axis (360 for longitude), used to bring fine
+      cells into the range [0, period) of the host grid.
+    :returns:
+      Tuple of (lo, hi) arrays of length nfine, the leading and trailing
+      edges of each fine cell in fractional host cells (0 is the leading
+      edge of the first host cell).
+    """
+    lo = (offset + np.arange(nfine) * fstep) / hstep
+    if period is not None:
+        hperiod = period / hstep
+        lo = np.mod(lo + _EDGE_TOL, hperiod) - _EDGE_TOL
+    hi = lo + fstep / hstep
+    return (lo, hi)
+
+
+def is_periodic(nhost, hstep, period):
+    """Determine whether a grid axis covers a whole period (i.e., a global
+    longitude axis).
+
+    :param nhost:
+      Number of cells along the axis.
+    :param hstep:
+      Cell size.
+    :param period:
+      Period of the axis, or None.
+    :returns:
+      True if the cells of the axis cover exactly one period.
+    """
+    if period is None:
+        return False
+    return np.abs(nhost - period / hstep) < _EDGE_TOL
+
+
+def _subdivide_axis(offset, fstep, nfine, hstep, nhost, period=None):
+    """Find the host cells covered by each cell of a finer grid along one
+    axis.
+
+    :param offset:
+      Distance from the leading edge of the first host cell to the leading
+      edge of the first fine cell, in the direction of increasing index.
+    :param fstep:
+      Fine cell size.
+    :param nfine:
+      Number of fine cells.
+    :param hstep:
+      Host cell size (larger than fstep).
+    :param nhost:
+      Number of host cells.
+    :param period:
+      Optional period of the axis (360 for longitude), used to bring fine
+      cells into the range of the host grid and, for hosts covering the
+      whole period, to wrap around the edges of the host grid.
+    :returns:
+      Tuple of (first, last) integer arrays of length nfine, holding the
+      first and last host cell indices overlapped by each fine cell (equal
+      when the fine cell is contained by one host cell), or -1 for both
+      where the fine cell is not completely inside the host grid.
+    """
+    lo, hi = get_cell_edges(offset, fstep, nfine, hstep, period=period)
+    first = np.floor(lo + _EDGE_TOL).astype(np.intp)
+    last = np.ceil(hi - _EDGE_TOL).astype(np.intp) - 1
+    if is_periodic(nhost, hstep, period):
+        last = np.mod(last, nhost)
+        outside = first < 0
+    else:
+        outside = (first < 0) | (last > nhost - 1)
+    first[outside] = -1
+    last[outside] = -1
+    return (first, last)
+
+
+def get_subdivide_indices(hostdict, finerdict):
+    """Find the host grid cells covered by every cell of a finer grid.
+
+    Because both grids are regular this is separable: each fine row
+    overlaps one or two host rows, and each fine column one or two host
+    columns.  Fine cells that cross the 180 meridian are matched with host
+    cells on the other side of it.
+
+    :param hostdict:
+      GeoDict of the host grid.
+    :param finerdict:
+      GeoDict of a grid with finer resolution than the host grid.
+    :returns:
+      Tuple of ((row0, row1), (col0, col1)), integer arrays of length
+      finerdict.ny and finerdict.nx (see _subdivide_axis()).
+    """
+    hdx, hdy = (hostdict.dx, hostdict.dy)
+    fdx, fdy = (finerdict.dx, finerdict.dy)
+    # rows are counted down from the top edge of the grids
+    yoffset = (hostdict.ymax + hdy / 2.0) - (finerdict.ymax + fdy / 2.0)
+    rows = _subdivide_axis(yoffset, fdy, finerdict.ny, hdy, hostdict.ny)
+    xoffset = (finerdict.xmin - fdx / 2.0) - (hostdict.xmin - hdx / 2.0)
+    cols = _subdivide_axis(xoffset, fdx, finerdict.nx, hdx, hostdict.nx,
+                           period=360.0)
+    return (rows, cols)
+
+
+def _cell_fill(a, b, cell_fill):
+    """Combine the values of two host cells covered by one fine cell.
+
+    :param a:
+      Array of values from the first host cell.
+    :param b:
+      Array of values from the second host cell.
+    :param cell_fill:
+      One of CELL_FILLS.
+    :returns:
+      Array of combined values (NaN if either value is NaN).
+    """
+    with np.errstate(invalid='ignore'):
+        if cell_fill == 'min':
+            return np.minimum(a, b)
+        if cell_fill == 'max':
+            return np.maximum(a, b)
+        return (a + b) / 2.0
+
+
+def subdivide_regular(data, hostdict, finerdict, cell_fill='max'):
+    """Subdivide the cells of a regular grid onto a finer regular grid.
+
+    Fine cells inside one host cell take the value of that cell.  Fine
+    cells that straddle a host cell edge are filled by combining the
+    values of the host cells they cover according to cell_fill - first
+    across the row edge, then across the column edge, so a fine cell on a
+    host cell corner combines all four host cells.  Fine cells that are not
+    completely inside the host grid are NaN.
+
+    The work is done on whole rows and columns at a time, so the cost is
+    proportional to the size of the fine grid.
+
+    :param data:
+      2D numpy array of host grid values.
+    :param hostdict:
+      GeoDict of the host grid.
+    :param finerdict:
+      GeoDict of a grid with finer resolution than the host grid.
+    :param cell_fill:
+      One of 'min', 'max' or 'mean'.
+    :returns:
+      2D array of shape (finerdict.ny, finerdict.nx).  Floating point host
+      data keeps its type, other data is converted to float64.
+    :raises DataSetException:
+      When cell_fill is not one of CELL_FILLS.
+    """
+    if cell_fill not in CELL_FILLS:
+        raise DataSetException('cellFill input must be one of %s.' %
+                               CELL_FILLS)
+    if np.issubdtype(data.dtype, np.floating):
+        dtype = data.dtype
+    else:
+        dtype = np.float64
+    (row0, row1), (col0, col1) = get_subdivide_indices(hostdict, finerdict)
+
+    # only gather the host columns that are actually used, so that the
+    # intermediate arrays are no bigger than the fine grid.
+    hostcols, colidx = np.unique(np.concatenate((col0, col1)),
+                                 return_inverse=True)
+    colidx0 = colidx[:len(col0)]
+    colidx1 = colidx[len(col0):]
+    hostcols[hostcols < 0] = 0
+
+    rowdata = data[np.ix_(np.maximum(row0, 0), hostcols)].astype(dtype)
+    seam = row1 != row0
+    if seam.any():
+        rowdata[seam] = _cell_fill(rowdata[seam],
+                                   data[np.ix_(row1[seam], hostcols)],
+                                   cell_fill)
+    finedata = rowdata[:, colidx0]
+    seam = col1 != col0
+    if seam.any():
+        finedata[:, seam] = _cell_fill(finedata[:, seam],
+                                       rowdata[:, colidx1[seam]],
+                                       cell_fill)
+    finedata[row0 < 0, :] = np.nan
+    finedata[:, col0 < 0] = np.nan
+    return finedata
+
+
+def _geodict_key(geodict):
+    """Return a hashable key describing the pixel layout of a GeoDict.
+
+    :param geodict:
+      GeoDict object.
+    :returns:
+      Tuple of (xmin, xmax, ymin, ymax, dx, dy, ny, nx).
+    """
+    return (geodict.xmin, geodict.xmax, geodict.ymin, geodict.ymax,
+            geodict.dx, geodict.dy, geodict.ny, geodict.nx)
+
+
+def get_resample_plan(hostdict, sampledict, method='linear'):
+    """Get a plan for resampling grids described by one GeoDict onto the
+    grid described by another.
+
+    Plans are cached (least recently used first out) on the pair of
+    GeoDicts and the method, so resampling every layer of a multi-layer
+    grid, or repeated calls for the same grids, only build the plan once.
+
+    :param hostdict:
+      GeoDict of the grid(s) being resampled.
+    :param sampledict:
+      GeoDict of the grid to resample to.
+    :param method:
+      One of METHODS.
+    :returns:
+      ResamplePlan object.
+    :raises DataSetException:
+      When the sampling grid is not contained by the host grid, or the
+      method is not one of METHODS.
+    """
+    key = (_geodict_key(hostdict), _geodict_key(sampledict), method)
+    plan = _PLAN_CACHE.get(key)
+    if plan is None:
+        xi, yi = get_interp_coords(hostdict, sampledict)
+        # nearest neighbor columns may wrap around grids covering the globe
+        isglobal = np.abs((hostdict.xmax + hostdict.dx) -
+                          (hostdict.xmin + 360)) < hostdict.dx * 0.01
+        plan = ResamplePlan((hostdict.ny, hostdict.nx), xi, yi,
+                            method=method, wrap=isglobal)
+        _PLAN_CACHE.put(key, plan)
+    return plan
+
+
+def resample_nearest(data, xi, yi, wrap=False):
+    """Resample a regular grid onto another axis-aligned regular grid by
+    taking the value of the nearest source cell.
+
+    Because both grids are regular, the nearest cell is found by rounding
+    the fractional row and column coordinates, and the output is gathered
+    with integer index arrays.  Memory use is proportional to the output
+    grid and the data type of the source grid is preserved.
+
+    :param data:
+      2D numpy array.
+    :param xi:
+      1D array of fractional column coordinates to sample.
+    :param yi:
+      1D array of fractional row coordinates to sample.
+    :param wrap:
+      If True, columns wrap around the edges of the grid (use for grids
+      covering 360 degrees of longitude).
+    :returns:
+      2D array of shape (len(yi), len(xi)), same dtype as data.
+    """
+    plan = ResamplePlan(data.shape, xi, yi, method='nearest', wrap=wrap)
+    return plan.apply(data)
+
+
+def resample_regular(data, xi, yi, method='linear', nan_policy='propagate'):
+    """Resample a regular grid onto another axis-aligned regular grid.
+
+    The interpolation is separable, so the per-axis indices and weights
+    are computed once and applied as a sparse row pass and a sparse column
+    pass.  The cost is proportional to the size of the output grid (plus
+    one banded solve over the input for the cubic spline coefficients).
+
+    Grids containing NaN or infinite values are resampled with local
+    kernels only (bilinear, or Keys cubic convolution instead of the
+    global spline), at the same linear cost.
+
+    To resample several grids of the same shape at the same coordinates,
+    build a ResamplePlan once and apply it to each grid instead.
+
+    :param data:
+      2D numpy array.
+    :param xi:
+      1D array of (ascending) fractional column coordinates to sample.
+    :param yi:
+      1D array of (ascending) fractional row coordinates to sample.
+    :param method:
+      One of 'linear' (bilinear) or 'cubic' (not-a-knot bicubic spline,
+      equivalent to the former scipy interp2d(kind='cubic') results).
+    :param nan_policy:
+      How to treat NaN/inf cells, one of:
+        'propagate': Any output cell with a non-zero weight on a NaN (inf)
+                     cell is NaN (inf).
+        'renormalize': Weights are renormalized over the valid neighbors
+                       of each output cell, which is NaN only when it has
+                       no valid neighbors.
+    :returns:
+      2D array of shape (len(yi), len(xi)).
+    :raises DataSetException:
+      When nan_policy is not one of NAN_POLICIES.
+    """
+    plan = ResamplePlan(data.shape, xi, yi, method=method)
+    return plan.apply(data, nan_policy=nan_policy)
+
+
+def _point_taps(coords, n, kind, wrap=False, drop_zero=False):
+    """Compute the interpolation indices and weights of scattered fractional
+    pixel coordinates along one axis.
+
+    Unlike _linear_taps() and _keys_taps() the taps are returned one
+    contiguous array per tap, which is much faster to work with for the
+    very long coordinate arrays of point sampling.
+
+    :param coords:
+      1D array of fractional pixel coordinates.
+    :param n:
+      Number of cells along the axis in the source grid.
+    :param kind:
+      One of 'linear' or 'keys' (cubic convolution).
+    :param wrap:
+      If True, taps past either end of the axis wrap around (global
+      longitude axes), otherwise they are clamped to the edge cells.
+    :param drop_zero:
+      If True, taps with zero weight are redirected as in
+      _drop_zero_taps().
+    :returns:
+      Tuple of (indices, weights), both arrays of shape (2, len(coords))
+      for 'linear' or (4, len(coords)) for 'keys'.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if not wrap:
+        coords = np.clip(coords, 0, n - 1)
+    first = np.floor(coords).astype(np.intp)
+    if kind == 'linear':
+        if not wrap:
+            np.clip(first, 0, max(n - 2, 0), out=first)
+        frac = coords - first
+        offsets = np.arange(0, 2)
+        weights = np.empty((2, len(coords)), dtype=np.float64)
+        np.subtract(1.0, frac, out=weights[0])
+        weights[1] = frac
+    else:
+        frac = coords - first
+        offsets = np.arange(-1, 3)
+        weights = _keys_kernel(np.abs(frac[None, :] - offsets[:, None]))
+    idx = first[None, :] + offsets[:, None]
+    if wrap:
+        np.mod(idx, n, out=idx)
+    else:
+        np.clip(idx, 0, n - 1, out=idx)
+    if drop_zero:
+        cols = np.nonzero((weights == 0).any(axis=0))[0]
+        if len(cols):
+            best = np.argmax(np.abs(weights[:, cols]), axis=0)
+            idx[:, cols] = idx[best, cols]
+            weights[:, cols] = weights[best, cols] / len(offsets)
+    return (idx, weights)
+
+
+class PointPlan(object):
+    def __init__(self, shape, rows, cols, method='linear', wrap=False):
+        """Construct a reusable plan for sampling grids of one shape at a
+        fixed set of scattered fractional pixel coordinates.
+
+        The cells and weights of every point are computed once, so the
+        plan can be applied cheaply to any number of same-shaped arrays
+        (i.e., the layers of a MultiGrid).  Each point only depends on its
+        nearest cell, or its 2x2 ('linear') or 4x4 ('cubic') neighborhood,
+        so the work is proportional to the number of points.  Coordinates
+        between the outer cell centers and the edges of the grid take the
+        values on the edge cell centers.  The taps are computed on first
+        use, under a lock, so plans can be shared between threads.
+
+        :param shape:
+          Tuple of (ny, nx), the shape of the grids to be sampled.
+        :param rows:
+          1D array of fractional row coordinates (0 is the center of the
+          first row).
+        :param cols:
+          1D array of fractional column coordinates, same length as rows.
+        :param method:
+          One of 'nearest', 'linear' (bilinear) or 'cubic' (Keys cubic
+          convolution).
+        :param wrap:
+          If True, columns wrap around the edges of the grid (use for grids
+          covering 360 degrees of longitude).
+        :raises DataSetException:
+          When method is not one of METHODS.
+        """
+        if method not in METHODS:
+            raise DataSetException('Sampling method must be one of %s.' %
+                                   METHODS)
+        self._shape = tuple(shape)
+        self._method = method
+        self._wrap = wrap
+        self._rows = np.asarray(rows, dtype=np.float64)
+        self._cols = np.asarray(cols, dtype=np.float64)
+        self._taps = {}
+        self._lock = threading.Lock()
+        ny, nx = self._shape
+        if method == 'nearest':
+            self._index = (_nearest_index(self._rows, ny),
+                           _nearest_index(self._cols, nx, wrap=wrap))
+
+    @property
+    def shape(self):
+        """Shape of the grids this plan applies to.
+
+        :returns:
+          Tuple of (ny, nx).
+        """
+        return self._shape
+
+    @property
+    def method(self):
+        """Interpolation method of this plan.
+
+        :returns:
+          One of METHODS.
+        """
+        return self._method
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _get_taps(self, drop_zero):
+        """Get (computing on first use) the row and column taps.
+
+        :param drop_zero:
+          If True, get the taps with zero weight taps redirected (see
+          _drop_zero_taps()).
+        :returns:
+          Tuple of ((rowidx, rowweights), (colidx, colweights)), see
+          _point_taps().
+        """
+        taps = self._taps.get(drop_zero)
+        if taps is not None:
+            return taps
+        with self._lock:
+            taps = self._taps.get(drop_zero)
+            if taps is not None:
+                return taps
+            ny, nx = self._shape
+            kind = 'keys' if self._method == 'cubic' else 'linear'
+            taps = (_point_taps(self._rows, ny, kind, drop_zero=drop_zero),
+                    _point_taps(self._cols, nx, kind, wrap=self._wrap,
+                                drop_zero=drop_zero))
+            self._taps[drop_zero] = taps
+        return taps
+
+    def apply(self, data, nan_policy='propagate', mask=None):
+        """Sample a grid using this plan.
+
+        :param data:
+          2D numpy array with the shape of this plan.
+        :param nan_policy:
+          How 'linear' and 'cubic' plans treat NaN/inf cells, one of:
+            'propagate': Any point with a non-zero weight on a NaN (inf)
+                         cell is NaN (inf).
+            'renormalize': Weights are renormalized over the valid
+                           neighbors of each point, which is NaN only when
+                           it has no valid neighbors.
+        :param mask:
+          Optional 2D boolean array the shape of data, True where cells
+          are treated as NaN.
+        :returns:
+          1D array of sampled values.  'nearest' plans preserve the data
+          type of the input (integer data sampled with a mask becomes
+          float64), the others return float64.
+        :raises DataSetException:
+          When the data shape does not match the plan, or nan_policy is
+          not one of NAN_POLICIES.
+        """
+        if data.shape != self._shape:
+            raise DataSetException('Data shape %s does not match sampling '
+                                   'plan shape %s.' %
+                                   (str(data.shape), str(self._shape)))
+        if self._method == 'nearest':
+            values = data[self._index]
+            if mask is None:
+                return values
+            if not np.issubdtype(values.dtype, np.floating):
+                values = values.astype(np.float64)
+            values[mask[self._index]] = np.nan
+            return values
+        if nan_policy not in NAN_POLICIES:
+            raise DataSetException('nan_policy must be one of %s.' %
+                                   NAN_POLICIES)
+        # with 'propagate', points on a valid cell stay valid next to an
+        # invalid one (see _drop_zero_taps())
+        rtaps, ctaps = self._get_taps(nan_policy == 'propagate')
+        ridx, rweights = rtaps
+        cidx, cweights = ctaps
+        nx = self._shape[1]
+
+        # gathering all of the taps of a block of points from the flattened
+        # grid in one pass is much faster than a pass per tap
+        flat = None
+        flatmask = None
+        if data.flags.c_contiguous:
+            flat = data.ravel()
+            if mask is not None:
+                flatmask = np.ascontiguousarray(mask).ravel()
+
+        npoints = len(self._rows)
+        values = np.empty(npoints, dtype=np.float64)
+        norm = None
+        if nan_policy == 'renormalize':
+            norm = np.empty(npoints, dtype=np.float64)
+        step = max(1, _POINT_BLOCK // (len(ridx) * len(cidx)))
+        with np.errstate(invalid='ignore'):
+            for i0 in range(0, npoints, step):
+                i1 = min(npoints, i0 + step)
+                rows = ridx[:, None, i0:i1]
+                cols = cidx[None, :, i0:i1]
+                if flat is not None:
+                    idx = rows * nx + cols
+                    v = flat.take(idx).astype(np.float64, copy=False)
+                    if flatmask is not None:
+                        v[flatmask.take(idx)] = np.nan
+                else:
+                    v = data[rows, cols].astype(np.float64, copy=False)
+                    if mask is not None:
+                        v[mask[rows, cols]] = np.nan
+                # the weights are separable, so combine the taps along each
+                # row first
+                rw = rweights[:, i0:i1]
+                cw = cweights[:, i0:i1]
+                if norm is None:
+                    v = np.einsum('ijk,jk->ik', v, cw)
+                    values[i0:i1] = np.einsum('ik,ik->k', v, rw)
+                    continue
+                valid = np.isfinite(v)
+                v[~valid] = 0.0
+                v = np.einsum('ijk,jk->ik', v, cw)
+                values[i0:i1] = np.einsum('ik,ik->k', v, rw)
+                valid = np.einsum('ijk,jk->ik', valid, cw)
+                norm[i0:i1] = np.einsum('ik,ik->k', valid, rw)
+        if norm is None:
+            return values
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values /= norm
+        if self._method == 'cubic':
+            # when most of the kernel falls on invalid cells the cubic
+            # weights are poorly conditioned; use the linear estimate.
+            weak = norm < _CUBIC_MIN_WEIGHT
+            if weak.any():
+                plan = PointPlan(self._shape, self._rows[weak],
+                                 self._cols[weak], method='linear',
+                                 wrap=self._wrap)
+                values[weak] = plan.apply(data, nan_policy=nan_policy,
+                                          mask=mask)
+        else:
+            values[norm <= 0] = np.nan
+        return values
+
+
+def sample_points(data, rows, cols, method='linear', nan_policy='propagate',
+                  wrap=False, mask=None):
+    """Interpolate a regular grid at scattered fractional pixel coordinates.
+
+    To sample several grids of the same shape at the same points, build a
+    PointPlan once and apply it to each grid instead.
+
+    :param data:
+      2D numpy array.
+    :param rows:
+      1D array of fractional row coordinates (0 is the center of the first
+      row).
+    :param cols:
+      1D array of fractional column coordinates, same length as rows.
+    :param method:
+      One of 'nearest', 'linear' (bilinear) or 'cubic' (Keys cubic
+      convolution).
+    :param nan_policy:
+      How to treat NaN/inf cells (see PointPlan.apply()).
+    :param wrap:
+      If True, columns wrap around the edges of the grid (use for grids
+      covering 360 degrees of longitude).
+    :param mask:
+      Optional 2D boolean array the shape of data, True where cells are
+      treated as NaN.
+    :returns:
+      1D array of sampled values.
+    :raises DataSetException:
+      When method is not one of METHODS, or nan_policy is not one of
+      NAN_POLICIES.
+    """
+    plan = PointPlan(data.shape, rows, cols, method=method, wrap=wrap)
+    return plan.apply(data, nan_policy=nan_policy, mask=mask)
@@ -229,7 +229,7 @@ class ShakeGrid(MultiGrid):
     A class that implements a MultiGrid object around ShakeMap grid.xml data sets.
     """
 
-    def __init__(self, layers, geodict, eventDict, shakeDict, uncertaintyDict, field_keys={}):
+    def __init__(self, layers, geodict, eventDict, shakeDict, uncertaintyDict, field_keys={}, copy=True):
         """Construct a ShakeGrid object.
         :param layers:
            OrderedDict containing ShakeMap data layers (keys are 'pga', etc., values are 2D arrays of data).
@@ -262,6 +262,9 @@ class ShakeGrid(MultiGrid):
           a tuple of (UNITS,DIGITS) where UNITS is a string indicating
           the units of the layer quantity (e.g, cm/s) and DIGITS is the number of significant digits
           that the layer column should be printed with.
+        :param copy:
+          If True (the default), each layer holds a copy of its input array, otherwise
+          it holds the input array itself.
         :returns:
            A ShakeGrid object.
         """
@@ -269,7 +272,7 @@ class ShakeGrid(MultiGrid):
         self._layers = OrderedDict()
         self._geodict = geodict
         for (layerkey, layerdata) in layers.items():
-            self._layers[layerkey] = Grid2D(data=layerdata, geodict=geodict)
+            self._layers[layerkey] = Grid2D(data=layerdata, geodict=geodict, copy=copy)
             self._descriptions[layerkey] = ''
         self._setEventDict(eventDict)
         self._setShakeDict(shakeDict)
@@ -336,9 +339,18 @@ class ShakeGrid(MultiGrid):
         (layers, fgeodict, eventDict,
          shakeDict, uncertaintyDict) = readShakeFile(shakefile, adjust=adjust)
 
-        # If the sample grid is aligned with the host grid, then resampling won't accomplish anything
-        # if samplegeodict is not None and fgeodict.isAligned(samplegeodict):
-        #     resample = False
+        # If the sample grid is aligned with the host grid (at the same resolution, or an integer
+        # multiple of it), then resampling won't accomplish anything, so just cut the sample cells
+        # out of each layer.
+        stride = None
+        if resample:
+            stride = Grid2D.getSampleStride(fgeodict, samplegeodict)
+        if stride is not None:
+            newlayers = OrderedDict()
+            for layername, data in layers.items():
+                newlayers[layername] = Grid2D.sliceToSample(data, fgeodict, samplegeodict, stride)
+            if newlayers and all(data is not None for data in newlayers.values()):
+                return cls(newlayers, samplegeodict.copy(), eventDict, shakeDict, uncertaintyDict)
 
         # get area of shakemap that intersects with the desired input sampling grid
         if samplegeodict is not None:
@@ -352,22 +364,30 @@ class ShakeGrid(MultiGrid):
 
         pad_dict = Grid2D.getPadding(
             fgeodict, samplegeodict, doPadding=doPadding)  # parent static method
+        # when resampling, pad with inf so that we can find the cells that
+        # were interpolated from pad pixels, and set those to padValue.
+        if resample:
+            fill = np.inf
+        else:
+            fill = padValue
+        padlayers, geodict = Grid2D.padGrids(layers, fgeodict, pad_dict,
+                                             padValue=fill)
         newlayers = OrderedDict()
         newgeodict = None
-        for layername, layerdata in layers.items():
-            data, geodict = Grid2D.padGrid(layerdata, fgeodict, pad_dict)
-            grid = Grid2D(data, geodict)
+        # every padded layer has the same geodict, so interpolateToGrid
+        # reuses one cached resampling plan for all of them.
+        for layername, data in padlayers.items():
+            grid = Grid2D(data, geodict, copy=False)
             if resample:
                 grid = grid.interpolateToGrid(samplegeodict, method=method)
-
-            if np.any(np.isinf(grid._data)):
-                grid._data[np.isinf(grid._data)] = padValue
+                if data is not layers[layername]:
+                    grid._data[np.isinf(grid._data)] = padValue
 
             newlayers[layername] = grid.getData()
             if newgeodict is None:
                 newgeodict = grid.getGeoDict().copy()
 
-        return cls(newlayers, newgeodict, eventDict, shakeDict, uncertaintyDict)
+        return cls(newlayers, newgeodict, eventDict, shakeDict, uncertaintyDict, copy=False)
 
     def interpolateToGrid(self, geodict, method='linear'):
         """
@@ -398,6 +418,37 @@ class ShakeGrid(MultiGrid):
         shakemap = ShakeGrid(layers, geodict, eventdict, shakedict, uncdict)
         return shakemap
 
+    def project(self, projection, method='bilinear', numThreads=1, warpMemLimit=0, out=None):
+        """
+        Project all layers in ShakeGrid into desired projection with a single warp.
+
+        :param projection:
+          Valid proj4 projection string.
+        :param method:
+          One of the sampling methods described here:
+              https://mapbox.github.io/rasterio/topics/resampling.html#resampling-methods
+        :param numThreads:
+          Number of threads GDAL uses to warp the data.
+        :param warpMemLimit:
+          Working memory (in MB) GDAL may use to warp the data, or 0 for the GDAL default.
+        :param out:
+          Optional ShakeGrid returned by a previous call with the same projection
+          (on a grid with the same geodict), whose layer data is overwritten.
+        :raises DataSetException:
+          If input projection is not a valid Proj4 string.
+          If method is not a valid resampling method (see Grid2D.project()).
+        :returns:
+          ShakeGrid instance with the projected layers, in the data type of the input layers.
+        """
+        data, geodict = self._projectLayers(projection, method, numThreads, warpMemLimit, out)
+        layers = OrderedDict()
+        for i, layername in enumerate(self._layers.keys()):
+            layers[layername] = data[i]
+        shakemap = ShakeGrid(layers, geodict, self.getEventDict(), self.getShakeDict(),
+                             self._uncertaintyDict, copy=False)
+        shakemap._field_keys = self._field_keys.copy()
+        return shakemap
+
     def subdivide(self, finerdict, cellFill='max'):
         """Subdivide the cells of the host grid into finer-resolution cells.
 
@@ -105,22 +105,26 @@ def write(grid, filename, format_type):
                            grid._geodict.xmax, grid._geodict.nx)
         y[:] = np.linspace(grid._geodict.ymin,
                            grid._geodict.ymax, grid._geodict.ny)
-        z = f.createVariable('z', grid._data.dtype, ('y', 'x'))
-        z[:] = np.flipud(grid._data)
+        if grid.getMask() is None:
+            z = f.createVariable('z', grid._data.dtype, ('y', 'x'))
+        else:
+            z = f.createVariable('z', grid._data.dtype, ('y', 'x'),
+                                 fill_value=grid._getFillValue())
+        z[:] = np.flipud(grid._getFilledData())
         z.actual_range = np.array(
             (np.nanmin(grid._data), np.nanmax(grid._data)))
         f.close()
     elif format_type == 'esri':
         hdr = _getHeader(grid)
         # create a reference to the data - this may be overridden by a
-        # downcasted version for doubles
-        data = grid._data
+        # downcasted version for doubles, or a filled copy for masked data
+        data = grid._getFilledData(hdr['NODATA'])
         if grid._data.dtype == np.float32:
             # so we can find/reset nan values without screwing up original data
-            data = grid._data.astype(np.float32)
+            data = data.astype(np.float32)
             data[np.isnan(data)] = hdr['NODATA']
         elif grid._data.dtype == np.float64:
-            data = grid._data.astype(np.float32)
+            data = data.astype(np.float32)
             data[np.isnan(data)] = hdr['NODATA']
             warnings.warn(UserWarning('Down-casting double precision '
                                       'floating point to single precision'))
@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+
+# stdlib imports
+import hashlib
+from collections import OrderedDict
+
+# third party imports
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+from shapely.geometry import shape as as_shape
+
+# local imports
+from .dataset import DataSetException
+from .grid2d import Grid2D
+from .multiple import MultiGrid
+from .aggregate import _group_median, _group_mode
+from .resample import _geodict_key
+from .cache import LRUCache
+
+ZONAL_STATS = ['mean', 'sum', 'max', 'min', 'median', 'mode', 'count',
+               'std']
+
+# label grids of recently used (shapes, geodict) combinations
+_LABEL_CACHE = LRUCache(maxsize=8)
+
+
+class ZoneLabels(object):
+    def __init__(self, labels, nzones):
+        """Construct a ZoneLabels object, holding the zone of each cell of
+        a grid.
+
+        :param labels:
+          2D integer array holding the index of the zone containing each
+          cell, or -1 for cells outside of every zone.
+        :param nzones:
+          Number of zones.
+        """
+        self._labels = labels
+        self._labels.flags.writeable = False
+        self._nzones = nzones
+        # only the cells inside a zone take part in the statistics
+        self._cells = np.flatnonzero(labels.ravel() >= 0)
+        self._zones = labels.ravel()[self._cells]
+
+    @property
+    def labels(self):
+        """Get the (read-only) label grid.
+
+        :returns:
+          2D integer array of zone indices, -1 outside of every zone.
+        """
+        return self._labels
+
+    @property
+    def nzones(self):
+        """Get the number of zones.
+
+        :returns:
+          Number of zones.
+        """
+        return self._nzones
+
+    def getValues(self, grid):
+        """Get the valid values of a grid inside the zones.
+
+        NaN cells, and cells masked out of the grid, are left out.
+
+        :param grid:
+          Grid2D object on the grid the labels were made for.
+        :returns:
+          Tuple of (values, zones), 1D arrays of the cell values and the
+          zone index of each.
+        """
+        data = grid.getData()
+        if data.shape != self._labels.shape:
+            raise DataSetException('Grid shape %s does not match zone '
+                                   'labels shape %s.' %
+                                   (str(data.shape),
+                                    str(self._labels.shape)))
+        values = data.ravel()[self._cells]
+        zones = self._zones
+        valid = None
+        if np.issubdtype(values.dtype, np.floating):
+            valid = ~np.isnan(values)
+        mask = grid.getMask()
+        if mask is not None:
+            unmasked = ~mask.ravel()[self._cells]
+            valid = unmasked if valid is None else valid & unmasked
+        if valid is not None and not valid.all():
+            values, zones = (values[valid], zones[valid])
+        return (values, zones)
+
+
+def _get_geometries(shapes):
+    """Turn the shapes accepted by zonal_stats() into shapely geometries.
+
+    :param shapes:
+      Sequence of shapely geometries or GeoJSON-like features.
+    :returns:
+      List of shapely geometries.
+    :raises DataSetException:
+      When the shapes are not shapely geometries or GeoJSON-like features.
+    """
+    if isinstance(shapes, (shapely.geometry.base.BaseGeometry, dict)):
+        shapes = [shapes]
+    geometries = []
+    for shape in shapes:
+        if isinstance(shape, shapely.geometry.base.BaseGeometry):
+            geometries.append(shape)
+        elif isinstance(shape, dict) and 'geometry' in shape:
+            geometries.append(as_shape(shape['geometry']))
+        else:
+            raise DataSetException('shapes must be a sequence of shapely '
+                                   'objects or Geo-JSON like objects.')
+    return geometries
+
+
+def get_zone_labels(shapes, geodict, mustContainCenter=False,
+                    tileSize=None, cache=True):
+    """Rasterize zones into a grid of zone indices.
+
+    Every zone is burned into one integer label grid, so that statistics
+    of all of the zones can be computed in one pass over a grid.  Where
+    zones overlap, a cell belongs to the last of them.
+
+    :param shapes:
+      Sequence of shapely geometries or GeoJSON-like features, one per
+      zone.
+    :param geodict:
+      GeoDict object of the grid.
+    :param mustContainCenter:
+      Whether a zone must contain the center of a cell for the cell to
+      belong to it, instead of merely touching the cell.
+    :param tileSize:
+      Optional tile size used to rasterize the zones (see
+      Grid2D.rasterizeFromGeometry()).
+    :param cache:
+      Whether to keep the label grid in a cache keyed on the zone
+      geometries and the GeoDict, so that repeat calls are nearly free.
+    :returns:
+      ZoneLabels object.
+    :raises DataSetException:
+      When the shapes are not shapely geometries or GeoJSON-like features.
+    """
+    geometries = _get_geometries(shapes)
+    key = None
+    if cache:
+        digest = hashlib.sha1()
+        for wkb in shapely.to_wkb(geometries):
+            digest.update(wkb)
+        key = (digest.hexdigest(), _geodict_key(geodict),
+               mustContainCenter)
+        zones = _LABEL_CACHE.get(key)
+        if zones is not None:
+            return zones
+    if len(geometries):
+        features = [{'geometry': mapping(geometry),
+                     'properties': {'zone': i}}
+                    for i, geometry in enumerate(geometries)]
+        grid = Grid2D.rasterizeFromGeometry(
+            features, geodict, fillValue=-1, attribute='zone',
+            mustContainCenter=mustContainCenter, dtype=np.int32,
+            tileSize=tileSize)
+        labels = grid.getData()
+    else:
+        labels = np.full((geodict.ny, geodict.nx), -1, dtype=np.int32)
+    zones = ZoneLabels(labels, len(geometries))
+    if cache:
+        _LABEL_CACHE.put(key, zones)
+    return zones
+
+
+def _zone_stats(values, zones, nzones, stats):
+    """Compute statistics of the values in each zone.
+
+    :param values:
+      1D array of valid values.
+    :param zones:
+      1D integer array of the zone index of each value.
+    :param nzones:
+      Number of zones.
+    :param stats:
+      List of statistics from ZONAL_STATS.
+    :returns:
+      OrderedDict of 1D arrays of length nzones, keyed by statistic.
+    """
+    results = OrderedDict()
+    count = np.bincount(zones, minlength=nzones).astype(np.float64)
+    empty = count == 0
+    if set(stats) & set(['mean', 'sum', 'std']):
+        total = np.bincount(zones, weights=values, minlength=nzones)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+    for stat in stats:
+        if stat == 'count':
+            result = count
+        elif stat == 'sum':
+            result = np.where(empty, np.nan, total)
+        elif stat == 'mean':
+            result = mean
+        elif stat == 'std':
+            # two passes, which is far more accurate than sum of squares
+            deviation = values - mean[zones]
+            squares = np.bincount(zones, weights=deviation**2,
+                                  minlength=nzones)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.sqrt(squares / count)
+        elif stat in ['max', 'min']:
+            dtype = values.dtype
+            if not np.issubdtype(dtype, np.floating):
+                dtype = np.float64
+            result = np.full(nzones, np.nan, dtype=dtype)
+            func = np.fmax if stat == 'max' else np.fmin
+            func.at(result, zones, values.astype(dtype, copy=False))
+        elif stat == 'median':
+            result = _group_median(values.astype(np.float64, copy=False),
+                                   zones, nzones)
+        else:
+            if not np.issubdtype(values.dtype, np.floating):
+                values = values.astype(np.float64)
+            result = _group_mode(values, zones, nzones)
+        results[stat] = result
+    return results
+
+
+def zonal_stats(grid, shapes, stats=None, mustContainCenter=False,
+                tileSize=None, cache=True):
+    """Compute statistics of a grid inside each of a set of zones.
+
+    All of the zones are rasterized once into a label grid (see
+    get_zone_labels()), and each statistic of each layer is then computed
+    for every zone at once.  NaN and masked cells are ignored, and zones
+    without valid cells are NaN ('count' is 0).
+
+    :param grid:
+      Grid2D or MultiGrid object.
+    :param shapes:
+      Sequence of shapely geometries or GeoJSON-like features, one per
+      zone, or a ZoneLabels object from get_zone_labels().
+    :param stats:
+      List of statistics (default ['mean']), from:
+        'mean': Mean of the valid cells.
+        'sum': Sum of the valid cells.
+        'max': Maximum of the valid cells.
+        'min': Minimum of the valid cells.
+        'median': Median of the valid cells.
+        'mode': Most common valid cell value (smallest on ties).
+        'count': Number of valid cells.
+        'std': Standard deviation of the valid cells.
+    :param mustContainCenter:
+      Whether a zone must contain the center of a cell for the cell to
+      belong to it, instead of merely touching the cell.
+    :param tileSize:
+      Optional tile size used to rasterize the zones.
+    :param cache:
+      Whether to cache the label grid (see get_zone_labels()).
+    :returns:
+      For a Grid2D, an OrderedDict of 1D arrays (one value per zone)
+      keyed by statistic.  For a MultiGrid, an OrderedDict of those keyed
+      by layer name.
+    :raises DataSetException:
+      When a statistic is not one of ZONAL_STATS, or the shapes are not
+      valid.
+    """
+    if stats is None:
+        stats = ['mean']
+    for stat in stats:
+        if stat not in ZONAL_STATS:
+            raise DataSetException('Zonal statistic must be one of %s.' %
+                                   ZONAL_STATS)
+    if isinstance(shapes, ZoneLabels):
+        zones = shapes
+    else:
+        zones = get_zone_labels(shapes, grid.getGeoDict(),
+                                mustContainCenter=mustContainCenter,
+                                tileSize=tileSize, cache=cache)
+    if isinstance(grid, MultiGrid):
+        results = OrderedDict()
+        for layername in grid.getLayerNames():
+            values, labels = zones.getValues(grid.getLayer(layername))
+            results[layername] = _zone_stats(values, labels, zones.nzones,
+                                             stats)
+        return results
+    values, labels = zones.getValues(grid)
+    return _zone_stats(values, labels, zones.nzones, stats)
+
+
+def zonal_histogram(grid, shapes, bins, weights=None,
+                    mustContainCenter=False, tileSize=None, cache=True):
+    """Histogram the values of a grid inside each of a set of zones.
+
+    For example, with a grid of MMI, bins of intensity and a population
+    grid as weights, this is the population exposed to each intensity
+    bin in each zone.
+
+    :param grid:
+      Grid2D object whose values are binned.
+    :param shapes:
+      Sequence of shapely geometries or GeoJSON-like features, one per
+      zone, or a ZoneLabels object from get_zone_labels().
+    :param bins:
+      Monotonically increasing sequence of bin edges.  Values outside of
+      the first and last edges are not counted.
+    :param weights:
+      Optional Grid2D object on the same grid, whose values are summed in
+      each bin instead of counting cells.
+    :param mustContainCenter:
+      Whether a zone must contain the center of a cell for the cell to
+      belong to it, instead of merely touching the cell.
+    :param tileSize:
+      Optional tile size used to rasterize the zones.
+    :param cache:
+      Whether to cache the label grid (see get_zone_labels()).
+    :returns:
+      2D float64 array of shape (number of zones, len(bins) - 1).
+    """
+    if isinstance(shapes, ZoneLabels):
+        zones = shapes
+    else:
+        zones = get_zone_labels(shapes, grid.getGeoDict(),
+                                mustContainCenter=mustContainCenter,
+                                tileSize=tileSize, cache=cache)
+    bins = np.asarray(bins, dtype=np.float64)
+    nbins = len(bins) - 1
+    values = grid.getData().ravel()[zones._cells]
+    labels = zones._zones
+    if weights is not None:
+        weights = weights.getData().ravel()[zones._cells]
+    # the last bin includes its right edge, like np.histogram
+    index = np.searchsorted(bins, values, side='right') - 1
+    index[values == bins[-1]] = nbins - 1
+    valid = (index >= 0) & (index < nbins)
+    if grid.getMask() is not None:
+        valid &= ~grid.getMask().ravel()[zones._cells]
+    if weights is not None:
+        valid &= ~np.isnan(weights)
+        weights = weights[valid]
+    cells = labels[valid] * nbins + index[valid]
+    histogram = np.bincount(cells, weights=weights,
+                            minlength=zones.nzones * nbins)
+    return histogram.astype(np.float64).reshape((zones.nzones, nbins))
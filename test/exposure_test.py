@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+# python 3 compatibility
+from __future__ import print_function
+import os.path
+import sys
+from collections import OrderedDict
+
+# hack the path so that I can debug these functions if I need to
+homedir = os.path.dirname(os.path.abspath(__file__))  # where is this script?
+mapiodir = os.path.abspath(os.path.join(homedir, '..'))
+# put this at the front of the system path, ignoring any installed mapio stuff
+sys.path.insert(0, mapiodir)
+
+# third party imports
+import numpy as np
+from shapely.geometry import box
+from mapio.grid2d import Grid2D
+from mapio.multiple import MultiGrid
+from mapio.geodict import GeoDict
+from mapio.zonal import get_zone_labels
+from mapio.exposure import calc_exposure, get_exposure_plan, MMI_BINS
+
+
+def _get_grids():
+    mmidict = GeoDict({'xmin': 0.5, 'xmax': 4.5, 'ymin': 0.5, 'ymax': 3.5,
+                       'dx': 1.0, 'dy': 1.0, 'ny': 4, 'nx': 5})
+    mmi = np.array([[1.2, 2.6, 3.1, 4.4, 5.0],
+                    [2.0, 3.5, 4.9, 6.2, 7.7],
+                    [3.3, 4.4, 6.6, 8.1, 9.4],
+                    [4.1, 5.5, 7.4, 9.9, 10.5]])
+    layers = OrderedDict()
+    layers['mmi'] = Grid2D(mmi, mmidict)
+    layers['pga'] = Grid2D(mmi * 10, mmidict)
+    # the population grid hangs off the bottom right of the MMI grid
+    popdict = GeoDict({'xmin': 0.25, 'xmax': 5.75, 'ymin': -0.75,
+                       'ymax': 3.75, 'dx': 0.5, 'dy': 0.5,
+                       'ny': 10, 'nx': 12})
+    pop = np.random.RandomState(0).rand(10, 12) * 100
+    pop[4, 4] = np.nan
+    return (MultiGrid(layers), Grid2D(pop, popdict))
+
+
+def _brute_exposure(mmigrid, popgrid, method):
+    popdict = popgrid.getGeoDict()
+    lats = popdict.ymax - np.arange(popdict.ny) * popdict.dy
+    lons = popdict.xmin + np.arange(popdict.nx) * popdict.dx
+    lons, lats = np.meshgrid(lons, lats)
+    mmi = mmigrid.getValue(lats, lons, method=method, default=np.nan)
+    pop = popgrid.getData()
+    valid = ~np.isnan(mmi) & ~np.isnan(pop)
+    exposure, _ = np.histogram(mmi[valid], bins=MMI_BINS,
+                               weights=pop[valid])
+    return exposure
+
+
+def test_exposure():
+    print('Testing population exposure per MMI bin...')
+    shake, popgrid = _get_grids()
+    mmigrid = shake.getLayer('mmi')
+    for method in ['nearest', 'linear']:
+        exposure = calc_exposure(shake, popgrid, method=method)
+        output = _brute_exposure(mmigrid, popgrid, method)
+        np.testing.assert_almost_equal(exposure, output)
+        # working on a few rows at a time gives the same answer
+        exposure = calc_exposure(mmigrid, popgrid, method=method,
+                                 tileRows=3)
+        np.testing.assert_almost_equal(exposure, output)
+    plan = get_exposure_plan(mmigrid.getGeoDict(), popgrid.getGeoDict())
+    assert get_exposure_plan(mmigrid.getGeoDict().copy(),
+                             popgrid.getGeoDict().copy()) is plan
+
+    # other layers and bins
+    exposure = calc_exposure(shake, popgrid, layer='pga',
+                             bins=[0, 50, 105])
+    total = np.nansum(popgrid.getData()[:8, :10])
+    np.testing.assert_almost_equal(exposure.sum(), total)
+    print('Passed population exposure per MMI bin.')
+
+
+def test_exposure_labels():
+    print('Testing population exposure broken down by zone...')
+    shake, popgrid = _get_grids()
+    exposure = calc_exposure(shake, popgrid)
+    # label the left and right halves of the population grid
+    labels = np.zeros((10, 12), dtype=np.int16)
+    labels[:, 6:] = 1
+    labels[0, :] = -1
+    zexposure = calc_exposure(shake, popgrid, labels=labels, tileRows=4)
+    assert zexposure.shape == (2, len(MMI_BINS) - 1)
+    left = Grid2D(np.where(labels == 0, popgrid.getData(), np.nan),
+                  popgrid.getGeoDict())
+    np.testing.assert_almost_equal(zexposure[0],
+                                   calc_exposure(shake, left))
+    toprow = Grid2D(np.where(labels < 0, popgrid.getData(), np.nan),
+                    popgrid.getGeoDict())
+    np.testing.assert_almost_equal(zexposure.sum(axis=0) +
+                                   calc_exposure(shake, toprow), exposure)
+
+    # zones rasterized from polygons
+    zones = get_zone_labels([box(0.0, 0.0, 3.0, 4.0),
+                             box(3.0, 0.0, 6.0, 4.0)],
+                            popgrid.getGeoDict(), mustContainCenter=True)
+    zexposure = calc_exposure(shake, popgrid, labels=zones)
+    np.testing.assert_almost_equal(zexposure.sum(axis=0), exposure)
+    print('Passed population exposure broken down by zone.')
+
+
+def test_exposure_dateline():
+    print('Testing exposure to a hazard grid crossing the dateline...')
+    popdict = GeoDict({'xmin': -179.5, 'xmax': 179.5, 'ymin': -89.5,
+                       'ymax': 89.5, 'dx': 1.0, 'dy': 1.0,
+                       'ny': 180, 'nx': 360})
+    popgrid = Grid2D(np.ones((180, 360)), popdict)
+    mmidict = GeoDict({'xmin': 170.5, 'xmax': -170.5, 'ymin': 0.5,
+                       'ymax': 19.5, 'dx': 1.0, 'dy': 1.0,
+                       'ny': 20, 'nx': 20})
+    mmigrid = Grid2D(np.full((20, 20), 5.0), mmidict)
+    for method in ['nearest', 'linear']:
+        exposure = calc_exposure(mmigrid, popgrid, method=method)
+        assert exposure[4] == 400
+        assert exposure.sum() == 400
+        exposure = calc_exposure(mmigrid, popgrid, method=method,
+                                 labels=np.zeros((180, 360), dtype=np.int8),
+                                 tileRows=7)
+        assert exposure.sum() == 400
+    print('Passed exposure to a hazard grid crossing the dateline.')
+
+
+def test_exposure_mask():
+    print('Testing exposure to a hazard grid with nodata cells...')
+    shake, popgrid = _get_grids()
+    mmigrid = shake.getLayer('mmi')
+    mask = np.zeros((4, 5), dtype=np.bool_)
+    mask[1, 2] = True
+    mmigrid.setMask(mask)
+    for method in ['nearest', 'linear']:
+        exposure = calc_exposure(mmigrid, popgrid, method=method)
+        nandata = mmigrid.getData().copy()
+        nandata[mask] = np.nan
+        output = _brute_exposure(Grid2D(nandata, mmigrid.getGeoDict()),
+                                 popgrid, method)
+        np.testing.assert_almost_equal(exposure, output)
+    # the population cells nearest to the masked cell are not counted
+    exposure = calc_exposure(mmigrid, popgrid)
+    nomask = calc_exposure(Grid2D(mmigrid.getData(), mmigrid.getGeoDict()),
+                           popgrid)
+    np.testing.assert_almost_equal(nomask[4] - exposure[4],
+                                   np.nansum(popgrid.getData()[2:4, 4:6]))
+    print('Passed exposure to a hazard grid with nodata cells.')
+
+
+if __name__ == '__main__':
+    test_exposure()
+    test_exposure_labels()
+    test_exposure_dateline()
+    test_exposure_mask()
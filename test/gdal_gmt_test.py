@@ -116,6 +116,20 @@ def test_simple_pad():
                 samplegrid = gridclass.load(testfile,sampledict,doPadding=True)
                 np.testing.assert_almost_equal(samplegrid.getData(),testdata)
                 assert samplegrid.getGeoDict() == testdict
+                #integer data keeps its type when the pad value fits in it,
+                #also through nearest neighbor resampling.
+                srcgrid = gridclass(data.astype(np.int16),geodict)
+                srcgrid.save(testfile,format=fileformat)
+                filetype = gridclass.load(testfile).getData().dtype
+                assert filetype.kind == 'i'
+                for resample in [False,True]:
+                    samplegrid = gridclass.load(testfile,sampledict,
+                                                resample=resample,
+                                                method='nearest',
+                                                doPadding=True,padValue=0)
+                    assert samplegrid.getData().dtype == filetype
+                    np.testing.assert_equal(samplegrid.getData(),
+                                            np.nan_to_num(testdata))
             except Exception as e:
                 raise(e)
             finally:
@@ -266,6 +280,65 @@ def test_meridian_interp():
                 if os.path.isdir(tdir):
                     shutil.rmtree(tdir)
 
+def test_aligned():
+    gridclasses = [GDALGrid,GMTGrid]
+    for gridclass in gridclasses:
+        for fileformat in FORMATS[gridclass]:
+            tdir = None
+            try:
+                geodict = GeoDict({'xmin':0.5,
+                                   'xmax':8.5,
+                                   'ymin':0.5,
+                                   'ymax':6.5,
+                                   'dx':1.0,
+                                   'dy':1.0,
+                                   'nx':9,
+                                   'ny':7})
+                data = np.arange(63,dtype=np.float32).reshape((7,9))
+                tdir = tempfile.mkdtemp()
+                testfile = os.path.join(tdir,'test.bil')
+                srcgrid = gridclass(data,geodict)
+                srcgrid.save(testfile,format=fileformat)
+                #a subset on the file grid, and one with every other column
+                #and every third row of it, are sliced out of the file.
+                sampledicts = [GeoDict({'xmin':2.5,'xmax':5.5,
+                                        'ymin':1.5,'ymax':4.5,
+                                        'dx':1.0,'dy':1.0,
+                                        'nx':4,'ny':4}),
+                               GeoDict({'xmin':1.5,'xmax':7.5,
+                                        'ymin':0.5,'ymax':6.5,
+                                        'dx':2.0,'dy':3.0,
+                                        'nx':4,'ny':3})]
+                testdata = [data[2:6,2:6],data[::3,1::2]]
+                #cells between file cells, or a sample hanging off the file,
+                #still have to be interpolated.
+                shifted = GeoDict({'xmin':2.0,'xmax':5.0,
+                                   'ymin':1.5,'ymax':4.5,
+                                   'dx':1.0,'dy':1.0,
+                                   'nx':4,'ny':4})
+                assert Grid2D.getSampleStride(geodict,shifted) is None
+                outside = GeoDict({'xmin':6.5,'xmax':9.5,
+                                   'ymin':1.5,'ymax':4.5,
+                                   'dx':1.0,'dy':1.0,
+                                   'nx':4,'ny':4})
+                assert Grid2D.getSampleStride(geodict,outside) is None
+                for sampledict,output in zip(sampledicts,testdata):
+                    assert Grid2D.getSampleStride(geodict,sampledict) is not None
+                    for method in ['nearest','linear']:
+                        samplegrid = gridclass.load(testfile,sampledict,
+                                                    resample=True,method=method)
+                        np.testing.assert_almost_equal(samplegrid.getData(),output)
+                        assert samplegrid.getGeoDict() == sampledict
+                        assert samplegrid.getData().flags['C_CONTIGUOUS']
+                        interpgrid = srcgrid.interpolateToGrid(sampledict,method=method)
+                        np.testing.assert_almost_equal(samplegrid.getData(),
+                                                       interpgrid.getData())
+            except Exception as e:
+                raise(e)
+            finally:
+                if os.path.isdir(tdir):
+                    shutil.rmtree(tdir)
+
 # def test_360():
 #     gridclasses = [GDALGrid,GMTGrid]
 #     for gridclass in gridclasses:
@@ -320,6 +393,7 @@ if __name__ == '__main__':
     test_simple_meridian()
     test_meridian_interp()
     test_simple_pad()
+    test_aligned()
     
     
         
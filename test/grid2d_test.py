@@ -13,6 +13,7 @@ import textwrap
 import glob
 import os
 import tempfile
+from collections import OrderedDict
 
 # hack the path so that I can debug these functions if I need to
 homedir = os.path.dirname(os.path.abspath(__file__))  # where is this script?
@@ -59,6 +60,34 @@ def test_subdivide():
                        [2., 2., 2., 3., 3., 3.],
                        [2., 2., 2., 3., 3., 3.]])
     np.testing.assert_almost_equal(finegrid.getData(), output)
+
+    # even resolution multiple, fine cell edges aligned with host edges
+    data = np.arange(0, 6).reshape((2, 3))
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 2.5,
+                       'ymin': 0.5, 'ymax': 1.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 2, 'nx': 3})
+    hostgrid = Grid2D(data, geodict)
+    finedict = GeoDict({'xmin': 0.75, 'xmax': 2.75,
+                        'ymin': 0.25, 'ymax': 1.75,
+                        'dx': 0.5, 'dy': 0.5,
+                        'ny': 4, 'nx': 5})
+    finegrid = hostgrid.subdivide(finedict)
+    N = np.nan
+    output = np.array([[0., 1., 1., 2., 2.],
+                       [0., 1., 1., 2., 2.],
+                       [3., 4., 4., 5., 5.],
+                       [3., 4., 4., 5., 5.]])
+    np.testing.assert_almost_equal(finegrid.getData(), output)
+    finedict = GeoDict({'xmin': 1.75, 'xmax': 3.25,
+                        'ymin': 0.25, 'ymax': 1.25,
+                        'dx': 0.5, 'dy': 0.5,
+                        'ny': 3, 'nx': 4})
+    finegrid = hostgrid.subdivide(finedict)
+    output = np.array([[1., 2., 2., N],
+                       [4., 5., 5., N],
+                       [4., 5., 5., N]])
+    np.testing.assert_almost_equal(finegrid.getData(), output)
     print('Passed subdivide method test - aligned grids.')
 
     print('Testing subdivide method - non-aligned grids...')
@@ -106,9 +135,288 @@ def test_subdivide():
                        [N, 6., 6., 7., 7., 7.5, 8., 8.]])
     np.testing.assert_almost_equal(finegrid.getData(), output)
     print('Passed subdivide with mean parameter...')
+
+    # seams on the first row/column are filled too, and a fine cell on a
+    # host cell corner combines all four host cells.
+    finedict = GeoDict({'xmin': 2.5, 'xmax': 6.5,
+                        'ymin': 2.5, 'ymax': 6.5,
+                        'dx': 2.0, 'dy': 2.0,
+                        'nx': 3, 'ny': 3})
+    finegrid = hostgrid.subdivide(finedict, cellFill='mean')
+    output = np.array([[3.5, 4.0, 4.0],
+                       [3.5, 4.0, 4.0],
+                       [5.0, 5.5, 5.5]])
+    np.testing.assert_almost_equal(finegrid.getData(), output)
     print('Passed subdivide method test - non-aligned grids.')
 
 
+def test_blockreduce():
+    print('Testing block reduction - aligned grids...')
+    data = np.arange(0, 24, dtype=np.float64).reshape((4, 6))
+    data[0, 0] = np.nan
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 5.5,
+                       'ymin': 0.5, 'ymax': 3.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 4, 'nx': 6})
+    grid = Grid2D(data, geodict)
+    coarsedict = GeoDict({'xmin': 1.0, 'xmax': 5.0,
+                          'ymin': 1.0, 'ymax': 3.0,
+                          'dx': 2.0, 'dy': 2.0,
+                          'ny': 2, 'nx': 3})
+    meangrid = grid.blockmean(coarsedict)
+    output = np.array([[14 / 3.0, 5.5, 7.5],
+                       [15.5, 17.5, 19.5]])
+    np.testing.assert_almost_equal(meangrid.getData(), output)
+    sumgrid = grid.blockReduce(coarsedict, stat='sum')
+    np.testing.assert_almost_equal(sumgrid.getData(), output * [[3, 4, 4],
+                                                                [4, 4, 4]])
+    countgrid = grid.blockReduce(coarsedict, stat='count')
+    np.testing.assert_almost_equal(countgrid.getData(), [[3, 4, 4],
+                                                         [4, 4, 4]])
+    maxgrid = grid.blockReduce(coarsedict, stat='max')
+    np.testing.assert_almost_equal(maxgrid.getData(), [[7, 9, 11],
+                                                       [19, 21, 23]])
+
+    # categorical data
+    data = np.array([[1, 1, 2, 3],
+                     [2, 1, 3, 2],
+                     [4, 4, 5, 5],
+                     [4, 4, 6, 7]])
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 3.5,
+                       'ymin': 0.5, 'ymax': 3.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 4, 'nx': 4})
+    grid = Grid2D(data, geodict)
+    coarsedict = GeoDict({'xmin': 1.0, 'xmax': 3.0,
+                          'ymin': 1.0, 'ymax': 3.0,
+                          'dx': 2.0, 'dy': 2.0,
+                          'ny': 2, 'nx': 2})
+    modegrid = grid.blockReduce(coarsedict, stat='mode')
+    np.testing.assert_almost_equal(modegrid.getData(), [[1, 2], [4, 5]])
+    mediangrid = grid.blockReduce(coarsedict, stat='median')
+    np.testing.assert_almost_equal(mediangrid.getData(), [[1, 2.5],
+                                                          [4, 5.5]])
+    print('Passed block reduction - aligned grids.')
+
+    print('Testing block reduction - non-aligned grids...')
+    data = np.ones((6, 6))
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 5.5,
+                       'ymin': 0.5, 'ymax': 5.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 6, 'nx': 6})
+    grid = Grid2D(data, geodict)
+    coarsedict = GeoDict({'xmin': 0.75, 'xmax': 5.25,
+                          'ymin': 0.75, 'ymax': 5.25,
+                          'dx': 1.5, 'dy': 1.5,
+                          'ny': 4, 'nx': 4})
+    # sums are area weighted, so the total is conserved
+    sumgrid = grid.blockReduce(coarsedict, stat='sum')
+    np.testing.assert_almost_equal(sumgrid.getData(), np.ones((4, 4)) * 2.25)
+    meangrid = grid.blockmean(coarsedict)
+    np.testing.assert_almost_equal(meangrid.getData(), np.ones((4, 4)))
+    print('Passed block reduction - non-aligned grids.')
+
+
+def test_conservative():
+    print('Testing conservative resampling...')
+    data = np.random.RandomState(0).rand(4, 6) * 100
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 5.5,
+                       'ymin': 0.5, 'ymax': 3.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 4, 'nx': 6})
+    grid = Grid2D(data, geodict)
+    # aligned coarse cells hold the sums of their cells
+    coarsedict = GeoDict({'xmin': 1.0, 'xmax': 5.0,
+                          'ymin': 1.0, 'ymax': 3.0,
+                          'dx': 2.0, 'dy': 2.0,
+                          'ny': 2, 'nx': 3})
+    coarsegrid = grid.interpolateToGrid(coarsedict, method='conservative')
+    np.testing.assert_almost_equal(coarsegrid.getData(),
+                                   grid.blockReduce(coarsedict,
+                                                    stat='sum').getData())
+    # misaligned coarser, and finer, grids covering the grid keep the total
+    for sampledict in [GeoDict({'xmin': 0.75, 'xmax': 5.25,
+                                'ymin': 0.75, 'ymax': 3.75,
+                                'dx': 1.5, 'dy': 1.5,
+                                'ny': 3, 'nx': 4}),
+                       GeoDict({'xmin': 0.25, 'xmax': 5.75,
+                                'ymin': 0.25, 'ymax': 3.75,
+                                'dx': 0.5, 'dy': 0.5,
+                                'ny': 8, 'nx': 12})]:
+        newgrid = grid.interpolateToGrid(sampledict, method='conservative')
+        np.testing.assert_almost_equal(newgrid.getData().sum(), data.sum())
+    np.testing.assert_almost_equal(newgrid.getData()[0:2, 0:2],
+                                   data[0, 0] / 4)
+
+    # cells weighted by true area split unevenly between latitudes
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 5.5,
+                       'ymin': 50.5, 'ymax': 53.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 4, 'nx': 6})
+    sampledict = GeoDict({'xmin': 0.25, 'xmax': 5.75,
+                          'ymin': 50.25, 'ymax': 53.75,
+                          'dx': 0.5, 'dy': 0.5,
+                          'ny': 8, 'nx': 12})
+    grid = Grid2D(data, geodict)
+    newgrid = grid.interpolateToGrid(sampledict, method='conservative',
+                                     areaWeighted=True)
+    newdata = newgrid.getData()
+    np.testing.assert_almost_equal(newdata.sum(), data.sum())
+    top = np.sin(np.radians(54.0)) - np.sin(np.radians(53.5))
+    bottom = np.sin(np.radians(53.5)) - np.sin(np.radians(53.0))
+    np.testing.assert_almost_equal(newdata[0, 0] + newdata[1, 0],
+                                   data[0, 0] / 2)
+    np.testing.assert_almost_equal(newdata[0, 0] / newdata[1, 0],
+                                   top / bottom)
+
+    # NaN cells, and new cells off the grid
+    data[1, 1] = np.nan
+    grid = Grid2D(data, geodict)
+    sampledict = GeoDict({'xmin': 1.0, 'xmax': 7.0,
+                          'ymin': 51.0, 'ymax': 53.0,
+                          'dx': 2.0, 'dy': 2.0,
+                          'ny': 2, 'nx': 4})
+    newgrid = grid.interpolateToGrid(sampledict, method='conservative')
+    newdata = newgrid.getData()
+    assert np.isnan(newdata[0, 0]) and np.isnan(newdata[:, 3]).all()
+    np.testing.assert_almost_equal(newdata[1, 1], data[2:4, 2:4].sum())
+    newgrid = grid.interpolateToGrid(sampledict, method='conservative',
+                                     nanPolicy='renormalize')
+    np.testing.assert_almost_equal(newgrid.getData()[0, 0],
+                                   np.nansum(data[0:2, 0:2]))
+    print('Passed conservative resampling.')
+
+
+def test_loadfromcloud():
+    print('Testing gridding of scattered points...')
+    # grid crossing the 180 meridian
+    geodict = GeoDict({'xmin': 179.5, 'xmax': -179.5,
+                       'ymin': 0.5, 'ymax': 1.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 2, 'nx': 2})
+    lat = np.array([1.5, 1.1, 1.2, 0.6, 0.9, 5.0])
+    lon = np.array([179.6, 179.0, -179.9, 180.4, -179.0, 180.0])
+    data = np.array([1.0, 5.0, 2.0, 3.0, 4.0, 6.0])
+    grid = Grid2D.loadFromCloud((lat, lon, data), geodict)
+    np.testing.assert_almost_equal(grid.getData(), [[3.0, 2.0],
+                                                    [np.nan, 3.0]])
+    grid = Grid2D.loadFromCloud((lat, lon, data), geodict, method='nearest')
+    np.testing.assert_almost_equal(grid.getData(), [[1.0, 2.0],
+                                                    [np.nan, 3.0]])
+    grid = Grid2D.loadFromCloud((lat, lon, data), geodict, method='count')
+    np.testing.assert_almost_equal(grid.getData(), [[2, 1], [0, 1]])
+
+    # fill empty cells from their neighbors
+    grid = Grid2D.loadFromCloud((lat, lon, data), geodict, fill='idw')
+    assert np.isfinite(grid.getData()).all()
+    print('Passed gridding of scattered points.')
+
+
+def test_padgrid():
+    print('Testing padding of grids...')
+    data = np.arange(0, 6, dtype=np.int16).reshape((2, 3))
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 2.5,
+                       'ymin': 0.5, 'ymax': 1.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 2, 'nx': 3})
+    pad_dict = {'padleft': 1, 'padright': 0, 'padbottom': 2, 'padtop': 1}
+    newdata, newdict = Grid2D.padGrid(data, geodict, pad_dict, padValue=-1)
+    output = np.array([[-1, -1, -1, -1],
+                       [-1, 0, 1, 2],
+                       [-1, 3, 4, 5],
+                       [-1, -1, -1, -1],
+                       [-1, -1, -1, -1]])
+    np.testing.assert_equal(newdata, output)
+    assert newdata.dtype == np.int16
+    assert (newdict.xmin, newdict.xmax) == (-0.5, 2.5)
+    assert (newdict.ymin, newdict.ymax) == (-1.5, 2.5)
+    assert (newdict.ny, newdict.nx) == (5, 4)
+
+    # NaN padding promotes integer data only as far as float32
+    newdata, newdict = Grid2D.padGrid(data, geodict, pad_dict,
+                                      padValue=np.nan)
+    assert newdata.dtype == np.float32
+    assert np.isnan(newdata[0]).all()
+
+    # several layers at once, keeping their dtypes
+    layers = OrderedDict([('a', data), ('b', data.astype(np.float32))])
+    newlayers, newdict = Grid2D.padGrids(layers, geodict, pad_dict,
+                                         padValue=0)
+    assert list(newlayers.keys()) == ['a', 'b']
+    np.testing.assert_equal(newlayers['b'], np.maximum(output, 0))
+    assert newlayers['b'].dtype == np.float32
+
+    # by default floats are padded with NaN, and integers with nodata
+    newdata, newdict = Grid2D.padGrid(data.astype(np.float32), geodict,
+                                      pad_dict)
+    assert newdata.dtype == np.float32
+    assert np.isnan(newdata[0]).all()
+    try:
+        Grid2D.padGrid(data, geodict, pad_dict)
+        assert False
+    except DataSetException:
+        pass
+    nodict = geodict.copy()
+    nodict.nodata = -9999
+    newdata, newdict = Grid2D.padGrid(data, nodict, pad_dict)
+    assert newdata.dtype == np.int16
+    np.testing.assert_equal(newdata, np.where(output < 0, -9999, output))
+    print('Passed padding of grids.')
+
+
+def test_mask():
+    print('Testing nodata masks...')
+    data = np.arange(0, 20, dtype=np.int16).reshape((4, 5))
+    data[1, 2] = -9999
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 4.5,
+                       'ymin': 0.5, 'ymax': 3.5,
+                       'dx': 1.0, 'dy': 1.0,
+                       'ny': 4, 'nx': 5, 'nodata': -9999})
+    grid = Grid2D(data, geodict)
+    grid.applyNaN(useMask=True)
+    assert grid.getData().dtype == np.int16
+    mask = grid.getMask()
+    assert mask.sum() == 1 and mask[1, 2]
+    masked = grid.getMaskedData()
+    assert masked.mean() == (data.sum() + 9999) / 19.0
+
+    # cut and nearest neighbor resampling keep data type and mask
+    cutgrid = grid.cut(1.5, 3.5, 2.5, 3.5)
+    assert cutgrid.getData().dtype == np.int16
+    np.testing.assert_equal(cutgrid.getMask(), [[False, False, False],
+                                                [False, True, False]])
+    sampledict = GeoDict({'xmin': 1.5, 'xmax': 3.5,
+                          'ymin': 1.5, 'ymax': 2.5,
+                          'dx': 1.0, 'dy': 1.0,
+                          'ny': 2, 'nx': 3})
+    newgrid = grid.interpolateToGrid(sampledict, method='nearest')
+    assert newgrid.getData().dtype == np.int16
+    np.testing.assert_equal(newgrid.getMask(), [[False, True, False],
+                                                [False, False, False]])
+    assert newgrid.getGeoDict().nodata == -9999
+
+    # linear resampling masks the cells that draw on masked cells
+    sampledict = GeoDict({'xmin': 1.0, 'xmax': 4.0,
+                          'ymin': 2.0, 'ymax': 3.0,
+                          'dx': 1.0, 'dy': 1.0,
+                          'ny': 2, 'nx': 4})
+    newgrid = grid.interpolateToGrid(sampledict, method='linear')
+    np.testing.assert_equal(newgrid.getMask(),
+                            [[False, True, True, False],
+                             [False, True, True, False]])
+    np.testing.assert_almost_equal(newgrid.getData()[0, 0], 3.0)
+
+    # masked cells are left out of block reductions
+    coarsedict = GeoDict({'xmin': 1.0, 'xmax': 3.0,
+                          'ymin': 1.0, 'ymax': 3.0,
+                          'dx': 2.0, 'dy': 2.0,
+                          'ny': 2, 'nx': 2})
+    meangrid = grid.blockmean(coarsedict)
+    np.testing.assert_almost_equal(meangrid.getData()[0],
+                                   [3.0, (2 + 3 + 8) / 3.0])
+    print('Passed nodata masks.')
+
+
 def test_basics():
     geodict = GeoDict({'xmin': 0.5, 'xmax': 3.5, 'ymin': 0.5,
                        'ymax': 3.5, 'dx': 1.0, 'dy': 1.0, 'ny': 4, 'nx': 4})
@@ -176,6 +484,76 @@ def test_getvalue():
     test = grid.getValue(lat, lon)
     np.testing.assert_almost_equal(test, np.array([[13, 8], [9, 4]]))
 
+    print('Testing linear and cubic point sampling...')
+    # the grid is linear in lat and lon, so both methods are exact inside
+    lat = np.array([3.0, 3.5, 2.25, 5.3, 0.0])
+    lon = np.array([3.0, 3.5, 2.75, 1.2, 3.0])
+    output = 5 * (5.0 - lat) + lon
+    for method in ['linear', 'cubic']:
+        test = grid.getValue(lat[:3], lon[:3], method=method)
+        np.testing.assert_almost_equal(test, output[:3])
+    # points past the outer cell centers take the edge values
+    test = grid.getValue(lat[3:4], lon[3:4], method='linear')
+    np.testing.assert_almost_equal(test, [1.2])
+    # per-point defaults outside the grid
+    test = grid.getValue(lat, lon, method='linear',
+                         default=np.arange(5.0))
+    np.testing.assert_almost_equal(test[:3], output[:3])
+    assert test[4] == 4.0
+    assert grid.getValue(3.5, 3.5, method='linear') == output[1]
+
+    # NaN cells spread to their neighbors only with nanPolicy='propagate'
+    fgrid = Grid2D(array.astype(np.float64), gdict)
+    fgrid._data[2, 2] = np.nan
+    lat = np.array([3.0, 3.5, 2.5])
+    lon = np.array([3.5, 3.5, 1.5])
+    test = fgrid.getValue(lat, lon, method='linear')
+    assert np.isnan(test[:2]).all() and test[2] == 14.0
+    test = fgrid.getValue(lat, lon, method='linear',
+                          nanPolicy='renormalize')
+    np.testing.assert_almost_equal(test, [14.0, 31 / 3.0, 14.0])
+
+    # cells in the nodata mask are NaN with every method
+    mgrid = Grid2D(array, gdict)
+    mask = np.zeros((5, 5), dtype=np.bool_)
+    mask[2, 2] = True
+    mgrid.setMask(mask)
+    lat = np.array([3.0, 3.1, 4.0])
+    lon = np.array([3.0, 2.9, 3.0])
+    test = mgrid.getValue(lat, lon)
+    assert test.dtype == np.float64
+    assert np.isnan(test[:2]).all() and test[2] == 8
+    assert np.isnan(mgrid.getValue(3.0, 3.0))
+    test = mgrid.getValue(lat, lon, default=-1.0)
+    assert np.isnan(test[:2]).all()
+    for method in ['linear', 'cubic']:
+        test = mgrid.getValue(lat, lon, method=method)
+        assert np.isnan(test[:2]).all() and test[2] == 8
+        test = mgrid.getValue(lat, lon, method=method,
+                              nanPolicy='renormalize')
+        assert np.isnan(test[0]) and np.isfinite(test[1:]).all()
+    # the nodata mask acts like NaN cells
+    nangrid = Grid2D(np.where(mask, np.nan, array), gdict)
+    lat = np.array([4.25, 1.5, 2.5, 4.9])
+    lon = np.array([1.5, 4.25, 4.5, 1.1])
+    for nanPolicy in ['propagate', 'renormalize']:
+        np.testing.assert_almost_equal(
+            mgrid.getValue(lat, lon, method='cubic', nanPolicy=nanPolicy),
+            nangrid.getValue(lat, lon, method='cubic', nanPolicy=nanPolicy))
+
+    # global grids interpolate across the meridian, and lon is unchanged
+    data = np.array([[0.0, 1.0, 2.0, 3.0]])
+    gdict = GeoDict({'xmin': -135.0, 'xmax': 135.0,
+                     'ymin': 0.0, 'ymax': 0.0,
+                     'dx': 90.0, 'dy': 90.0,
+                     'nx': 4, 'ny': 1})
+    grid = Grid2D(data, gdict)
+    lon = np.array([180.0, -180.0, 157.5, 225.0])
+    test = grid.getValue(np.zeros(4), lon, method='linear')
+    np.testing.assert_almost_equal(test, [1.5, 1.5, 2.25, 0.0])
+    np.testing.assert_equal(lon, [180.0, -180.0, 157.5, 225.0])
+    print('Passed linear and cubic point sampling.')
+
 
 def test_cut():
     geodict = GeoDict({'xmin': 0.5, 'xmax': 4.5, 'ymin': 0.5,
@@ -188,8 +566,24 @@ def test_cut():
     newgrid = grid.cut(xmin, xmax, ymin, ymax)
     output = np.array([[7, 8], [12, 13]])
     np.testing.assert_almost_equal(newgrid.getData(), output)
+    assert not np.shares_memory(newgrid.getData(), data)
     print('Passed data extraction...')
 
+    print('Testing data extraction without copying...')
+    fdata = data.astype(np.float64)
+    grid = Grid2D(fdata, geodict, copy=False)
+    assert grid.getData() is fdata
+    newgrid = grid.cut(xmin, xmax, ymin, ymax, copy=False)
+    np.testing.assert_almost_equal(newgrid.getData(), output)
+    assert np.shares_memory(newgrid.getData(), fdata)
+    assert not newgrid.getData().flags.writeable
+    # modifying the view in place copies it first, leaving the parent alone
+    newgrid._geodict.nodata = 7
+    newgrid.applyNaN()
+    assert np.isnan(newgrid.getData()[0, 0])
+    assert fdata[1, 2] == 7
+    print('Passed data extraction without copying...')
+
     print('Testing data trimming with resampling...')
     # make a more complicated test using getboundswithin
     data = np.arange(0, 84).reshape(7, 12)
@@ -304,6 +698,47 @@ def test_rasterize():
     np.testing.assert_almost_equal(grid2.getData(), output)
     print('Passed burning in values where polygons must contain pixel centers.')
 
+    print('Testing tiled rasterizing into a compact or file-backed array...')
+    for mustContainCenter in [False, True]:
+        grid = Grid2D.rasterizeFromGeometry(
+            shapes, geodict, fillValue=0, attribute='value',
+            mustContainCenter=mustContainCenter)
+        grid3 = Grid2D.rasterizeFromGeometry(
+            shapes, geodict, fillValue=0, attribute='value',
+            mustContainCenter=mustContainCenter, dtype=np.uint8,
+            tileSize=3, numThreads=2)
+        assert grid3.getData().dtype == np.uint8
+        np.testing.assert_equal(grid3.getData(), grid.getData())
+    # a tile that no shape overlaps is just filled
+    grid3 = Grid2D.rasterizeFromGeometry([Polygon(poly1)], geodict,
+                                         fillValue=np.nan, tileSize=2)
+    np.testing.assert_equal(grid3.getData()[2:, 2:], np.nan)
+    try:
+        tdir = tempfile.mkdtemp()
+        mmap = np.memmap(os.path.join(tdir, 'burn.dat'), dtype=np.int16,
+                         mode='w+', shape=(4, 4))
+        grid3 = Grid2D.rasterizeFromGeometry(
+            shapes, geodict, fillValue=-1, attribute='value',
+            out=mmap, tileSize=2)
+        assert grid3.getData() is mmap
+        output = np.array([[5, 5, 7, 7],
+                           [5, 5, 7, 7],
+                           [-1, -1, 7, 7],
+                           [-1, -1, -1, 7]])
+        mmap2 = np.memmap(os.path.join(tdir, 'burn.dat'), dtype=np.int16,
+                          mode='r', shape=(4, 4))
+        np.testing.assert_equal(mmap2, output)
+        del mmap, mmap2, grid3
+    finally:
+        shutil.rmtree(tdir)
+    try:
+        Grid2D.rasterizeFromGeometry(shapes, geodict, attribute='value',
+                                     dtype=np.uint8)
+        assert False
+    except DataSetException:
+        pass
+    print('Passed tiled rasterizing into a compact or file-backed array.')
+
 
 def test_copy():
     data = np.arange(0, 16).astype(np.float32).reshape(4, 4)
@@ -423,6 +858,15 @@ def test_project():
     projstr = "+proj=utm +zone=40 +north +ellps=WGS84 +datum=WGS84 +units=m +no_defs "
     newgrid = grid.project(projstr, method='nearest')
 
+    # a second grid on the same geodict reuses the cached projection set-up
+    grid2 = GDALGrid(data * 2, gd)
+    newgrid2 = grid2.project(projstr, method='nearest')
+    assert newgrid2.getGeoDict() == newgrid.getGeoDict()
+    np.testing.assert_equal(newgrid2.getData(), newgrid.getData() * 2)
+    # and changes to one projected geodict do not leak into the other
+    newgrid2._geodict.nodata = -1
+    assert newgrid.getGeoDict().nodata is None
+
     try:
         tdir = tempfile.mkdtemp()
         outfile = os.path.join(tdir, 'output.bil')
@@ -534,6 +978,11 @@ if __name__ == '__main__':
     test_getvalue()
     test_project()
     test_subdivide()
+    test_blockreduce()
+    test_conservative()
+    test_loadfromcloud()
+    test_padgrid()
+    test_mask()
     test_rasterize()
     test_interpolate()
     test_basics()
@@ -85,6 +85,57 @@ def test():
                        [ N,   6.,   6.,   7.,   7.,   7.,   8.,   8.]])
     np.testing.assert_almost_equal(finegrid.getLayer('layer1').getData(),output)
     print('Passed MultiGrid subdivide test.')
+
+    print('Testing MultiGrid sampling of several layers...')
+    data = np.arange(14,56).reshape(6,7)
+    geodict = GeoDict({'xmin':0.5,'xmax':6.5,'ymin':1.5,'ymax':6.5,'dx':1.0,'dy':1.0,'ny':6,'nx':7})
+    layers = OrderedDict()
+    layers['layer1'] = Grid2D(data,geodict)
+    layers['layer2'] = Grid2D(data*2.0,geodict)
+    layers['layer3'] = Grid2D(-data,geodict)
+    mgrid = MultiGrid(layers)
+    lats = np.array([4.0,3.5,9.0])
+    lons = np.array([3.0,4.5,3.0])
+    samples = mgrid.sample(lats,lons,layers=['layer2','layer1'],method='linear',default=-1.0)
+    assert list(samples.keys()) == ['layer2','layer1']
+    np.testing.assert_almost_equal(samples['layer1'],[34.0,39.0,-1.0])
+    np.testing.assert_almost_equal(samples['layer2'],[68.0,78.0,-1.0])
+    samples = mgrid.sample(lats[:2],lons[:2])
+    assert list(samples.keys()) == ['layer1','layer2','layer3']
+    for layername,values in samples.items():
+        layervalues = mgrid.getValue(lats[:2],lons[:2],layername)
+        np.testing.assert_equal(values,layervalues)
+    try:
+        mgrid.sample(lats,lons,layers=['layer4'])
+        assert False
+    except DataSetException:
+        pass
+    print('Passed MultiGrid sampling of several layers.')
+
+    print('Testing MultiGrid projection of several layers...')
+    projstr = '+proj=utm +zone=31 +north +ellps=WGS84 +datum=WGS84 +units=m +no_defs'
+    fdata = data.astype(np.float32)
+    layers = OrderedDict()
+    layers['layer1'] = Grid2D(fdata,geodict)
+    layers['layer2'] = Grid2D(fdata*2,geodict)
+    mgrid = MultiGrid(layers,descriptions=['one','two'])
+    pgrid = mgrid.project(projstr,method='nearest',numThreads=2)
+    assert list(pgrid.getLayerNames()) == ['layer1','layer2']
+    for layername in pgrid.getLayerNames():
+        pdata = pgrid.getLayer(layername).getData()
+        assert pdata.dtype == np.float32
+        #one multi-band warp gives the same answer as projecting each layer
+        layergrid = mgrid.getLayer(layername).project(projstr,method='nearest')
+        assert pgrid.getLayer(layername).getGeoDict() == layergrid.getGeoDict()
+        np.testing.assert_equal(pdata,layergrid.getData())
+    #projecting into an earlier result reuses its arrays
+    olddata = pgrid.getLayer('layer2').getData()
+    mgrid.setLayer('layer2',fdata*3)
+    pgrid2 = mgrid.project(projstr,method='nearest',out=pgrid)
+    newdata = pgrid2.getLayer('layer2').getData()
+    assert newdata is not olddata and newdata.base is olddata.base
+    np.testing.assert_equal(newdata,pgrid.getLayer('layer1').getData()*3)
+    print('Passed MultiGrid projection of several layers.')
     
 
 if __name__ == '__main__':
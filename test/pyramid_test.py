@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+# python 3 compatibility
+from __future__ import print_function
+import os.path
+import sys
+import tempfile
+import shutil
+import time
+
+# hack the path so that I can debug these functions if I need to
+homedir = os.path.dirname(os.path.abspath(__file__))  # where is this script?
+mapiodir = os.path.abspath(os.path.join(homedir, '..'))
+# put this at the front of the system path, ignoring any installed mapio stuff
+sys.path.insert(0, mapiodir)
+
+# third party imports
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from mapio.gdal import GDALGrid
+from mapio.gmt import GMTGrid
+from mapio.geodict import GeoDict
+from mapio.reader import read, close_datasets
+from mapio.pyramid import (build_pyramid, build_overviews, get_pyramid_file,
+                           get_level_filename, get_level_geodict)
+
+
+def _get_grid():
+    geodict = GeoDict({'xmin': 0.05, 'xmax': 7.95,
+                       'ymin': 0.05, 'ymax': 6.35,
+                       'dx': 0.1, 'dy': 0.1,
+                       'nx': 80, 'ny': 64})
+    rows, cols = np.mgrid[0:64, 0:80]
+    data = (0.02 * cols + 0.03 * rows).astype(np.float32)
+    return (data, geodict)
+
+
+def test_level_geodict():
+    print('Testing pyramid level grids...')
+    data, geodict = _get_grid()
+    leveldict = get_level_geodict(geodict, 4)
+    assert leveldict == GeoDict({'xmin': 0.2, 'xmax': 7.8,
+                                 'ymin': 0.2, 'ymax': 6.2,
+                                 'dx': 0.4, 'dy': 0.4,
+                                 'nx': 20, 'ny': 16})
+    # the partial blocks on the right and bottom are left out
+    leveldict = get_level_geodict(geodict, 3)
+    assert (leveldict.ny, leveldict.nx) == (21, 26)
+    assert get_level_geodict(geodict, 64) is None
+    assert get_level_filename(os.path.join('data', 'grid.grd'), 8) == \
+        os.path.join('data', 'grid_ovr8.grd')
+    print('Passed pyramid level grids.')
+
+
+def test_pyramid():
+    print('Testing loading coarse grids from pyramids...')
+    data, geodict = _get_grid()
+    sampledict = GeoDict.createDictFromBox(1.03, 6.01, 1.02, 5.07,
+                                           0.53, 0.47)
+    tdir = tempfile.mkdtemp()
+    try:
+        for gridclass, fileformat in [(GDALGrid, 'EHdr'),
+                                      (GMTGrid, 'netcdf'),
+                                      (GMTGrid, 'hdf')]:
+            gridfile = os.path.join(tdir, 'grid_%s.grd' % fileformat)
+            grid = gridclass(data, geodict)
+            grid.save(gridfile, format=fileformat)
+            levelfiles = build_pyramid(grid, gridfile, format=fileformat)
+            assert levelfiles == [get_level_filename(gridfile, factor)
+                                  for factor in [2, 4, 8, 16]]
+            level = gridclass.load(levelfiles[1])
+            assert level.getGeoDict() == get_level_geodict(geodict, 4)
+            # means of the blocks of a linear ramp are the block centers
+            np.testing.assert_almost_equal(level.getData()[0, 0:3],
+                                           [0.075, 0.155, 0.235], decimal=5)
+
+            # the coarsest level no coarser than the sampling grid
+            levelfile, _ = get_pyramid_file(gridfile, geodict, sampledict)
+            assert levelfile == levelfiles[1]
+            grid1 = gridclass.load(gridfile, sampledict, resample=True)
+            grid2 = gridclass.load(levelfile, sampledict, resample=True)
+            np.testing.assert_equal(grid1.getData(), grid2.getData())
+            grid3 = gridclass.load(gridfile, sampledict, resample=True,
+                                   usePyramid=False)
+            np.testing.assert_almost_equal(grid1.getData(), grid3.getData(),
+                                           decimal=5)
+
+            # sampling grids aligned with the file are sliced out of it,
+            # not resampled from a level
+            aligndict = GeoDict({'xmin': 1.05, 'xmax': 4.65,
+                                 'ymin': 1.05, 'ymax': 3.85,
+                                 'dx': 0.4, 'dy': 0.4,
+                                 'nx': 10, 'ny': 8})
+            levelfile, _ = get_pyramid_file(gridfile, geodict, aligndict)
+            assert levelfile == levelfiles[1]
+            for method in ['nearest', 'linear']:
+                grid4 = gridclass.load(gridfile, aligndict, resample=True,
+                                       method=method)
+                np.testing.assert_equal(grid4.getData(),
+                                        data[25:54:4, 10:47:4])
+
+            finedict = GeoDict.createDictFromBox(1.03, 6.01, 1.02, 5.07,
+                                                 0.23, 0.31)
+            levelfile, _ = get_pyramid_file(gridfile, geodict, finedict)
+            assert levelfile == levelfiles[0]
+            finedict = GeoDict.createDictFromBox(1.03, 6.01, 1.02, 5.07,
+                                                 0.05, 0.05)
+            levelfile, _ = get_pyramid_file(gridfile, geodict, finedict)
+            assert levelfile == gridfile
+            levelfile, _ = get_pyramid_file(gridfile, geodict, sampledict,
+                                            method='conservative')
+            assert levelfile == gridfile
+
+            # levels older than the file are out of date
+            time.sleep(0.01)
+            grid.save(gridfile, format=fileformat)
+            levelfile, _ = get_pyramid_file(gridfile, geodict, sampledict)
+            assert levelfile == gridfile
+
+        # rasterio reads use the pyramid too
+        gridfile = os.path.join(tdir, 'grid_EHdr.grd')
+        build_pyramid(GDALGrid(data, geodict), gridfile, format='EHdr')
+        grid1 = read(gridfile, samplegeodict=sampledict, resample=True)
+        grid2 = read(get_level_filename(gridfile, 4),
+                     samplegeodict=sampledict, resample=True)
+        np.testing.assert_equal(grid1.getData(), grid2.getData())
+        grid6 = read(gridfile, samplegeodict=aligndict, resample=True,
+                     method='nearest')
+        np.testing.assert_equal(grid6.getData(), data[25:54:4, 10:47:4])
+        # the pyramid is used with or without decimated reads
+        grid3 = read(gridfile, samplegeodict=sampledict, resample=True,
+                     decimate=True)
+        np.testing.assert_equal(grid3.getData(), grid2.getData())
+        grid4 = read(gridfile, samplegeodict=sampledict, resample=True,
+                     use_pyramid=False)
+        grid5 = read(gridfile, samplegeodict=sampledict, resample=True,
+                     use_pyramid=False, decimate=True)
+        assert not np.array_equal(grid4.getData(), grid2.getData())
+        assert not np.array_equal(grid5.getData(), grid2.getData())
+        np.testing.assert_allclose(grid4.getData(), grid2.getData(),
+                                   atol=0.01)
+    finally:
+        close_datasets()
+        shutil.rmtree(tdir)
+    print('Passed loading coarse grids from pyramids.')
+
+
+def test_overviews():
+    print('Testing adding GDAL overviews to a file...')
+    data, geodict = _get_grid()
+    tdir = tempfile.mkdtemp()
+    try:
+        tiffile = os.path.join(tdir, 'grid.tif')
+        with rasterio.open(tiffile, 'w', driver='GTiff', height=64,
+                           width=80, count=1, dtype='float32',
+                           transform=from_origin(0.0, 6.4, 0.1, 0.1)) as dst:
+            dst.write(data, 1)
+        build_overviews(tiffile, factors=[2, 4])
+        with rasterio.open(tiffile) as src:
+            assert src.overviews(1) == [2, 4]
+        sampledict = GeoDict.createDictFromBox(1.03, 6.01, 1.02, 5.07,
+                                               0.53, 0.47)
+        grid1 = read(tiffile, samplegeodict=sampledict, resample=True,
+                     decimate=True)
+        grid2 = read(tiffile, samplegeodict=sampledict, resample=True)
+        np.testing.assert_allclose(grid1.getData(), grid2.getData(),
+                                   atol=0.01)
+    finally:
+        close_datasets()
+        shutil.rmtree(tdir)
+    print('Passed adding GDAL overviews to a file.')
+
+
+if __name__ == '__main__':
+    test_level_geodict()
+    test_pyramid()
+    test_overviews()
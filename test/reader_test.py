@@ -3,12 +3,23 @@
 import os.path
 import time
 import sys
+import tempfile
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import rasterio
+import h5py
+from rasterio.windows import Window
 
-from mapio.reader import read, get_file_geodict
+from mapio import reader
+from mapio.reader import (read, get_file_geodict, close_datasets, iter_tiles,
+                          _open_dataset, _read_decimated)
 from mapio.geodict import GeoDict
+from mapio.grid2d import Grid2D
+from mapio.gdal import GDALGrid
+from mapio.gmt import GMTGrid
 
 
 def test_read_whole():
@@ -122,6 +133,238 @@ def test_read_meridian():
     assert np.nansum(grid._data) == 50.0
 
 
+def test_dataset_pool():
+    tdir = tempfile.mkdtemp()
+    try:
+        geodict = GeoDict({'xmin': 0.5, 'xmax': 3.5,
+                           'ymin': 0.5, 'ymax': 2.5,
+                           'dx': 1.0, 'dy': 1.0,
+                           'nx': 4, 'ny': 3})
+        data = np.arange(12, dtype=np.float32).reshape((3, 4))
+        datafile = os.path.join(tdir, 'test.bil')
+        GDALGrid(data, geodict).save(datafile, format='EHdr')
+
+        # repeat reads of a file share one open dataset
+        grid = read(datafile)
+        np.testing.assert_equal(grid._data, data)
+        path = os.path.abspath(datafile)
+        dataset = reader._DATASET_POOL.get(path)
+        assert dataset is not None and not dataset.closed
+        assert get_file_geodict(datafile) == geodict
+        bigdict = GeoDict({'xmin': -0.5, 'xmax': 4.5,
+                           'ymin': -0.5, 'ymax': 3.5,
+                           'dx': 1.0, 'dy': 1.0,
+                           'nx': 6, 'ny': 5})
+        grid = read(datafile, samplegeodict=bigdict, resample=False,
+                    doPadding=True)
+        assert grid._data.shape == (5, 6)
+        np.testing.assert_equal(grid._data[1:4, 1:5], data)
+        assert reader._DATASET_POOL.get(path) is dataset
+
+        # a changed file is opened again, and the old dataset closed
+        time.sleep(0.01)
+        GDALGrid(data * 2, geodict).save(datafile, format='EHdr')
+        grid = read(datafile)
+        np.testing.assert_equal(grid._data, data * 2)
+        assert dataset.closed
+        assert reader._DATASET_POOL.get(path) is not dataset
+
+        close_datasets()
+        assert len(reader._DATASET_POOL) == 0
+    finally:
+        close_datasets()
+        shutil.rmtree(tdir)
+
+
+def test_concurrent_resample():
+    tdir = tempfile.mkdtemp()
+    interpolate = Grid2D.interpolateToGrid
+    try:
+        geodict = GeoDict({'xmin': 0.5, 'xmax': 39.5,
+                           'ymin': 0.5, 'ymax': 29.5,
+                           'dx': 1.0, 'dy': 1.0,
+                           'nx': 40, 'ny': 30})
+        data = np.arange(1200, dtype=np.float32).reshape((30, 40))
+        datafile = os.path.join(tdir, 'test.bil')
+        GDALGrid(data, geodict).save(datafile, format='EHdr')
+        sampledict = GeoDict({'xmin': 5.0, 'xmax': 25.0,
+                              'ymin': 5.0, 'ymax': 20.0,
+                              'dx': 1.0, 'dy': 1.0,
+                              'nx': 21, 'ny': 16})
+        expected = read(datafile, samplegeodict=sampledict, resample=True)
+
+        # both reads get to interpolation at once, which they can not do
+        # if the first one holds the file locked until it is done
+        barrier = threading.Barrier(2, timeout=10)
+
+        def wait_and_interpolate(self, *args, **kwargs):
+            barrier.wait()
+            return interpolate(self, *args, **kwargs)
+
+        Grid2D.interpolateToGrid = wait_and_interpolate
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(read, datafile,
+                                       samplegeodict=sampledict,
+                                       resample=True)
+                       for i in range(2)]
+            grids = [future.result() for future in futures]
+        for grid in grids:
+            np.testing.assert_equal(grid._data, expected._data)
+    finally:
+        Grid2D.interpolateToGrid = interpolate
+        close_datasets()
+        shutil.rmtree(tdir)
+
+
+def _save_chunked(grid, filename, chunks):
+    # save an HDF grid compressed in chunks
+    GMTGrid.copyFromGrid(grid).save(filename, format='hdf')
+    with h5py.File(filename, 'a') as f:
+        zdata = f['z'][:]
+        attrs = dict(f['z'].attrs)
+        del f['z']
+        z = f.create_dataset('z', data=zdata, chunks=chunks,
+                             compression='gzip')
+        for key, value in attrs.items():
+            z.attrs[key] = value
+
+
+def test_hdf_chunks():
+    tdir = tempfile.mkdtemp()
+    try:
+        ny, nx = (53, 77)
+        geodict = GeoDict({'xmin': 0.5, 'xmax': nx - 0.5,
+                           'ymin': 0.5, 'ymax': ny - 0.5,
+                           'dx': 1.0, 'dy': 1.0,
+                           'nx': nx, 'ny': ny})
+        data = np.random.RandomState(0).rand(ny, nx).astype(np.float32)
+        datafile = os.path.join(tdir, 'test.grd')
+        # compress the grid in chunks that do not divide its shape
+        _save_chunked(Grid2D(data, geodict), datafile, (8, 10))
+
+        dataset = reader._Dataset(datafile)
+        try:
+            assert dataset.is_hdf
+            np.testing.assert_equal(reader._read_pixels(dataset, None), data)
+            # windows and strides read one row of chunks at a time
+            for row, col, height, width in [(0, 0, ny, nx), (3, 5, 20, 30),
+                                            (17, 40, 36, 37)]:
+                window = Window(col, row, width, height)
+                for step in [(1, 1), (3, 2), (9, 1)]:
+                    output = data[row:row + height, col:col + width]
+                    output = output[::step[0], ::step[1]]
+                    np.testing.assert_equal(
+                        reader._read_pixels(dataset, window, step=step),
+                        output)
+        finally:
+            dataset.close()
+    finally:
+        shutil.rmtree(tdir)
+
+
+def test_iter_tiles():
+    tdir = tempfile.mkdtemp()
+    try:
+        geodict = GeoDict({'xmin': 0.5, 'xmax': 8.5,
+                           'ymin': 0.5, 'ymax': 10.5,
+                           'dx': 1.0, 'dy': 1.0,
+                           'nx': 9, 'ny': 11})
+        data = np.arange(99, dtype=np.float32).reshape((11, 9))
+        datafile = os.path.join(tdir, 'test.bil')
+        GDALGrid(data, geodict).save(datafile, format='EHdr')
+
+        # the cores of the tiles put back together make up the file, and
+        # each tile matches the file cells it covers, halo and all
+        output = np.full(data.shape, np.nan, dtype=np.float32)
+        ntiles = 0
+        for rows, cols, grid in iter_tiles(datafile, (4, 5), halo=1):
+            gd = grid.getGeoDict()
+            row = int(round(geodict.ymax - gd.ymax))
+            col = int(round(gd.xmin - geodict.xmin))
+            tdata = grid.getData()
+            np.testing.assert_equal(
+                tdata, data[row:row + gd.ny, col:col + gd.nx])
+            core = output[row + rows.start:row + rows.stop,
+                          col + cols.start:col + cols.stop]
+            assert np.isnan(core).all()
+            core[:] = tdata[rows, cols]
+            ntiles += 1
+        np.testing.assert_equal(output, data)
+        assert ntiles == 6
+
+        # a subset of the file
+        sampledict = GeoDict({'xmin': 2.5, 'xmax': 6.5,
+                              'ymin': 1.5, 'ymax': 8.5,
+                              'dx': 1.0, 'dy': 1.0,
+                              'nx': 5, 'ny': 8})
+        cells = 0
+        for rows, cols, grid in iter_tiles(datafile, (4, 3),
+                                           samplegeodict=sampledict):
+            assert grid.getData()[rows, cols].size == grid.getData().size
+            cells += grid.getData().size
+            assert sampledict.contains(grid.getGeoDict())
+        assert cells == 40
+
+        # HDF tiles line up with the chunks, counted from the bottom row
+        # (6 rows, up from the bottom of the 11 rows)
+        datafile = os.path.join(tdir, 'test.grd')
+        _save_chunked(Grid2D(data, geodict), datafile, (3, 4))
+        tiles = [grid.getData() for _, _, grid in
+                 iter_tiles(datafile, (5, 8))]
+        assert [tile.shape for tile in tiles] == [(5, 8), (5, 1),
+                                                  (6, 8), (6, 1)]
+        output = np.vstack([np.hstack(tiles[0:2]), np.hstack(tiles[2:4])])
+        np.testing.assert_equal(output, data)
+    finally:
+        close_datasets()
+        shutil.rmtree(tdir)
+
+
+def test_read_decimated():
+    tdir = tempfile.mkdtemp()
+    try:
+        ny, nx = (300, 400)
+        geodict = GeoDict({'xmin': 0.05, 'xmax': 39.95,
+                           'ymin': 0.05, 'ymax': 29.95,
+                           'dx': 0.1, 'dy': 0.1,
+                           'nx': nx, 'ny': ny})
+        rows, cols = np.mgrid[0:ny, 0:nx]
+        data = (0.02 * cols + 0.03 * rows).astype(np.float32)
+        datafile = os.path.join(tdir, 'test.bil')
+        GDALGrid(data, geodict).save(datafile, format='EHdr')
+
+        # a grid about five times coarser than the file is read at about
+        # a quarter of the file resolution
+        sampledict = GeoDict.createDictFromBox(5.03, 30.01, 6.02, 22.07,
+                                               0.53, 0.47)
+        with _open_dataset(datafile) as dataset:
+            grid = _read_decimated(dataset, sampledict, 'linear')
+        assert grid.getData().shape == (47, 57)
+        assert grid.getGeoDict().contains(sampledict)
+
+        # interpolating that is nearly the same as interpolating the file
+        grid1 = read(datafile, samplegeodict=sampledict, resample=True,
+                     decimate=True)
+        grid2 = read(datafile, samplegeodict=sampledict, resample=True)
+        assert grid1.getGeoDict() == sampledict
+        np.testing.assert_allclose(grid1.getData(), grid2.getData(),
+                                   atol=0.01)
+
+        # finer grids, grids hanging off the file, and conservative
+        # resampling read the file at full resolution
+        finedict = GeoDict.createDictFromBox(5.03, 30.01, 6.02, 22.07,
+                                             0.13, 0.17)
+        edgedict = GeoDict.createDictFromBox(0.0, 10.0, 0.0, 10.0, 0.5, 0.5)
+        with _open_dataset(datafile) as dataset:
+            assert _read_decimated(dataset, finedict, 'linear') is None
+            assert _read_decimated(dataset, edgedict, 'linear') is None
+            assert _read_decimated(dataset, sampledict,
+                                   'conservative') is None
+    finally:
+        close_datasets()
+        shutil.rmtree(tdir)
+
+
 def read_user_file_test(fname, xmin, xmax, ymin, ymax):
     gd = get_file_geodict(fname)
     sample = GeoDict.createDictFromBox(xmin, xmax, ymin, ymax, gd.dx, gd.dy)
@@ -154,6 +397,11 @@ if __name__ == '__main__':
     test_read_subset_with_padding()
     test_read_subset_with_resample_and_padding()
     test_read_meridian()
+    test_dataset_pool()
+    test_concurrent_resample()
+    test_hdf_chunks()
+    test_iter_tiles()
+    test_read_decimated()
 
     if len(sys.argv) > 1:
         fname = sys.argv[1]
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+
+# python 3 compatibility
+from __future__ import print_function
+import os.path
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# hack the path so that I can debug these functions if I need to
+homedir = os.path.dirname(os.path.abspath(__file__))  # where is this script?
+mapiodir = os.path.abspath(os.path.join(homedir, '..'))
+# put this at the front of the system path, ignoring any installed mapio stuff
+sys.path.insert(0, mapiodir)
+
+# third party imports
+import numpy as np
+from mapio.resample import (resample_regular, resample_nearest,
+                             get_resample_plan, ResamplePlan, PointPlan)
+from mapio.geodict import GeoDict
+from mapio.cache import LRUCache
+
+
+def test_resample_regular():
+    print('Testing separable resampling reproduces polynomials...')
+    ny, nx = (20, 25)
+    y, x = np.mgrid[0:ny, 0:nx].astype(np.float64)
+    xi = np.linspace(0, nx - 1, 37)
+    yi = np.linspace(0, ny - 1, 31)
+    yy, xx = np.meshgrid(yi, xi, indexing='ij')
+
+    # bilinear interpolation is exact for a bilinear surface
+    data = 2.0 + 3.0 * x - 0.5 * y + 0.25 * x * y
+    output = 2.0 + 3.0 * xx - 0.5 * yy + 0.25 * xx * yy
+    newdata = resample_regular(data, xi, yi, method='linear')
+    np.testing.assert_almost_equal(newdata, output)
+
+    # bicubic splines are exact for a bicubic surface
+    data = x**3 - 2 * x**2 * y + 0.1 * y**3 + x * y
+    output = xx**3 - 2 * xx**2 * yy + 0.1 * yy**3 + xx * yy
+    newdata = resample_regular(data, xi, yi, method='cubic')
+    np.testing.assert_almost_equal(newdata, output, decimal=8)
+
+    # single precision input stays single precision
+    data = data.astype(np.float32)
+    newdata = resample_regular(data, xi, yi, method='linear')
+    assert newdata.dtype == np.float32
+
+    # large grids are done in blocks of rows, in either pass order
+    ny, nx = (300, 700)
+    y, x = np.mgrid[0:ny, 0:nx].astype(np.float64)
+    data = 2.0 + 3.0 * x - 0.5 * y + 0.25 * x * y
+    for nyout, nxout in [(150, 1100), (500, 90)]:
+        xi = np.linspace(0.3, nx - 1.2, nxout)
+        yi = np.linspace(0.1, ny - 1.4, nyout)
+        yy, xx = np.meshgrid(yi, xi, indexing='ij')
+        output = 2.0 + 3.0 * xx - 0.5 * yy + 0.25 * xx * yy
+        newdata = resample_regular(data, xi, yi, method='linear')
+        assert newdata.flags.c_contiguous
+        np.testing.assert_allclose(newdata, output, rtol=1e-12)
+        newdata = resample_regular(data, xi, yi, method='cubic')
+        assert newdata.flags.c_contiguous
+        np.testing.assert_allclose(newdata, output, rtol=1e-10)
+    print('Passed separable resampling reproduces polynomials.')
+
+
+def test_resample_nan():
+    print('Testing resampling of grids with NaN values...')
+    data = np.arange(0, 36, dtype=np.float64).reshape((6, 6))
+    data[2, 3] = np.nan
+    xi = np.array([0.5, 2.0, 2.5, 3.0, 4.5])
+    yi = np.array([1.0, 1.5, 2.5, 4.0])
+
+    # NaN spreads only to outputs with a non-zero weight on the NaN cell
+    newdata = resample_regular(data, xi, yi, method='linear')
+    output = np.array([[6.5, 8.0, 8.5, 9.0, 10.5],
+                       [9.5, 11.0, np.nan, np.nan, 13.5],
+                       [15.5, 17.0, np.nan, np.nan, 19.5],
+                       [24.5, 26.0, 26.5, 27.0, 28.5]])
+    np.testing.assert_almost_equal(newdata, output)
+
+    # renormalizing over valid neighbors fills the hole
+    newdata = resample_regular(data, xi, yi, method='linear',
+                               nan_policy='renormalize')
+    assert np.isfinite(newdata).all()
+    np.testing.assert_almost_equal(newdata[0], output[0])
+    np.testing.assert_almost_equal(newdata[2, 0], output[2, 0])
+    newdata = resample_regular(data, xi, yi, method='cubic',
+                               nan_policy='renormalize')
+    assert np.isfinite(newdata).all()
+
+    # infinite cells stay infinite
+    data[2, 3] = np.inf
+    newdata = resample_regular(data, xi, yi, method='linear')
+    assert np.isposinf(newdata[2, 2])
+    assert np.isfinite(newdata[2, 0])
+    print('Passed resampling of grids with NaN values.')
+
+
+def test_resample_nearest():
+    print('Testing nearest neighbor resampling...')
+    data = np.arange(0, 30, dtype=np.int16).reshape((5, 6))
+    xi = np.array([-0.2, 0.5, 1.4, 2.6, 5.3])
+    yi = np.array([0.0, 1.5, 4.4])
+    newdata = resample_nearest(data, xi, yi)
+    output = np.array([[0, 0, 1, 3, 5],
+                       [6, 6, 7, 9, 11],
+                       [24, 24, 25, 27, 29]])
+    np.testing.assert_equal(newdata, output)
+    assert newdata.dtype == np.int16
+
+    # columns past the edge of a global grid wrap around
+    xi = np.array([4.6, 5.4, 5.6, 6.2])
+    newdata = resample_nearest(data, xi, yi, wrap=True)
+    np.testing.assert_equal(newdata[0], [5, 5, 0, 0])
+    print('Passed nearest neighbor resampling.')
+
+
+def test_resample_plan():
+    print('Testing reusable resampling plans...')
+    hostdict = GeoDict({'xmin': 0.5, 'xmax': 9.5, 'ymin': 0.5, 'ymax': 7.5,
+                        'dx': 1.0, 'dy': 1.0, 'ny': 8, 'nx': 10})
+    sampledict = GeoDict({'xmin': 1.25, 'xmax': 8.75, 'ymin': 1.0,
+                          'ymax': 7.0, 'dx': 0.5, 'dy': 0.5,
+                          'ny': 13, 'nx': 16})
+    plan = get_resample_plan(hostdict, sampledict, method='cubic')
+    assert get_resample_plan(hostdict.copy(), sampledict.copy(),
+                             method='cubic') is plan
+    assert get_resample_plan(hostdict, sampledict, method='linear') is not plan
+
+    # one plan gives the same answer as resampling each grid from scratch
+    xi = (np.linspace(1.25, 8.75, 16) - 0.5) / 1.0
+    yi = (7.5 - np.linspace(7.0, 1.0, 13)) / 1.0
+    for seed in range(3):
+        data = np.random.RandomState(seed).rand(8, 10)
+        np.testing.assert_almost_equal(plan.apply(data),
+                                       resample_regular(data, xi, yi,
+                                                        method='cubic'))
+
+    # fresh plans can be shared between threads
+    data = np.random.RandomState(0).rand(8, 10)
+    data[3, 4] = np.nan
+    rows = np.random.RandomState(1).rand(1000) * 7
+    cols = np.random.RandomState(2).rand(1000) * 9
+    for method in ['linear', 'cubic']:
+        plan = ResamplePlan((8, 10), xi, yi, method=method)
+        points = PointPlan((8, 10), rows, cols, method=method)
+        output = ResamplePlan((8, 10), xi, yi, method=method).apply(
+            data, nan_policy='renormalize')
+        poutput = PointPlan((8, 10), rows, cols, method=method).apply(data)
+
+        def _apply(i):
+            return (plan.apply(data, nan_policy='renormalize'),
+                    points.apply(data))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for newdata, pdata in executor.map(_apply, range(32)):
+                np.testing.assert_equal(newdata, output)
+                np.testing.assert_equal(pdata, poutput)
+    print('Passed reusable resampling plans.')
+
+    print('Testing LRU cache...')
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+    # values leaving the cache are handed to onEvict
+    evicted = []
+    cache = LRUCache(maxsize=2, onEvict=evicted.append)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.put('a', 1)
+    cache.put('c', 3)
+    assert evicted == [2]
+    cache.put('a', 4)
+    assert evicted == [2, 1]
+    cache.clear()
+    assert sorted(evicted) == [1, 2, 3, 4] and len(cache) == 0
+    print('Passed LRU cache.')
+
+
+if __name__ == '__main__':
+    test_resample_regular()
+    test_resample_nan()
+    test_resample_nearest()
+    test_resample_plan()
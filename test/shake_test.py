@@ -86,6 +86,45 @@ def test_interpolate():
     print('Passed test of ShakeGrid interpolate() method.')
 
 
+def test_project():
+    print('Testing ShakeGrid project() method...')
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 6.5, 'ymin': 1.5,
+                       'ymax': 6.5, 'dx': 1.0, 'dy': 1.0, 'ny': 6, 'nx': 7})
+    data = np.arange(14, 56, dtype=np.float32).reshape(6, 7)
+    layers = OrderedDict()
+    layers['pga'] = data
+    layers['pgv'] = data / 2
+    shakeDict = {'event_id': 'usabcd1234',
+                 'shakemap_id': 'usabcd1234',
+                 'shakemap_version': 1,
+                 'code_version': '4.0',
+                 'process_timestamp': datetime.utcnow(),
+                 'shakemap_originator': 'us',
+                 'map_status': 'RELEASED',
+                 'shakemap_event_type': 'ACTUAL'}
+    eventDict = {'event_id': 'usabcd1234',
+                 'magnitude': 7.6,
+                 'depth': 1.4,
+                 'lat': 2.0,
+                 'lon': 2.0,
+                 'event_timestamp': datetime.utcnow(),
+                 'event_network': 'us',
+                 'event_description': 'sample event'}
+    uncDict = {'pga': (0.0, 0), 'pgv': (0.0, 0)}
+    shake = ShakeGrid(layers, geodict, eventDict, shakeDict, uncDict)
+    projstr = '+proj=utm +zone=31 +north +ellps=WGS84 +datum=WGS84 +units=m +no_defs'
+    shake2 = shake.project(projstr, method='nearest')
+    assert isinstance(shake2, ShakeGrid)
+    assert shake2.getEventDict()['event_id'] == 'usabcd1234'
+    pga = shake2.getLayer('pga').getData()
+    pgv = shake2.getLayer('pgv').getData()
+    assert pga.dtype == np.float32
+    np.testing.assert_equal(pgv, pga / 2)
+    np.testing.assert_equal(
+        pga, shake.getLayer('pga').project(projstr, method='nearest').getData())
+    print('Passed test of ShakeGrid project() method.')
+
+
 def test_read():
     xmlfile = os.path.join(homedir, 'data', 'northridge.xml')
     tdir = tempfile.mkdtemp()
@@ -226,6 +265,20 @@ def test_save():
         np.testing.assert_almost_equal(tdata, output)
         print('Passed resampling, no padding...')
 
+        print('Testing resampling to cells on the file grid...')
+        aligndict = GeoDict({'xmin': 1.5, 'xmax': 5.5,
+                             'ymin': 0.5, 'ymax': 4.5,
+                             'dx': 2.0, 'dy': 2.0,
+                             'ny': 3, 'nx': 3})
+        shake7 = ShakeGrid.load(testfile, samplegeodict=aligndict,
+                                resample=True, doPadding=False,
+                                padValue=np.nan)
+        for layer in ['pga', 'pgv', 'mmi']:
+            tdata = shake7.getLayer(layer).getData()
+            np.testing.assert_almost_equal(tdata, layers[layer][1::2, 1::2])
+        assert shake7.getGeoDict() == aligndict
+        print('Passed resampling to cells on the file grid...')
+
         print('Testing resampling and padding...')
         pga = np.arange(0, 16, dtype=np.float32).reshape(4, 4)
         pgv = np.arange(1, 17, dtype=np.float32).reshape(4, 4)
@@ -319,5 +372,6 @@ if __name__ == '__main__':
     test_meridian()
     test_modify()
     test_interpolate()
+    test_project()
     test_read()
     test_save()
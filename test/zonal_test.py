@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+# python 3 compatibility
+from __future__ import print_function
+import os.path
+import sys
+from collections import OrderedDict
+
+# hack the path so that I can debug these functions if I need to
+homedir = os.path.dirname(os.path.abspath(__file__))  # where is this script?
+mapiodir = os.path.abspath(os.path.join(homedir, '..'))
+# put this at the front of the system path, ignoring any installed mapio stuff
+sys.path.insert(0, mapiodir)
+
+# third party imports
+import numpy as np
+from shapely.geometry import box, mapping
+from mapio.grid2d import Grid2D
+from mapio.multiple import MultiGrid
+from mapio.geodict import GeoDict
+from mapio.dataset import DataSetException
+from mapio.zonal import zonal_stats, zonal_histogram, get_zone_labels
+
+
+def _get_zones():
+    geodict = GeoDict({'xmin': 0.5, 'xmax': 5.5, 'ymin': 0.5, 'ymax': 3.5,
+                       'dx': 1.0, 'dy': 1.0, 'ny': 4, 'nx': 6})
+    # the left half, the top right block and a zone off the grid
+    shapes = [box(0.0, 0.0, 3.0, 4.0),
+              {'geometry': mapping(box(3.0, 2.0, 6.0, 4.0)),
+               'properties': {}},
+              box(10.0, 10.0, 11.0, 11.0)]
+    return (geodict, shapes)
+
+
+def test_zonal_stats():
+    print('Testing zonal statistics of a grid...')
+    geodict, shapes = _get_zones()
+    data = np.arange(24, dtype=np.float64).reshape((4, 6))
+    data[0, 0] = np.nan
+    grid = Grid2D(data, geodict)
+    stats = zonal_stats(grid, shapes, stats=['mean', 'sum', 'max', 'min',
+                                             'median', 'count', 'std'],
+                        mustContainCenter=True)
+    left = data[:, 0:3].ravel()[1:]
+    right = data[0:2, 3:6].ravel()
+    np.testing.assert_almost_equal(stats['mean'],
+                                   [left.mean(), right.mean(), np.nan])
+    np.testing.assert_almost_equal(stats['sum'],
+                                   [left.sum(), right.sum(), np.nan])
+    np.testing.assert_almost_equal(stats['max'], [20.0, 11.0, np.nan])
+    np.testing.assert_almost_equal(stats['min'], [1.0, 3.0, np.nan])
+    np.testing.assert_almost_equal(stats['median'],
+                                   [np.median(left), np.median(right),
+                                    np.nan])
+    np.testing.assert_almost_equal(stats['count'], [11, 6, 0])
+    np.testing.assert_almost_equal(stats['std'],
+                                   [left.std(), right.std(), np.nan])
+
+    # masked cells are left out, like NaN cells
+    mask = np.zeros((4, 6), dtype=bool)
+    mask[3, :] = True
+    grid.setMask(mask)
+    stats = zonal_stats(grid, shapes, stats=['count', 'mode'],
+                        mustContainCenter=True)
+    np.testing.assert_almost_equal(stats['count'], [8, 6, 0])
+    np.testing.assert_almost_equal(stats['mode'], [1.0, 3.0, np.nan])
+
+    # the mean is the default statistic
+    stats = zonal_stats(grid, shapes, mustContainCenter=True)
+    assert list(stats.keys()) == ['mean']
+
+    try:
+        zonal_stats(grid, shapes, stats=['mean', 'range'])
+        assert False
+    except DataSetException:
+        pass
+    print('Passed zonal statistics of a grid.')
+
+
+def test_zonal_multigrid():
+    print('Testing zonal statistics of several layers...')
+    geodict, shapes = _get_zones()
+    data = np.arange(24, dtype=np.int32).reshape((4, 6))
+    layers = OrderedDict()
+    layers['mmi'] = Grid2D(data, geodict)
+    layers['pop'] = Grid2D(data * 10.0, geodict)
+    mgrid = MultiGrid(layers)
+    stats = zonal_stats(mgrid, shapes, stats=['max', 'sum'],
+                        mustContainCenter=True)
+    assert list(stats.keys()) == ['mmi', 'pop']
+    np.testing.assert_almost_equal(stats['mmi']['max'], [20, 11, np.nan])
+    np.testing.assert_almost_equal(stats['pop']['sum'],
+                                   [1200.0, 420.0, np.nan])
+
+    # the label grid is cached, and can also be passed in directly
+    zones = get_zone_labels(shapes, geodict, mustContainCenter=True)
+    assert get_zone_labels(shapes, geodict.copy(),
+                           mustContainCenter=True) is zones
+    assert get_zone_labels(shapes, geodict) is not zones
+    np.testing.assert_equal(zones.labels[:, 0:3], 0)
+    np.testing.assert_equal(zones.labels[0:2, 3:6], 1)
+    np.testing.assert_equal(zones.labels[2:, 3:6], -1)
+    stats2 = zonal_stats(mgrid, zones, stats=['max', 'sum'])
+    np.testing.assert_equal(stats2['pop']['sum'], stats['pop']['sum'])
+
+    # population exposed to each bin of the first layer, per zone
+    histogram = zonal_histogram(layers['mmi'], zones, [0, 6, 12, 24],
+                                weights=layers['pop'])
+    output = np.array([[30.0, 210.0, 960.0],
+                       [120.0, 300.0, 0.0],
+                       [0.0, 0.0, 0.0]])
+    np.testing.assert_almost_equal(histogram, output)
+    histogram = zonal_histogram(layers['mmi'], zones, [0, 6, 12, 24])
+    np.testing.assert_almost_equal(histogram.sum(axis=1), [12, 6, 0])
+    print('Passed zonal statistics of several layers.')
+
+
+if __name__ == '__main__':
+    test_zonal_stats()
+    test_zonal_multigrid()